@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+
+import metrics
+
+# Longest deadline a client may ask for; longer ones would just hold a queue place
+MAX_DEADLINE_MS = 30000
+
+DETECTION_SHED = metrics.registry.counter(
+    'detection_shed_total', 'Detection requests dropped by admission control', ('reason',))
+DETECTION_ADMITTED = metrics.registry.counter(
+    'detection_admitted_total', 'Detection requests admitted, by mode', ('mode',))
+DETECTION_LATE = metrics.registry.counter(
+    'detection_late_total', 'Admitted detections answered after their deadline')
+
+
+class DetectionShed(Exception):
+    """Raised when a detection request is dropped instead of being queued"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        return {
+            'error': 'Server busy, frame dropped',
+            'detected': False,
+            'shed': True,
+            'reason': self.reason
+        }
+
+
+def parse_deadline_ms(value):
+    """
+    Client supplied deadline in milliseconds, or None to use the default
+
+    Anything that is not a positive number is ignored; values are capped at MAX_DEADLINE_MS.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        deadline = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(deadline) or deadline <= 0:
+        return None
+    return min(deadline, MAX_DEADLINE_MS)
+
+
+class AdmissionController:
+    """
+    Bounded admission queue in front of the emotion detector.
+
+    At most max_concurrent detections run at once and at most max_queue wait
+    for a slot. A request that cannot start early enough to finish before
+    its deadline (given the recent average service time) is shed instead of
+    being answered with a stale result. While the queue is deeper than
+    degrade_queue_depth, detections run in degraded mode (smaller detection
+    resolution, largest face only) until it drains to recover_queue_depth.
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=16, default_deadline_ms=1000,
+                 degrade_queue_depth=4, recover_queue_depth=1, executor=None):
+        """
+        Args:
+            max_concurrent (int): Detections allowed to run at the same time
+            max_queue (int): Requests allowed to wait for a slot; more are shed immediately
+            default_deadline_ms (float): Deadline for requests that do not send one
+            degrade_queue_depth (int): Queue depth that switches degraded mode on
+            recover_queue_depth (int): Queue depth at or below which degraded mode switches off
+            executor: Runs admitted detections off the event loop in async server modes
+                (server_mode.NativeExecutor); None runs them on the calling thread
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.default_deadline_ms = default_deadline_ms
+        self.degrade_queue_depth = degrade_queue_depth
+        self.recover_queue_depth = recover_queue_depth
+        self.executor = executor
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.degraded = False
+        # Exponentially weighted average detection time, in seconds
+        self.service_time = 0.0
+
+    def run(self, detect_fn, deadline_ms=None, received_at=None):
+        """
+        Run detect_fn(degraded) once admitted
+
+        Args:
+            detect_fn: Callable taking the degraded flag and returning the detection result
+            deadline_ms (float): Milliseconds after received_at by which the answer is useful
+            received_at (float): time.monotonic() when the frame arrived (defaults to now)
+
+        Returns:
+            tuple: (result, degraded)
+
+        Raises:
+            DetectionShed: The request was dropped (queue full or deadline unreachable)
+        """
+        received_at = received_at or time.monotonic()
+        budget = float(deadline_ms or self.default_deadline_ms) / 1000
+        deadline = received_at + budget
+
+        with self._lock:
+            if self.waiting >= self.max_queue and self.in_flight >= self.max_concurrent:
+                self._shed('queue_full')
+            self.waiting += 1
+            self._update_mode()
+            expected = self.service_time
+
+        acquired = False
+        try:
+            # A free slot is taken right away; the average service time only
+            # decides how long a queued request may wait for one
+            acquired = self._slots.acquire(blocking=False)
+            if not acquired:
+                timeout = deadline - time.monotonic() - expected
+                if timeout > 0:
+                    acquired = self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                if acquired:
+                    self.in_flight += 1
+                self._update_mode()
+                degraded = self.degraded
+
+        if not acquired:
+            with self._lock:
+                self._shed('deadline')
+
+        DETECTION_ADMITTED.inc('degraded' if degraded else 'normal')
+        start = time.monotonic()
+        try:
+            if self.executor is not None:
+                result = self.executor.run(detect_fn, degraded)
+            else:
+                result = detect_fn(degraded)
+        finally:
+            # An outlier slower than the whole deadline counts as the deadline,
+            # so the average cannot keep shedding every queued request
+            elapsed = min(time.monotonic() - start, budget)
+            with self._lock:
+                self.in_flight -= 1
+                self.service_time = elapsed if not self.service_time else 0.8 * self.service_time + 0.2 * elapsed
+            self._slots.release()
+
+        if time.monotonic() > deadline:
+            DETECTION_LATE.inc()
+        return result, degraded
+
+    def stats(self):
+        with self._lock:
+            return {
+                'waiting': self.waiting,
+                'in_flight': self.in_flight,
+                'degraded': self.degraded,
+                'avg_service_ms': round(self.service_time * 1000, 2),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue
+            }
+
+    def _shed(self, reason):
+        DETECTION_SHED.inc(reason)
+        raise DetectionShed(reason, retry_after=max(1, int(round(self.service_time * (self.waiting + 1)))))
+
+    def _update_mode(self):
+        if not self.degraded and self.waiting >= self.degrade_queue_depth:
+            self.degraded = True
+            print(f"⚠️ Detection queue depth {self.waiting}, switching to degraded mode")
+        elif self.degraded and self.waiting <= self.recover_queue_depth:
+            self.degraded = False
+            print("✅ Detection queue drained, leaving degraded mode")
+
+
+# Global admission controller (initialized in app.py)
+admission_controller = None
+
+
+def init_admission_controller(**options):
+    global admission_controller
+    admission_controller = AdmissionController(**options)
+
+    metrics.registry.gauge('detection_queue_waiting', 'Detection requests waiting for a slot',
+                           lambda: admission_controller.waiting)
+    metrics.registry.gauge('detection_in_flight', 'Detections running', lambda: admission_controller.in_flight)
+    metrics.registry.gauge('detection_degraded', 'Whether detection runs in degraded mode',
+                           lambda: int(admission_controller.degraded))
+    return admission_controller
+
+
+def get_admission_controller():
+    """Get the global admission controller, creating a default one if needed"""
+    if admission_controller is None:
+        return init_admission_controller()
+    return admission_controller
@@ -1,21 +1,40 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, decode_token
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from models import db
+from models import db, Session, Question, EmotionAnalysis
 from config import Config
+from admission import DetectionShed, init_admission_controller, get_admission_controller, parse_deadline_ms
+from session_store import create_session_store, role_room
+from emotion_broadcaster import EmotionBroadcaster
+from session_gc import SessionSweeper
+from event_codec import EventEncoder, available_encodings, encoding_room
+from server_mode import create_cpu_executor, is_patched
+import metrics
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Import blueprints
 from auth import auth_bp
 from sessions import sessions_bp
 from emotion_routes import emotion_bp
-from realtime_routes import realtime_bp
+from realtime_routes import realtime_bp, save_emotion_analysis, analysis_response
 
-def create_app():
+def create_app(config_overrides=None):
+    """
+    Build the Flask app
+
+    Args:
+        config_overrides (dict): Config values applied on top of Config (e.g. a SQLite
+            SQLALCHEMY_DATABASE_URI for load tests)
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # Initialize extensions
     db.init_app(app)
@@ -23,7 +42,18 @@ def create_app():
     CORS(app, origins=["https://d0bf6c379064.ngrok-free.app"])
 
     # Initialize SocketIO with better configuration for remote connections
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    # With a message queue (e.g. redis://) emits and rooms reach clients connected to other processes
+    async_mode = app.config['SOCKETIO_ASYNC_MODE']
+    if not is_patched(async_mode):
+        print(f"⚠️ Warning: {async_mode} mode without monkey patching, start the server with server.py")
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins="*",
+        async_mode=async_mode,
+        message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'] or None
+    )
+    if app.config['METRICS_ENABLED']:
+        metrics.instrument_socketio(socketio)
 
     # Create upload directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -34,15 +64,55 @@ def create_app():
     app.register_blueprint(emotion_bp, url_prefix='/api')
     app.register_blueprint(realtime_bp, url_prefix='/api/realtime')
 
-    # Initialize emotion detector
+    # CPU-bound work runs on native threads in async modes (None in threading mode)
+    cpu_executor = create_cpu_executor(async_mode, app.config['ADMISSION_MAX_CONCURRENT'])
+    app.cpu_executor = cpu_executor
+    if cpu_executor is not None and (app.config['INFERENCE_BATCHING'] or app.config['DETECTION_WORKERS']):
+        # Their helper threads would be greenlets blocking the event loop
+        print(f"⚠️ Warning: INFERENCE_BATCHING and DETECTION_WORKERS are ignored in {async_mode} mode")
+        app.config['INFERENCE_BATCHING'] = False
+        app.config['DETECTION_WORKERS'] = 0
+
+    # Bounded admission queue in front of the detector
+    init_admission_controller(
+        max_concurrent=app.config['ADMISSION_MAX_CONCURRENT'],
+        max_queue=app.config['ADMISSION_MAX_QUEUE'],
+        default_deadline_ms=app.config['DETECTION_DEADLINE_MS'],
+        degrade_queue_depth=app.config['DEGRADE_QUEUE_DEPTH'],
+        recover_queue_depth=app.config['RECOVER_QUEUE_DEPTH'],
+        executor=cpu_executor
+    )
+
+    # Initialize emotion detector in the background (TensorFlow is imported there, not here)
     try:
-        from emotion_detector import init_emotion_detector
+        from emotion_detector import init_emotion_detector_async, mark_emotion_detector_unavailable
         model_path = app.config['MODEL_PATH']
         cascade_path = app.config['CASCADE_PATH']
-        if os.path.exists(model_path) and os.path.exists(cascade_path):
-            init_emotion_detector(model_path, cascade_path)
-            print("✅ Emotion detector initialized successfully")
+        if not app.config['EMOTION_DETECTOR_ENABLED']:
+            mark_emotion_detector_unavailable('Emotion detector disabled by configuration')
+        elif os.path.exists(model_path) and os.path.exists(cascade_path):
+            init_emotion_detector_async(
+                model_path,
+                cascade_path,
+                batching=app.config['INFERENCE_BATCHING'],
+                max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+                max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'],
+                workers=app.config['DETECTION_WORKERS'],
+                worker_threads=app.config['DETECTION_WORKER_THREADS'],
+                warmup_batch_sizes=app.config['DETECTOR_WARMUP_BATCH_SIZES'],
+                backend=app.config['MODEL_BACKEND'],
+                decode_width=app.config['DECODE_WIDTH'],
+                tracker_full_scan_interval=app.config['TRACKER_FULL_SCAN_INTERVAL'],
+                tracker_padding=app.config['TRACKER_PADDING'],
+                detection_width=app.config['DETECTION_WIDTH'],
+                frame_cache_distance=app.config['FRAME_CACHE_DISTANCE'],
+                frame_cache_ttl=app.config['FRAME_CACHE_TTL'],
+                degraded_width=app.config['DEGRADED_DETECTION_WIDTH'],
+                executor=cpu_executor
+            )
+            print("⏳ Loading emotion detector in the background...")
         else:
+            mark_emotion_detector_unavailable('Model files not found')
             print("⚠️ Warning: Model files not found. Emotion detection will not be available.")
     except Exception as e:
         print(f"❌ Error initializing emotion detector: {e}")
@@ -60,27 +130,155 @@ def create_app():
     def missing_token_callback(error):
         return jsonify({'error': 'Authorization token is required'}), 401
 
-    # Health check endpoint
+    # Health check endpoints
     @app.route('/api/health', methods=['GET'])
+    @app.route('/api/health/live', methods=['GET'])
     def health_check():
+        """Liveness: the process is up and serving requests"""
         return jsonify({
             'status': 'healthy',
             'message': 'Therapy Meet API is running',
             'version': '2.0.0'
         }), 200
 
-    # Store active sessions and their states
-    active_sessions = {}
+    @app.route('/api/health/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness: the emotion detector is loaded and warmed up (or disabled for this worker)"""
+        from emotion_detector import emotion_detector, get_detector_status
+
+        detector = get_detector_status()
+        ready = detector['state'] == 'ready' or (
+            detector['state'] == 'unavailable' and not app.config['EMOTION_DETECTOR_ENABLED'])
+        response = {
+            'status': 'ready' if ready else 'not_ready',
+            'detector': detector
+        }
+
+        response['admission'] = get_admission_controller().stats()
+        response['sessions'] = dict(session_store.stats(), gc=session_sweeper.stats())
+        response['async_mode'] = async_mode
+        if cpu_executor is not None:
+            response['cpu_executor'] = cpu_executor.stats()
+
+        # Report detection worker processes when the pool is enabled
+        pool = getattr(emotion_detector, 'pool', None)
+        if pool is not None:
+            response['detection_pool'] = pool.health()
+            if not response['detection_pool']['healthy']:
+                response['status'] = 'degraded'
+
+        return jsonify(response), 200 if ready else 503
+
+    # Store active sessions and their states (shared across processes with a Redis store)
+    session_store = create_session_store(app.config['SESSION_STORE_URL'], ttl=app.config['SESSION_STATE_TTL'],
+                                         max_samples=app.config['SESSION_MAX_SAMPLES'] or None)
+    app.session_store = session_store
+
+    # Encoding (JSON or msgpack) negotiated by each connection
+    event_encoder = EventEncoder(socketio)
+    app.event_encoder = event_encoder
+
+    # Coalesced real_time_emotion broadcasts to the therapists of each session
+    emotion_broadcaster = EmotionBroadcaster(
+        socketio,
+        event_encoder,
+        interval=app.config['EMOTION_BROADCAST_INTERVAL_MS'] / 1000,
+        max_series=app.config['EMOTION_BROADCAST_MAX_SERIES'],
+        max_in_flight=app.config['EMOTION_BROADCAST_MAX_IN_FLIGHT']
+    )
+    app.emotion_broadcaster = emotion_broadcaster
+
+    # Idle sessions and dead participants are reclaimed in the background
+    session_sweeper = SessionSweeper(session_store, socketio, interval=app.config['SESSION_GC_INTERVAL'],
+                                     on_evict=emotion_broadcaster.discard)
+    session_sweeper.start()
+    app.session_sweeper = session_sweeper
+
+    # Metrics
+    if app.config['METRICS_ENABLED']:
+        from sqlalchemy.engine import Engine
+        metrics.instrument_db(Engine)
+
+        @app.before_request
+        def start_request_metrics():
+            g.request_start = time.perf_counter()
+            metrics.start_request()
+
+        @app.after_request
+        def record_request_metrics(response):
+            if 'request_start' not in g:
+                return response
+
+            elapsed = time.perf_counter() - g.request_start
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            timings, db_queries = metrics.request_timings()
+            metrics.HTTP_REQUEST_SECONDS.observe(elapsed, request.method, route, str(response.status_code))
+            metrics.HTTP_REQUEST_DB_QUERIES.observe(db_queries, route)
+            metrics.HTTP_REQUEST_DB_SECONDS.observe(timings.get('db', 0.0), route)
+
+            if request.endpoint in ('emotion.detect_emotion', 'emotion.detect_emotion_binary'):
+                response.headers['Server-Timing'] = metrics.server_timing_header(timings, elapsed)
+            return response
+
+        def session_gauge(field):
+            return lambda: session_store.stats()[field]
+
+        def detector_queue_depth():
+            from emotion_detector import emotion_detector
+            depth = {('frames',): len(frames_in_flight)}
+            batcher = getattr(emotion_detector, 'batcher', None)
+            if batcher is not None:
+                depth[('inference_batch',)] = batcher.qsize()
+            pool = getattr(emotion_detector, 'pool', None)
+            if pool is not None:
+                depth[('detection_pool',)] = pool.health()['pending_jobs']
+            return depth
+
+        metrics.registry.gauge('active_sessions', 'Sessions with Socket.IO state', session_gauge('sessions'))
+        metrics.registry.gauge('active_participants', 'Participants joined to active sessions',
+                               session_gauge('participants'))
+        metrics.registry.gauge('analyzing_sessions', 'Sessions currently analyzing emotions',
+                               session_gauge('analyzing'))
+        metrics.registry.gauge('emotion_broadcast_lagging_connections',
+                               'Therapist connections skipped for backpressure',
+                               lambda: emotion_broadcaster.stats()['lagging'])
+        metrics.registry.gauge('detector_queue_depth', 'Frames or batches waiting for detection',
+                               detector_queue_depth, ('queue',))
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics_endpoint():
+            """Prometheus text exposition of the collected metrics"""
+            return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
     # SocketIO Events for real-time communication
     @socketio.on('connect')
-    def on_connect():
+    def on_connect(auth=None):
         print(f"Client connected: {request.sid}")
-        emit('connected', {'message': 'Connected to server'})
+        requested = (auth or {}).get('encodings') or request.args.get('encoding')
+        encoding = event_encoder.negotiate(request.sid, requested)
+        emit('connected', {'message': 'Connected to server', 'encoding': encoding})
 
     @socketio.on('disconnect')
     def on_disconnect():
         print(f"Client disconnected: {request.sid}")
+        emotion_broadcaster.forget(request.sid)
+        event_encoder.forget(request.sid)
+
+        # Participant using this connection (sid index, no scan of the sessions);
+        # a reconnected user's newer connection is left alone
+        participant = session_store.remove_sid(request.sid)
+        if participant is not None:
+            emit('user_left', {
+                'username': participant['username'],
+                'message': f"{participant['username']} salió de la sesión"
+            }, room=participant['session_code'])
+
+    def session_rooms(session_code, role=None):
+        """Every room (and encoding sub-room) a participant of the session may have joined"""
+        rooms = [session_code]
+        if role:
+            rooms.append(role_room(session_code, role))
+        return rooms + [encoding_room(room, encoding) for room in rooms for encoding in available_encodings()]
 
     @socketio.on('join_session')
     def on_join_session(data):
@@ -88,44 +286,41 @@ def create_app():
         user_role = data['user_role']
         username = data['username']
 
-        join_room(session_code)
-
-        # Initialize session state if not exists
-        if session_code not in active_sessions:
-            active_sessions[session_code] = {
-                'participants': [],
-                'current_question_index': 0,
-                'is_analyzing': False,
-                'analysis_data': None
-            }
+        # Session room and role sub-room (role-targeted events are a single emit),
+        # each with the sub-room of this connection's encoding
+        for room in (event_encoder.rooms(request.sid, session_code) +
+                     event_encoder.rooms(request.sid, role_room(session_code, user_role))):
+            join_room(room)
 
-        # Add participant to session
-        participant_info = {
+        # Add participant to session (creates the session state if not exists
+        # and replaces an existing participant with the same username on reconnection)
+        participants_count, previous_sid = session_store.add_participant(session_code, {
             'username': username,
             'role': user_role,
             'sid': request.sid
-        }
-
-        # Remove existing participant with same username (reconnection)
-        active_sessions[session_code]['participants'] = [
-            p for p in active_sessions[session_code]['participants']
-            if p['username'] != username
-        ]
-        active_sessions[session_code]['participants'].append(participant_info)
+        })
+        if previous_sid:
+            # The old connection of a reconnecting user must stop receiving session events
+            for room in session_rooms(session_code, user_role):
+                try:
+                    leave_room(room, sid=previous_sid)
+                except Exception:
+                    pass
+        session_state = session_store.get(session_code)
 
         emit('user_joined', {
             'username': username,
             'role': user_role,
             'message': f'{username} ({user_role}) se unió a la sesión',
-            'participants_count': len(active_sessions[session_code]['participants'])
+            'participants_count': participants_count
         }, room=session_code)
 
         # Send current session state to new participant
-        emit('session_state_update', {
-            'current_question_index': active_sessions[session_code]['current_question_index'],
-            'is_analyzing': active_sessions[session_code]['is_analyzing'],
-            'participants_count': len(active_sessions[session_code]['participants'])
-        }, room=request.sid)
+        event_encoder.emit('session_state_update', {
+            'current_question_index': session_state['current_question_index'],
+            'is_analyzing': session_state['is_analyzing'],
+            'participants_count': len(session_state['participants'])
+        }, sid=request.sid)
 
         print(f"User {username} ({user_role}) joined session {session_code}")
 
@@ -134,14 +329,10 @@ def create_app():
         session_code = data['session_code']
         username = data['username']
 
-        leave_room(session_code)
-
-        if session_code in active_sessions:
-            # Remove participant from session
-            active_sessions[session_code]['participants'] = [
-                p for p in active_sessions[session_code]['participants']
-                if p['username'] != username
-            ]
+        # Remove participant from session
+        participant = session_store.remove_participant(session_code, username)
+        for room in session_rooms(session_code, participant['role'] if participant else None):
+            leave_room(room)
 
         emit('user_left', {
             'username': username,
@@ -165,26 +356,30 @@ def create_app():
         session_code = data['session_code']
         question_index = data['question_index']
 
-        if session_code in active_sessions:
-            active_sessions[session_code]['current_question_index'] = question_index
-
+        if session_store.set_question_index(session_code, question_index):
             emit('question_index_updated', {
                 'question_index': question_index
             }, room=session_code)
 
+    def session_participant(session_code, roles=('therapist', 'patient')):
+        """Participant of session_code using this connection if its role is allowed, else None"""
+        participant = session_store.lookup_sid(request.sid)
+        if not participant or participant['session_code'] != session_code or participant['role'] not in roles:
+            return None
+        return participant
+
     @socketio.on('start_emotion_analysis')
     def on_start_emotion_analysis(data):
         session_code = data['session_code']
         question_id = data['question_id']
         duration = data['duration']
-        if session_code in active_sessions:
-            active_sessions[session_code]['is_analyzing'] = True
-            active_sessions[session_code]['analysis_data'] = {
-                'question_id': question_id,
-                'duration': duration,
-                'start_time': datetime.now().isoformat(),
-                'emotions_detected': []
-            }
+        if session_participant(session_code, roles=('therapist',)) is None:
+            return {'error': 'Not the therapist of this session'}
+        session_store.start_analysis(session_code, {
+            'question_id': question_id,
+            'duration': duration,
+            'start_time': datetime.now().isoformat()
+        })
 
         emit('emotion_analysis_started', {
             'question_id': question_id,
@@ -197,66 +392,234 @@ def create_app():
         session_code = data['session_code']
         question_id = data['question_id']
         emotion_summary = data.get('emotion_summary', {})
+        if session_participant(session_code) is None:
+            return {'error': 'Not a participant of this session'}
 
-        if session_code in active_sessions:
-            active_sessions[session_code]['is_analyzing'] = False
-            active_sessions[session_code]['analysis_data'] = None
+        analysis_data = session_store.stop_analysis(session_code)
 
-        emit('emotion_analysis_completed', {
+        # Persist the emotions aggregated while the window was open, so the client
+        # does not have to upload them again
+        analysis = None
+        try:
+            analysis = persist_emotion_analysis(session_code, analysis_data, data)
+        except Exception as e:
+            print(f"Error saving emotion analysis for session {session_code}: {str(e)}")
+
+        if analysis is None and analysis_data is None:
+            # Already stopped (e.g. by the other participant)
+            return
+
+        completed = {
             'question_id': question_id,
             'emotion_summary': emotion_summary,
             'message': 'Análisis emocional completado'
-        }, room=session_code)
+        }
+        if analysis is not None:
+            completed['question_id'] = analysis.question_id
+            completed['emotion_summary'] = analysis_response(analysis, analysis.analysis_duration)
+            completed['persisted'] = True
+        event_encoder.emit('emotion_analysis_completed', completed, room=session_code)
+
+    def persist_emotion_analysis(session_code, analysis_data, data):
+        """
+        Write the EmotionAnalysis of a closed analysis window
+
+        Args:
+            session_code (str): Session whose window was closed
+            analysis_data (dict): Data returned by session_store.stop_analysis (None if already closed)
+            data (dict): stop_emotion_analysis payload (question_id, patient_response?, duration?)
+
+        Returns:
+            EmotionAnalysis: The saved row, or None if there was nothing to save
+        """
+        if analysis_data is None:
+            # Window already closed: only attach a late patient response
+            if not data.get('patient_response'):
+                return None
+            analysis = (EmotionAnalysis.query
+                        .join(Question, EmotionAnalysis.question_id == Question.id)
+                        .join(Session, Question.session_id == Session.id)
+                        .filter(EmotionAnalysis.question_id == data['question_id'],
+                                Session.session_code == session_code)
+                        .first())
+            if analysis is None:
+                return None
+            analysis.patient_response = data['patient_response']
+            db.session.commit()
+            return analysis
+
+        aggregate = analysis_data['aggregate']
+        if not aggregate.total_detections:
+            return None
+
+        question = Question.query.get(analysis_data['question_id'])
+        session = Session.query.filter_by(session_code=session_code).first()
+        if not question or not session or question.session_id != session.id:
+            return None
+
+        return save_emotion_analysis(
+            question.id,
+            aggregate.summary(),
+            aggregate.raw_data(),
+            duration=data.get('duration', analysis_data.get('duration', 0)),
+            patient_response=data.get('patient_response', '')
+        )[0]
+
+    def record_emotion(session_code, emotion, confidence):
+        """Store an emotion in the open analysis window and relay it to the therapist"""
+        # Store emotion data in session state (only while an analysis window is open)
+        session_store.append_emotion(session_code, {
+            'emotion': emotion,
+            'confidence': confidence,
+            'timestamp': datetime.now().isoformat()
+        })
+
+        # Only send to therapist, coalesced with the other updates of this tick
+        emotion_broadcaster.publish(session_code, emotion, confidence)
 
     @socketio.on('real_time_emotion')
     def on_real_time_emotion(data):
-        session_code = data['session_code']
-        emotion = data['emotion']
-        confidence = data['confidence']
-
-        # Store emotion data in session state
-        if session_code in active_sessions and active_sessions[session_code]['is_analyzing']:
-            if 'analysis_data' in active_sessions[session_code] and active_sessions[session_code]['analysis_data']:
-                active_sessions[session_code]['analysis_data']['emotions_detected'].append({
-                    'emotion': emotion,
-                    'confidence': confidence,
-                    'timestamp': datetime.now().isoformat()
-                })
-
-        # Only send to therapist
-        session_participants = active_sessions.get(session_code, {}).get('participants', [])
-        therapist_sids = [p['sid'] for p in session_participants if p['role'] == 'therapist']
-
-        for sid in therapist_sids:
-            emit('real_time_emotion', {
-                'emotion': emotion,
-                'confidence': confidence,
-                'timestamp': datetime.now().isoformat()
-            }, room=sid)
+        if session_participant(data['session_code'], roles=('patient',)) is None:
+            return {'error': 'Not the patient of this session'}
+        record_emotion(data['session_code'], data['emotion'], data['confidence'])
+
+    @socketio.on('real_time_emotion_ack')
+    def on_real_time_emotion_ack(data):
+        """Therapist clients ack each batch seq so slow connections get backpressure"""
+        emotion_broadcaster.ack(request.sid, data['session_code'], data['seq'])
+
+    # Server-side detection of frames streamed over the session connection
+    frame_executor = ThreadPoolExecutor(max_workers=app.config['FRAME_WORKERS'], thread_name_prefix='emotion-frame')
+    frames_in_flight = set()
+    frames_lock = threading.Lock()
+
+    def process_emotion_frame(sid, session_code, question_id, image, received_at, deadline_ms):
+        metrics.start_request()
+        try:
+            from emotion_detector import get_emotion_detector
+            detector = get_emotion_detector()
+
+            stream_key = f"{session_code}:{question_id}" if question_id else None
+
+            def detect(degraded):
+                if isinstance(image, (bytes, bytearray)):
+                    return detector.detect_emotion_from_bytes(
+                        bytes(image), largest_face_only=True, stream_key=stream_key, degraded=degraded)
+                return detector.detect_emotion_from_base64(
+                    image, largest_face_only=True, stream_key=stream_key, degraded=degraded)
+
+            # Stale frames are dropped rather than shown late to the therapist
+            result, _ = get_admission_controller().run(detect, deadline_ms=deadline_ms, received_at=received_at)
+
+            if result.get('detected'):
+                record_emotion(session_code, result['emotion'], result['confidence'])
+
+            result['question_id'] = question_id
+            socketio.emit('emotion_frame_result', result, to=sid)
+
+        except DetectionShed as shed:
+            socketio.emit('emotion_frame_result', dict(shed.to_dict(), question_id=question_id), to=sid)
+
+        except Exception as e:
+            socketio.emit('emotion_frame_result', {
+                'error': f'Emotion detection failed: {str(e)}',
+                'detected': False,
+                'question_id': question_id
+            }, to=sid)
+        finally:
+            with frames_lock:
+                frames_in_flight.discard(sid)
+
+    @socketio.on('emotion_frame')
+    def on_emotion_frame(data):
+        """
+        Detect emotion from a frame sent by a session participant.
+        Expects {'session_code', 'question_id', 'image': <bytes or base64 data URL>};
+        the result is pushed back as 'emotion_frame_result' and relayed to the therapist.
+        """
+        session_code = data.get('session_code')
+        image = data.get('image')
+        sid = request.sid
+
+        # Only the patient's frames feed the patient's analysis window
+        if not session_participant(session_code, roles=('patient',)):
+            return {'queued': False, 'error': 'Not the patient of this session'}
+
+        if not image:
+            return {'queued': False, 'error': 'image is required'}
+
+        # Drop the frame if the previous one from this client is still being processed
+        with frames_lock:
+            if sid in frames_in_flight:
+                return {'queued': False, 'dropped': True}
+            frames_in_flight.add(sid)
+
+        frame_executor.submit(process_emotion_frame, sid, session_code, data.get('question_id'), image,
+                              time.monotonic(), parse_deadline_ms(data.get('deadline_ms')))
+        return {'queued': True}
+
+    @socketio.on('detect_emotion_binary')
+    def on_detect_emotion_binary(data):
+        """
+        Detect emotion from a binary frame attachment and answer through the ack callback.
+        Expects {'token', 'image': <bytes>, 'session_id'?, 'question_id'?, 'largest_face_only'?}
+        """
+        try:
+            user_id = decode_token(data['token'])['sub']
+        except Exception:
+            return {'error': 'Invalid token', 'detected': False}
+
+        image_data = data.get('image')
+        if not isinstance(image_data, (bytes, bytearray)) or not image_data:
+            return {'error': 'Binary image attachment is required', 'detected': False}
+
+        try:
+            from emotion_detector import get_emotion_detector
+            detector = get_emotion_detector()
+        except Exception as e:
+            return {'error': f'Emotion detector not available: {str(e)}', 'detected': False}
+
+        stream_key = None
+        if data.get('session_id') and data.get('question_id'):
+            stream_key = f"{user_id}:{data['session_id']}:{data['question_id']}"
+
+        try:
+            result, _ = get_admission_controller().run(
+                lambda degraded: detector.detect_emotion_from_bytes(
+                    bytes(image_data),
+                    largest_face_only=bool(data.get('largest_face_only', False)),
+                    stream_key=stream_key,
+                    degraded=degraded
+                ),
+                deadline_ms=parse_deadline_ms(data.get('deadline_ms'))
+            )
+            return result
+        except DetectionShed as shed:
+            return shed.to_dict()
 
     # WebRTC signaling with better STUN/TURN configuration
     @socketio.on('webrtc_offer')
     def on_webrtc_offer(data):
         session_code = data['session_code']
-        emit('webrtc_offer', data, room=session_code, include_self=False)
+        event_encoder.emit('webrtc_offer', data, room=session_code, skip_sid=request.sid)
 
     @socketio.on('webrtc_answer')
     def on_webrtc_answer(data):
         session_code = data['session_code']
-        emit('webrtc_answer', data, room=session_code, include_self=False)
+        event_encoder.emit('webrtc_answer', data, room=session_code, skip_sid=request.sid)
 
     @socketio.on('webrtc_ice_candidate')
     def on_webrtc_ice_candidate(data):
         session_code = data['session_code']
-        emit('webrtc_ice_candidate', data, room=session_code, include_self=False)
+        event_encoder.emit('webrtc_ice_candidate', data, room=session_code, skip_sid=request.sid)
 
     @socketio.on('session_completed')
     def on_session_completed(data):
         session_code = data['session_code']
 
         # Clean up session state
-        if session_code in active_sessions:
-            del active_sessions[session_code]
+        session_store.delete(session_code)
+        emotion_broadcaster.discard(session_code)
 
         emit('session_completed', {
             'message': 'La sesión ha sido completada por el terapeuta'
@@ -271,7 +634,6 @@ def create_app():
         socketio.start_background_task(lambda: socketio.sleep(3) or disconnect_participants())
 
     app.socketio = socketio
-    app.active_sessions = active_sessions
     return app
 
 
@@ -295,8 +657,11 @@ if __name__ == '__main__':
     print("   GET  /api/sessions")
     print("   POST /api/sessions/join/<code>")
     print("   POST /api/detect-emotion")
+    print("   POST /api/detect-emotion/binary")
     print("   POST /api/realtime/continuous-emotion")
-    print("   GET  /api/health")
+    print("   GET  /api/health/live")
+    print("   GET  /api/health/ready")
+    print("   GET  /metrics")
 
     # Use better configuration for production
     app.socketio.run(
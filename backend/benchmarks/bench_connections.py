@@ -0,0 +1,257 @@
+"""
+Socket.IO connection-scaling benchmark across server modes
+
+For each server mode (threading on the Werkzeug server, gevent as started
+by server.py) boots the app in a subprocess on in-memory SQLite with the
+stub detector, opens increasing numbers of idle WebSocket connections and
+reports, at every step, the server's RSS and OS thread count, the time to
+open the connections, and the latency of a Socket.IO event round trip
+(emit with ack) and of an HTTP health check while they are connected.
+
+Usage (from backend/):
+    python -m benchmarks.bench_connections --modes threading,gevent --connections 100,500,1000
+    python -m benchmarks.bench_connections --connections 2000 --json connections.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+def serve(mode, port):
+    """Server subprocess: patch for the mode first, then build and run the app"""
+    from server_mode import patch_for_async_mode
+    patch_for_async_mode(mode)
+
+    from benchmarks.load_test import build_app
+    app = build_app('memory', 0, {'SOCKETIO_ASYNC_MODE': mode, 'METRICS_ENABLED': False})
+    app.socketio.run(app, host='127.0.0.1', port=port, debug=False, use_reloader=False, log_output=False,
+                     allow_unsafe_werkzeug=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_stats(pid):
+    """RSS (MB) and OS thread count of a process, from /proc"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    stats['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith('Threads:'):
+                    stats['threads'] = int(line.split()[1])
+    except OSError:
+        pass
+    return stats
+
+
+def http_get_ms(port, path='/api/health/live'):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    start = time.perf_counter()
+    connection.request('GET', path)
+    connection.getresponse().read()
+    connection.close()
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_for_server(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            http_get_ms(port)
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class SocketIOConnection:
+    """Minimal Socket.IO v5 client over a raw Engine.IO WebSocket"""
+
+    def __init__(self, port):
+        import simple_websocket
+        self.ws = simple_websocket.Client.connect(f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket')
+        # Not waiting for the Engine.IO open packet: simple_websocket can hold
+        # a frame that came with the handshake until more data arrives
+        self.ws.send('40')
+        self._expect(lambda message: message.startswith('40'))
+        self._ack_id = 0
+
+    def _expect(self, predicate, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            message = self.ws.receive(timeout=max(0.0, deadline - time.monotonic()))
+            if message is None:
+                continue
+            if message == '2':
+                self.ws.send('3')
+            elif predicate(message):
+                return message
+        raise TimeoutError('No answer from the server')
+
+    def keepalive(self):
+        """Answer pending Engine.IO pings and discard other messages"""
+        while True:
+            message = self.ws.receive(timeout=0)
+            if message is None:
+                return
+            if message == '2':
+                self.ws.send('3')
+
+    def call(self, event, data):
+        """Emit an event with an ack and wait for the answer"""
+        self._ack_id += 1
+        prefix = f'43{self._ack_id}'
+        self.ws.send(f'42{self._ack_id}' + json.dumps([event, data]))
+        return self._expect(lambda message: message.startswith(prefix))
+
+    def close(self):
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+def open_connections(port, count, connections):
+    """Open connections until there are count of them (in parallel batches)"""
+    errors = []
+    lock = threading.Lock()
+
+    def worker(n):
+        for _ in range(n):
+            try:
+                connection = SocketIOConnection(port)
+                with lock:
+                    connections.append(connection)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    missing = count - len(connections)
+    threads = [threading.Thread(target=worker, args=(missing // 16 + (1 if i < missing % 16 else 0),))
+               for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)), 3) if latencies else None
+
+
+def bench_mode(mode, steps, probes):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_connections', '--serve', '--mode', mode, '--port', str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    results = {'mode': mode, 'steps': []}
+    connections = []
+    stop = threading.Event()
+
+    def keepalive():
+        while not stop.wait(1.0):
+            for connection in list(connections):
+                try:
+                    connection.keepalive()
+                except Exception:
+                    pass
+
+    try:
+        if not wait_for_server(port):
+            results['error'] = 'Server did not start'
+            return results
+        results['idle'] = process_stats(server.pid)
+        threading.Thread(target=keepalive, daemon=True).start()
+
+        for count in steps:
+            start = time.perf_counter()
+            errors = open_connections(port, count, connections)
+            open_s = time.perf_counter() - start
+            time.sleep(1.0)
+
+            # Fresh probe connection each step (an idle one would miss the Engine.IO pings)
+            probe = SocketIOConnection(port)
+            ack_ms, http_ms = [], []
+            for _ in range(probes):
+                t = time.perf_counter()
+                probe.call('emotion_frame', {'session_code': 'bench'})
+                ack_ms.append((time.perf_counter() - t) * 1000)
+                http_ms.append(http_get_ms(port))
+            probe.close()
+
+            step = dict(process_stats(server.pid), **{
+                'connections': len(connections),
+                'connect_errors': len(errors),
+                'open_s': round(open_s, 3),
+                'ack_p50_ms': percentile_ms(ack_ms, 50),
+                'ack_p95_ms': percentile_ms(ack_ms, 95),
+                'http_p50_ms': percentile_ms(http_ms, 50),
+                'http_p95_ms': percentile_ms(http_ms, 95)
+            })
+            results['steps'].append(step)
+            print(f"🔌 {mode:<9} {step['connections']:>5} conns ({step['connect_errors']} errors, "
+                  f"{step['open_s']:.1f}s)  rss {step.get('rss_mb', 0):>7.1f} MB  threads {step.get('threads', 0):>5}  "
+                  f"ack p50 {step['ack_p50_ms']:.2f} p95 {step['ack_p95_ms']:.2f} ms  "
+                  f"http p50 {step['http_p50_ms']:.2f} ms")
+    finally:
+        stop.set()
+        for connection in connections:
+            connection.close()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO connection-scaling benchmark')
+    parser.add_argument('--modes', default='threading,gevent', help='Server modes to compare')
+    parser.add_argument('--connections', default='100,500,1000', help='Idle connection counts to step through')
+    parser.add_argument('--probes', type=int, default=100, help='Ack and HTTP round trips timed per step')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', default='threading', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.mode, args.port)
+        return
+
+    steps = sorted(int(n) for n in args.connections.split(',') if n.strip())
+    results = [bench_mode(mode.strip(), steps, args.probes) for mode in args.modes.split(',') if mode.strip()]
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'python': platform.python_version(),
+                    'cpu_count': os.cpu_count(),
+                    'probes': args.probes,
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                },
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Face detection latency/recall tradeoff per working width
+
+Runs the cascade on every image at several detection working widths and
+compares the boxes against a reference full-resolution, fine-grained scan.
+
+Usage (from backend/):
+    python -m benchmarks.bench_detection path/to/frames --widths 0,640,480,320,240
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from face_detection import FaceDetector
+from face_tracker import _iou
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def load_frames(path):
+    """Load grayscale frames from an image directory or a video file"""
+    if os.path.isdir(path):
+        frames = []
+        for filename in sorted(os.listdir(path)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(os.path.join(path, filename), cv2.IMREAD_GRAYSCALE)
+                if image is not None:
+                    frames.append(image)
+        return frames
+
+    frames = []
+    cap = cv2.VideoCapture(path)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return frames
+
+
+def recall(reference, detected, threshold=0.4):
+    """Fraction of reference faces matched by a detected box"""
+    if not reference:
+        return None
+    matched = sum(1 for ref in reference if any(_iou(ref, box) >= threshold for box in detected))
+    return matched / len(reference)
+
+
+def run_setting(name, detect_fn, frames, references, repeat):
+    latencies = []
+    recalls = []
+    for frame, reference in zip(frames, references):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            faces = detect_fn(frame)
+            latencies.append((time.perf_counter() - start) * 1000)
+        frame_recall = recall(reference, [tuple(int(v) for v in f) for f in faces])
+        if frame_recall is not None:
+            recalls.append(frame_recall)
+
+    return {
+        'setting': name,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'mean_ms': round(float(np.mean(latencies)), 3),
+        'recall': round(float(np.mean(recalls)), 4) if recalls else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Face detection latency/recall per working width')
+    parser.add_argument('source', help='Directory of frames or a video file')
+    parser.add_argument('--cascade', default=Config.CASCADE_PATH)
+    parser.add_argument('--widths', default='0,640,480,320,240,160', help='Working widths to test (0 = full resolution)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per frame')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.source)
+    if not frames:
+        raise SystemExit(f"No frames found in {args.source}")
+
+    cascade = cv2.CascadeClassifier(args.cascade)
+
+    # Reference: full resolution, fine-grained scan
+    references = [
+        [tuple(int(v) for v in f) for f in cascade.detectMultiScale(frame, scaleFactor=1.05, minNeighbors=5, minSize=(20, 20))]
+        for frame in frames
+    ]
+    print(f"📂 {len(frames)} frames, {sum(len(r) for r in references)} reference faces")
+
+    results = [run_setting(
+        'legacy (full res, 1.3/5/30px)',
+        lambda frame: cascade.detectMultiScale(frame, scaleFactor=1.3, minNeighbors=5, minSize=(30, 30)),
+        frames, references, args.repeat
+    )]
+
+    for width in [int(w) for w in args.widths.split(',') if w.strip()]:
+        detector = FaceDetector(args.cascade, working_width=width)
+        name = f'adaptive width={width or "full"}'
+        results.append(run_setting(name, detector.detect, frames, references, args.repeat))
+
+    print(f"{'setting':<32} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'recall':>8}")
+    for result in results:
+        recall_text = f"{result['recall']:.3f}" if result['recall'] is not None else 'n/a'
+        print(f"{result['setting']:<32} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['mean_ms']:>9.2f} {recall_text:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'frames': len(frames), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+EmotionDetector micro-benchmarks per pipeline stage
+
+Drives the detector with synthetic frames (and optional fixture face
+images pasted into them) at several resolutions and face counts, and
+reports p50/p95/p99 latency and throughput separately for base64 decode,
+color conversion, cascade detection, preprocessing and inference, plus the
+end-to-end detect_emotion_from_base64 call.
+
+Runs without the production weights: --model random uses a tiny randomly
+initialized numpy model and --model tiny-keras a tiny randomly initialized
+Keras CNN. Pass a model path with --backend to measure a real artifact.
+
+Usage (from backend/):
+    python -m benchmarks.bench_detector --model random --json bench.json
+    python -m benchmarks.bench_detector --model models/model_weights.h5 --backend keras --fixtures faces/
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_detection import IMAGE_EXTENSIONS
+from config import Config
+from emotion_detector import EMOTION_LABELS, EmotionDetector
+
+RESOLUTIONS = {
+    '240p': (320, 240),
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080)
+}
+
+
+class TinyRandomModel:
+    """Randomly initialized two-layer numpy model with the production input/output shapes"""
+
+    name = 'random'
+
+    def __init__(self, hidden=64, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.standard_normal((48 * 48, hidden)).astype(np.float32) * 0.02
+        self.w2 = rng.standard_normal((hidden, len(EMOTION_LABELS))).astype(np.float32) * 0.1
+
+    def predict(self, batch):
+        hidden = np.maximum(batch.reshape(len(batch), -1) @ self.w1, 0)
+        logits = hidden @ self.w2
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+class TinyKerasModel:
+    """Randomly initialized small Keras CNN, to include TensorFlow overhead without the weights"""
+
+    name = 'tiny-keras'
+
+    def __init__(self):
+        import tensorflow as tf
+
+        self.model = tf.keras.Sequential([
+            tf.keras.layers.Input((48, 48, 1)),
+            tf.keras.layers.Conv2D(8, 3, activation='relu'),
+            tf.keras.layers.MaxPooling2D(4),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(len(EMOTION_LABELS), activation='softmax')
+        ])
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+def load_fixture_faces(path):
+    """Grayscale face crops used to paste realistic faces into synthetic frames"""
+    faces = []
+    if path and os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(os.path.join(path, filename), cv2.IMREAD_GRAYSCALE)
+                if image is not None:
+                    faces.append(image)
+    return faces
+
+
+def make_frame(width, height, num_faces, fixtures, rng):
+    """
+    Synthetic BGR frame with num_faces face regions laid out in a row
+
+    Returns:
+        tuple: (BGR frame, list of (x, y, w, h) face boxes)
+    """
+    frame = rng.integers(40, 200, size=(height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (9, 9), 0)
+
+    boxes = []
+    if num_faces:
+        size = min(height // 2, width // (num_faces + 1))
+        for i in range(num_faces):
+            x = int((i + 0.5) * width / num_faces - size / 2)
+            y = (height - size) // 2
+            if fixtures:
+                face = cv2.resize(fixtures[i % len(fixtures)], (size, size))
+                frame[y:y + size, x:x + size] = face[:, :, None]
+            else:
+                cv2.ellipse(frame, (x + size // 2, y + size // 2), (size // 3, size // 2 - 2),
+                            0, 0, 360, (180, 160, 150), -1)
+            boxes.append((x, y, size, size))
+    return frame, boxes
+
+
+def time_stage(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(latencies, items=1):
+    mean = float(np.mean(latencies))
+    return {
+        'n': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4),
+        'mean_ms': round(mean, 4),
+        # Calls (or faces, for per-face stages) per second on one thread
+        'throughput_per_s': round(items * 1000 / mean, 2) if mean > 0 else None
+    }
+
+
+def bench_case(detector, frame, boxes, repeat, quality):
+    """Time every pipeline stage on one frame"""
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    image_base64 = 'data:image/jpeg;base64,' + base64.b64encode(encoded.tobytes()).decode()
+    image_data = encoded.tobytes()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    batch = detector._build_face_batch(gray, boxes) if boxes else None
+    faces_per_call = max(1, len(boxes))
+
+    stages = {
+        'base64_decode': (lambda: base64.b64decode(image_base64.split(',')[1]), 1),
+        'image_decode': (lambda: detector._decode_grayscale(image_data), 1),
+        'color_conversion': (lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1),
+        'cascade_detection': (lambda: detector._detect_faces(gray), 1),
+        'end_to_end': (lambda: detector.detect_emotion_from_base64(image_base64), 1)
+    }
+    if boxes:
+        stages['preprocessing'] = (lambda: detector._build_face_batch(gray, boxes), faces_per_call)
+        stages['inference'] = (lambda: detector.model.predict(batch), faces_per_call)
+
+    results = {}
+    for stage, (fn, items) in stages.items():
+        results[stage] = summarize(time_stage(fn, repeat), items)
+    results['cascade_detection']['faces_found'] = len(detector._detect_faces(gray))
+    results['payload_bytes'] = len(image_base64)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EmotionDetector per-stage latency benchmark')
+    parser.add_argument('--model', default='random', help="'random', 'tiny-keras' or a model file path")
+    parser.add_argument('--backend', default=Config.MODEL_BACKEND, help='Backend for a model file path')
+    parser.add_argument('--cascade', default=Config.CASCADE_PATH)
+    parser.add_argument('--resolutions', default='240p,480p,720p,1080p', help=f"Any of {', '.join(RESOLUTIONS)}")
+    parser.add_argument('--faces', default='0,1,3', help='Face counts per frame')
+    parser.add_argument('--fixtures', default=None, help='Directory of face images pasted into the frames')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per stage')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality of the encoded frames')
+    parser.add_argument('--detection-width', type=int, default=Config.DETECTION_WIDTH)
+    parser.add_argument('--decode-width', type=int, default=Config.DECODE_WIDTH)
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.model == 'random':
+        model = TinyRandomModel()
+    elif args.model == 'tiny-keras':
+        model = TinyKerasModel()
+    else:
+        model = None
+
+    detector = EmotionDetector(
+        args.model, args.cascade,
+        backend=args.backend,
+        decode_width=args.decode_width,
+        detection_width=args.detection_width,
+        frame_cache_distance=-1,
+        model=model
+    )
+    fixtures = load_fixture_faces(args.fixtures)
+    rng = np.random.default_rng(0)
+
+    results = []
+    for resolution in [r.strip() for r in args.resolutions.split(',') if r.strip()]:
+        width, height = RESOLUTIONS[resolution]
+        for num_faces in [int(n) for n in args.faces.split(',') if n.strip()]:
+            frame, boxes = make_frame(width, height, num_faces, fixtures, rng)
+            stages = bench_case(detector, frame, boxes, args.repeat, args.quality)
+            results.append({'resolution': resolution, 'faces': num_faces, 'stages': stages})
+
+            print(f"📐 {resolution} ({width}x{height}), {num_faces} face(s), {stages['payload_bytes']} bytes base64")
+            for stage, stats in stages.items():
+                if stage == 'payload_bytes':
+                    continue
+                print(f"   {stage:<18} p50 {stats['p50_ms']:>8.3f}  p95 {stats['p95_ms']:>8.3f}  "
+                      f"p99 {stats['p99_ms']:>8.3f} ms  {stats['throughput_per_s'] or 0:>10.1f}/s")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'model': args.model,
+            'backend': getattr(model, 'name', args.backend),
+            'detection_width': args.detection_width,
+            'decode_width': args.decode_width,
+            'fixtures': len(fixtures),
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
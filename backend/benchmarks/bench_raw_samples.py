@@ -0,0 +1,166 @@
+"""
+Raw emotion samples storage benchmark: JSON column vs packed emotion_samples
+
+For analyses of several lengths, reports the stored bytes and the
+encode/decode time of raw_data as the former JSON column and as the packed
+columnar blob (with and without the 7-probability vectors). Then seeds a
+SQLite database with the same analyses stored both ways and times the
+timeline-style read (questions of a session with their emotion_analysis)
+with raw_data loaded eagerly, as before, and with the deferred layout.
+
+Usage (from backend/):
+    python -m benchmarks.bench_raw_samples --samples 60,600 --analyses 400 --json raw_samples.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from emotion_detector import EMOTION_LABELS
+from emotion_samples import pack_samples, unpack_samples, to_raw_data
+from benchmarks.load_test import build_app
+
+
+def raw_data_sample(count, rng, probabilities=False):
+    """Samples in the shape clients post (ISO timestamps with ms, one per second)"""
+    start = datetime(2026, 1, 1, 10, 0, 0)
+    raw_data = []
+    for i in range(count):
+        sample = {
+            'emotion': rng.choice(EMOTION_LABELS),
+            'confidence': round(rng.uniform(0.3, 0.99), 3),
+            'timestamp': (start + timedelta(milliseconds=1000 * i + rng.randint(0, 50)))
+            .isoformat(timespec='milliseconds') + 'Z'
+        }
+        if probabilities:
+            weights = [rng.random() for _ in EMOTION_LABELS]
+            sample['all_emotions'] = {label: round(w / sum(weights), 3) for label, w in zip(EMOTION_LABELS, weights)}
+        raw_data.append(sample)
+    return raw_data
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def bench_encoding(count, rng, repeat, probabilities=False):
+    raw_data = raw_data_sample(count, rng, probabilities)
+    encoded_json = json.dumps(raw_data)
+    blob = pack_samples(raw_data)
+    return {
+        'json_bytes': len(encoded_json.encode()),
+        'packed_bytes': len(blob),
+        'size_ratio': round(len(blob) / len(encoded_json.encode()), 4),
+        'json_encode_us': round(per_call_us(lambda: json.dumps(raw_data), repeat), 2),
+        'json_decode_us': round(per_call_us(lambda: json.loads(encoded_json), repeat), 2),
+        'pack_us': round(per_call_us(lambda: pack_samples(raw_data), repeat), 2),
+        'unpack_arrays_us': round(per_call_us(lambda: unpack_samples(blob), repeat), 2),
+        'unpack_dicts_us': round(per_call_us(lambda: to_raw_data(unpack_samples(blob)), repeat), 2)
+    }
+
+
+def bench_reads(analyses, samples, repeat):
+    """Time loading every question of a session with its analysis, legacy JSON vs packed"""
+    from sqlalchemy import func
+    from sqlalchemy.orm import joinedload
+    from models import db, User, Session, Question, EmotionAnalysis, EmotionSamples
+
+    path = os.path.join(tempfile.mkdtemp(prefix='therapy-raw-'), 'raw.db')
+    app = build_app(path, 0, {'METRICS_ENABLED': False, 'SESSION_GC_INTERVAL': 0})
+    rng = random.Random(1)
+    with app.app_context():
+        db.create_all()
+        therapist = User(username='t', email='t@bench.test', role='therapist', password_hash='x')
+        db.session.add(therapist)
+        db.session.flush()
+
+        session_ids = {}
+        for layout in ('json', 'packed'):
+            session = Session(therapist_id=therapist.id, session_code=f'RAW{layout}')
+            db.session.add(session)
+            db.session.flush()
+            session_ids[layout] = session.id
+            for n in range(analyses):
+                question = Question(session_id=session.id, text=f'Question {n + 1}', order_num=n + 1)
+                analysis = EmotionAnalysis(question=question, dominant_emotion='Happy', total_detections=samples)
+                raw_data = raw_data_sample(samples, rng)
+                if layout == 'json':
+                    analysis.raw_data = raw_data
+                else:
+                    analysis.set_raw_data(raw_data)
+                db.session.add(question)
+        db.session.commit()
+
+        json_bytes = db.session.query(func.sum(func.length(EmotionAnalysis.raw_data))).scalar() or 0
+        packed_bytes = db.session.query(func.sum(func.length(EmotionSamples.data))).scalar() or 0
+
+        def load(layout, eager_raw_data):
+            db.session.expunge_all()
+            options = joinedload(Question.emotion_analysis)
+            if eager_raw_data:
+                options = options.undefer(EmotionAnalysis.raw_data)
+            questions = Question.query.options(options).filter_by(session_id=session_ids[layout]).all()
+            return [q.emotion_analysis.to_dict() for q in questions]
+
+        results = {
+            'analyses': analyses,
+            'samples_per_analysis': samples,
+            'stored_json_bytes': json_bytes,
+            'stored_packed_bytes': packed_bytes,
+            'timeline_ms': {
+                'json_column_eager': round(per_call_us(lambda: load('json', True), repeat) / 1000, 3),
+                'json_column_deferred': round(per_call_us(lambda: load('json', False), repeat) / 1000, 3),
+                'packed': round(per_call_us(lambda: load('packed', False), repeat) / 1000, 3)
+            }
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw emotion samples storage benchmark')
+    parser.add_argument('--samples', default='60,600', help='Samples per analysis to measure')
+    parser.add_argument('--analyses', type=int, default=400, help='Analyses per layout in the read benchmark')
+    parser.add_argument('--repeat', type=int, default=200, help='Encodes/decodes timed per case')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    counts = [int(n) for n in args.samples.split(',') if n.strip()]
+    encoding = {}
+    for count in counts:
+        for probabilities in (False, True):
+            name = f'{count} samples' + (' + probabilities' if probabilities else '')
+            encoding[name] = r = bench_encoding(count, rng, args.repeat, probabilities)
+            print(f"📦 {name:<28} json {r['json_bytes']:>7} B | packed {r['packed_bytes']:>6} B "
+                  f"({r['size_ratio']:.1%})  pack {r['pack_us']:>8.1f} us  unpack {r['unpack_arrays_us']:>6.1f} us "
+                  f"(dicts {r['unpack_dicts_us']:.1f} us, json.loads {r['json_decode_us']:.1f} us)")
+
+    reads = bench_reads(args.analyses, counts[0], max(1, args.repeat // 20))
+    t = reads['timeline_ms']
+    print(f"🗄️ {reads['analyses']} analyses x {reads['samples_per_analysis']} samples: stored "
+          f"{reads['stored_json_bytes'] / 1024:.0f} KB JSON vs {reads['stored_packed_bytes'] / 1024:.0f} KB packed; "
+          f"timeline read {t['json_column_eager']:.1f} ms (JSON loaded) / {t['json_column_deferred']:.1f} ms "
+          f"(JSON deferred) / {t['packed']:.1f} ms (packed)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'repeat': args.repeat,
+                    'python': platform.python_version(),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                },
+                'encoding': encoding,
+                'reads': reads
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
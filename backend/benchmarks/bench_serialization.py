@@ -0,0 +1,158 @@
+"""
+Socket.IO event serialization benchmark: JSON vs compact msgpack
+
+Encodes representative session events (coalesced real_time_emotion batches
+of several sizes, session_state_update, emotion_analysis_completed and a
+WebRTC ICE candidate relay) as full Socket.IO packets, the way
+python-socketio puts them on the wire, and reports bytes per event and
+encode/decode time per event for the current JSON format and for the
+msgpack schema of event_codec (the ICE candidate shows why events without
+a schema stay JSON).
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --repeat 20000 --json serialization.json
+"""
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime
+
+from socketio import packet
+
+import event_codec
+from emotion_detector import EMOTION_LABELS
+
+
+def emotion_batch(size, rng):
+    now = time.time()
+    series = [[rng.choice(EMOTION_LABELS), round(rng.random(), 3), i * 250 // max(1, size)] for i in range(size)]
+    return {
+        'emotion': series[-1][0],
+        'confidence': rng.random(),
+        'timestamp': datetime.fromtimestamp(now).isoformat(),
+        'series': series,
+        'seq': rng.randint(1, 10000),
+        'dropped': 0
+    }
+
+
+def sample_events(rng):
+    counts = {label: rng.randint(0, 30) for label in EMOTION_LABELS}
+    return {
+        'real_time_emotion (1 value)': ('real_time_emotion', emotion_batch(1, rng)),
+        'real_time_emotion (5 values)': ('real_time_emotion', emotion_batch(5, rng)),
+        'real_time_emotion (20 values)': ('real_time_emotion', emotion_batch(20, rng)),
+        'session_state_update': ('session_state_update', {
+            'current_question_index': 3, 'is_analyzing': True, 'participants_count': 2
+        }),
+        'emotion_analysis_completed': ('emotion_analysis_completed', {
+            'question_id': 1234,
+            'emotion_summary': {
+                'id': 987, 'dominant_emotion': 'Happy', 'dominant_percentage': 41.18, 'avg_confidence': 0.734,
+                'total_detections': sum(counts.values()), 'emotion_counts': counts, 'duration': 30
+            },
+            'message': 'Análisis emocional completado',
+            'persisted': True
+        }),
+        'webrtc_ice_candidate': ('webrtc_ice_candidate', {
+            'session_code': 'AB12CD34',
+            'candidate': {
+                'candidate': 'candidate:842163049 1 udp 1677729535 203.0.113.7 53412 typ srflx '
+                             'raddr 192.168.1.20 rport 53412 generation 0 ufrag Xk3a network-cost 999',
+                'sdpMid': '0', 'sdpMLineIndex': 0
+            }
+        })
+    }
+
+
+def wire_size(encoded):
+    """Bytes on the wire of an encoded packet (text packet plus binary attachments)"""
+    if isinstance(encoded, list):
+        return sum(len(part.encode() if isinstance(part, str) else part) for part in encoded)
+    return len(encoded.encode())
+
+
+def encode_json(event, payload):
+    return packet.Packet(packet.EVENT, data=[event, payload]).encode()
+
+
+def decode_json(encoded):
+    return packet.Packet(encoded_packet=encoded).data
+
+
+def encode_msgpack(event, payload):
+    return packet.Packet(packet.EVENT, data=[event, event_codec.pack(event, payload)]).encode()
+
+
+def decode_msgpack(encoded):
+    header, attachment = encoded
+    pkt = packet.Packet(encoded_packet=header)
+    pkt.add_attachment(attachment)
+    event, data = pkt.data
+    return event_codec.unpack(event, data)
+
+
+def per_event_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def bench_event(event, payload, repeat):
+    results = {}
+    formats = {'json': (encode_json, decode_json)}
+    if event_codec.msgpack is not None:
+        formats['msgpack'] = (encode_msgpack, decode_msgpack)
+
+    for name, (encode, decode) in formats.items():
+        encoded = encode(event, payload)
+        results[name] = {
+            'bytes': wire_size(encoded),
+            'encode_us': round(per_event_us(lambda: encode(event, payload), repeat), 3),
+            'decode_us': round(per_event_us(lambda: decode(encoded), repeat), 3)
+        }
+    if 'msgpack' in results:
+        results['msgpack']['size_ratio'] = round(results['msgpack']['bytes'] / results['json']['bytes'], 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO event serialization benchmark')
+    parser.add_argument('--repeat', type=int, default=20000, help='Encodes/decodes timed per event and format')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if event_codec.msgpack is None:
+        print("⚠️ msgpack is not installed, only the JSON format is measured")
+
+    rng = random.Random(0)
+    results = {}
+    for name, (event, payload) in sample_events(rng).items():
+        results[name] = bench_event(event, payload, args.repeat)
+
+        line = f"📦 {name:<30} json {results[name]['json']['bytes']:>5} B " \
+               f"enc {results[name]['json']['encode_us']:>7.2f} us dec {results[name]['json']['decode_us']:>7.2f} us"
+        if 'msgpack' in results[name]:
+            m = results[name]['msgpack']
+            line += f" | msgpack {m['bytes']:>5} B ({m['size_ratio']:.0%}) " \
+                    f"enc {m['encode_us']:>7.2f} us dec {m['decode_us']:>7.2f} us"
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'repeat': args.repeat,
+                    'python': platform.python_version(),
+                    'msgpack': '.'.join(map(str, event_codec.msgpack.version)) if event_codec.msgpack else None,
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                },
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
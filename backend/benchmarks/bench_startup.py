@@ -0,0 +1,102 @@
+"""
+Startup time guard
+
+Builds the app in a fresh interpreter and measures how long create_app()
+takes and how long the background detector load and warm-up take to report
+ready. Whether TensorFlow is imported on the request path is checked in a
+separate cold start with EMOTION_DETECTOR_ENABLED=false, where no loader
+thread can import it behind create_app()'s back.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --max-startup-s 3 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBE = r'''
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+startup_s = time.perf_counter() - start
+tf_at_startup = 'tensorflow' in sys.modules
+rss_startup_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+from emotion_detector import get_detector_status
+deadline = time.perf_counter() + float(sys.argv[1])
+while get_detector_status()['state'] in ('loading', 'warming_up') and time.perf_counter() < deadline:
+    time.sleep(0.05)
+status = get_detector_status()
+
+print(json.dumps({
+    'startup_s': round(startup_s, 3),
+    'tensorflow_imported_at_startup': tf_at_startup,
+    'rss_startup_mb': round(rss_startup_mb, 1),
+    'time_to_ready_s': round(time.perf_counter() - start, 3) if status['state'] == 'ready' else None,
+    'rss_ready_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    'detector': status
+}))
+'''
+
+
+def run_probe(ready_timeout, detector_enabled=True):
+    """Run one cold start in a subprocess and return its measurements"""
+    env = dict(os.environ, EMOTION_DETECTOR_ENABLED='true' if detector_enabled else 'false')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, str(ready_timeout)],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app startup and detector time-to-ready')
+    parser.add_argument('--runs', type=int, default=3, help='Cold starts to measure')
+    parser.add_argument('--ready-timeout', type=float, default=120, help='Seconds to wait for the detector')
+    parser.add_argument('--max-startup-s', type=float, default=None, help='Fail if create_app() is slower than this')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    # With the detector on, its loader thread may import TensorFlow before the
+    # probe looks, so the import check gets a cold start of its own
+    tf_at_startup = run_probe(0, detector_enabled=False)['tensorflow_imported_at_startup']
+    runs = [run_probe(args.ready_timeout) for _ in range(args.runs)]
+    for run in runs:
+        del run['tensorflow_imported_at_startup']
+    startup = sorted(run['startup_s'] for run in runs)
+    ready = sorted(run['time_to_ready_s'] for run in runs if run['time_to_ready_s'] is not None)
+    summary = {
+        'runs': runs,
+        'tensorflow_imported_at_startup': tf_at_startup,
+        'startup_median_s': startup[len(startup) // 2],
+        'time_to_ready_median_s': ready[len(ready) // 2] if ready else None
+    }
+
+    print(f"{'run':<5} {'startup s':>10} {'ready s':>9} {'RSS start':>10} {'RSS ready':>10}")
+    for i, run in enumerate(runs):
+        ready_text = f"{run['time_to_ready_s']:.2f}" if run['time_to_ready_s'] is not None else run['detector']['state']
+        print(f"{i:<5} {run['startup_s']:>10.2f} {ready_text:>9} {run['rss_startup_mb']:>10.1f} "
+              f"{run['rss_ready_mb']:>10.1f}")
+    print(f"TensorFlow imported by create_app(): {tf_at_startup}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    if tf_at_startup:
+        failures.append('TensorFlow was imported during create_app()')
+    if args.max_startup_s is not None and summary['startup_median_s'] > args.max_startup_s:
+        failures.append(f"startup {summary['startup_median_s']}s exceeds {args.max_startup_s}s")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
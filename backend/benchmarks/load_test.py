@@ -0,0 +1,389 @@
+"""
+End-to-end HTTP load test against a local SQLite stand-in
+
+Boots create_app() on SQLite (a temporary file or in-memory) with a stub
+emotion detector, seeds users, sessions, questions and EmotionAnalysis rows,
+serves it with a threaded HTTP server and replays the client request mix
+(login, session listing, continuous-emotion posts, timeline and dashboard
+reads, frame detection) at a configurable concurrency. Reports throughput
+and latency percentiles per endpoint.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --therapists 20 --patients 100 --concurrency 16 --duration 30
+    python -m benchmarks.load_test --db memory --json load.json
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+from sqlalchemy.pool import StaticPool
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from emotion_detector import EMOTION_LABELS, BaseEmotionDetector, set_emotion_detector
+
+PASSWORD = 'loadtest-password'
+
+# Relative weights of the replayed client mix
+REQUEST_MIX = {
+    'login': 2,
+    'sessions_list': 25,
+    'continuous_emotion': 25,
+    'emotion_timeline': 20,
+    'dashboard': 15,
+    'detect_emotion': 13
+}
+
+
+class StubEmotionDetector(BaseEmotionDetector):
+    """Detector that decodes frames normally but returns a random emotion instead of running the model"""
+
+    def __init__(self, latency_ms=0.0):
+        super().__init__()
+        self.latency_ms = latency_ms
+
+    def detect_emotion_from_gray(self, gray, largest_face_only=False, scale=1.0, stream_key=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        probabilities = np.random.dirichlet(np.ones(len(EMOTION_LABELS)))
+        index = int(np.argmax(probabilities))
+        height, width = gray.shape[:2]
+        return {
+            'detected': True,
+            'emotion': EMOTION_LABELS[index],
+            'confidence': float(probabilities[index]),
+            'face_coordinates': {'x': int(width * scale) // 4, 'y': int(height * scale) // 4,
+                                 'width': int(width * scale) // 2, 'height': int(height * scale) // 2},
+            'all_emotions': {label: float(p) for label, p in zip(EMOTION_LABELS, probabilities)},
+            'total_faces_detected': 1,
+            'timestamp': self._get_timestamp()
+        }
+
+
+def random_emotions_data(count, start=None):
+    """Per-second detections in the shape ContinuousEmotionCapture posts"""
+    start = start or datetime.utcnow()
+    return [{
+        'emotion': random.choice(EMOTION_LABELS),
+        'confidence': round(random.uniform(0.3, 0.99), 3),
+        'timestamp': (start + timedelta(seconds=i)).isoformat()
+    } for i in range(count)]
+
+
+def seed_database(app, therapists, patients, sessions_per_therapist, questions_per_session, samples_per_analysis):
+    """
+    Bulk insert a realistic data set
+
+    Returns:
+        dict: Actors for the load mix (tokens, emails, session/question ids per user)
+    """
+    from flask_jwt_extended import create_access_token
+    from models import db, User, Session, Question, EmotionAnalysis, EmotionSamples
+    from emotion_samples import pack_samples
+
+    with app.app_context():
+        db.create_all()
+
+        # Hash once: password hashing is deliberately slow
+        password_hash = User(username='x', email='x', role='patient')
+        password_hash.set_password(PASSWORD)
+        password_hash = password_hash.password_hash
+
+        users = [dict(username=f'therapist{i}', email=f'therapist{i}@load.test', role='therapist',
+                      password_hash=password_hash) for i in range(therapists)]
+        users += [dict(username=f'patient{i}', email=f'patient{i}@load.test', role='patient',
+                       password_hash=password_hash) for i in range(patients)]
+        db.session.bulk_insert_mappings(User, users)
+        db.session.commit()
+
+        therapist_ids = [u.id for u in User.query.filter_by(role='therapist').order_by(User.id)]
+        patient_ids = [u.id for u in User.query.filter_by(role='patient').order_by(User.id)]
+
+        now = datetime.utcnow()
+        sessions = []
+        for t, therapist_id in enumerate(therapist_ids):
+            for s in range(sessions_per_therapist):
+                sessions.append(dict(
+                    therapist_id=therapist_id,
+                    patient_id=patient_ids[(t * sessions_per_therapist + s) % len(patient_ids)] if patient_ids else None,
+                    session_code=f'L{t:03d}{s:04d}',
+                    status='completed' if s else 'active',
+                    date_created=now - timedelta(days=s),
+                    date_started=now - timedelta(days=s)
+                ))
+        db.session.bulk_insert_mappings(Session, sessions)
+        db.session.commit()
+
+        session_rows = [(s.id, s.therapist_id, s.patient_id) for s in Session.query.all()]
+        questions = [dict(session_id=session_id, text=f'Question {q + 1}', order_num=q + 1, timestamp=now)
+                     for session_id, _, _ in session_rows for q in range(questions_per_session)]
+        db.session.bulk_insert_mappings(Question, questions)
+        db.session.commit()
+
+        question_rows = [(q.id, q.session_id) for q in Question.query.all()]
+        analyses = []
+        raw_data_by_question = {}
+        for question_id, _ in question_rows:
+            raw_data = raw_data_by_question[question_id] = random_emotions_data(samples_per_analysis, now)
+            counts = {}
+            for sample in raw_data:
+                counts[sample['emotion']] = counts.get(sample['emotion'], 0) + 1
+            dominant = max(counts.items(), key=lambda x: x[1])[0]
+            analyses.append(dict(
+                question_id=question_id,
+                dominant_emotion=dominant,
+                dominant_percentage=counts[dominant] / samples_per_analysis * 100,
+                avg_confidence=sum(s['confidence'] for s in raw_data) / samples_per_analysis,
+                total_detections=samples_per_analysis,
+                emotion_counts=counts,
+                analysis_duration=samples_per_analysis,
+                timestamp=now
+            ))
+        db.session.bulk_insert_mappings(EmotionAnalysis, analyses)
+        db.session.commit()
+
+        samples = [dict(analysis_id=analysis_id, sample_count=samples_per_analysis,
+                        data=pack_samples(raw_data_by_question[question_id]))
+                   for analysis_id, question_id in db.session.query(EmotionAnalysis.id, EmotionAnalysis.question_id)]
+        db.session.bulk_insert_mappings(EmotionSamples, samples)
+        db.session.commit()
+
+        questions_by_session = {}
+        for question_id, session_id in question_rows:
+            questions_by_session.setdefault(session_id, []).append(question_id)
+
+        actors = []
+        for user_id, role, email in [(i, 'therapist', f'therapist{n}@load.test') for n, i in enumerate(therapist_ids)] + \
+                                    [(i, 'patient', f'patient{n}@load.test') for n, i in enumerate(patient_ids)]:
+            owned = [(session_id, questions_by_session.get(session_id, []))
+                     for session_id, therapist_id, patient_id in session_rows
+                     if user_id in (therapist_id, patient_id)]
+            if owned:
+                actors.append({
+                    'role': role,
+                    'email': email,
+                    'token': create_access_token(identity=str(user_id)),
+                    'sessions': owned
+                })
+
+    return actors, {
+        'users': len(users),
+        'sessions': len(session_rows),
+        'questions': len(question_rows),
+        'emotion_analyses': len(analyses)
+    }
+
+
+def build_app(db, detector_latency_ms, extra_overrides=None):
+    """create_app() on SQLite with a stub detector"""
+    if db == 'memory':
+        # One shared connection so every thread sees the same in-memory database
+        overrides = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        }
+    else:
+        path = db or os.path.join(tempfile.mkdtemp(prefix='therapy-load-'), 'load.db')
+        overrides = {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(path)}',
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}}
+        }
+    overrides['EMOTION_DETECTOR_ENABLED'] = False
+    overrides.update(extra_overrides or {})
+
+    from app import create_app
+    app = create_app(overrides)
+    set_emotion_detector(StubEmotionDetector(latency_ms=detector_latency_ms))
+    return app
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class LoadClient:
+    """One virtual user: a keep-alive connection replaying the request mix"""
+
+    def __init__(self, host, port, actors, frame_base64, rng):
+        self.host, self.port = host, port
+        self.actors = actors
+        self.frame_base64 = frame_base64
+        self.rng = rng
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return 0
+
+    def run_one(self, endpoint):
+        actor = self.rng.choice(self.actors)
+        session_id, question_ids = self.rng.choice(actor['sessions'])
+
+        if endpoint == 'login':
+            return self.request('POST', '/api/auth/login', body={'email': actor['email'], 'password': PASSWORD})
+        if endpoint == 'sessions_list':
+            return self.request('GET', '/api/sessions', actor['token'])
+        if endpoint == 'continuous_emotion':
+            if not question_ids:
+                return self.request('GET', '/api/sessions', actor['token'])
+            samples = self.rng.randint(5, 60)
+            return self.request('POST', '/api/realtime/continuous-emotion', actor['token'], {
+                'session_id': session_id,
+                'question_id': self.rng.choice(question_ids),
+                'emotions_data': random_emotions_data(samples),
+                'duration': samples
+            })
+        if endpoint == 'emotion_timeline':
+            return self.request('GET', f'/api/realtime/session/{session_id}/emotion-timeline', actor['token'])
+        if endpoint == 'dashboard':
+            therapists = [a for a in self.actors if a['role'] == 'therapist']
+            actor = self.rng.choice(therapists) if therapists else actor
+            session_id, _ = self.rng.choice(actor['sessions'])
+            return self.request('GET', f'/api/sessions/{session_id}/dashboard', actor['token'])
+        if endpoint == 'detect_emotion':
+            return self.request('POST', '/api/detect-emotion', actor['token'], {
+                'image': self.frame_base64,
+                'session_id': session_id
+            })
+        raise ValueError(f'Unknown endpoint {endpoint}')
+
+
+def run_load(host, port, actors, concurrency, duration, warmup, mix, seed=0):
+    """
+    Replay the request mix from concurrency threads for duration seconds
+
+    Returns:
+        dict: endpoint -> list of (latency ms, status)
+    """
+    frame = np.random.default_rng(seed).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    frame_base64 = 'data:image/jpeg;base64,' + base64.b64encode(cv2.imencode('.jpg', frame)[1].tobytes()).decode()
+    endpoints, weights = zip(*mix.items())
+
+    samples = {endpoint: [] for endpoint in endpoints}
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = LoadClient(host, port, actors, frame_base64, rng)
+        local = []
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            endpoint = rng.choices(endpoints, weights)[0]
+            t0 = time.perf_counter()
+            status = client.run_one(endpoint)
+            latency = (time.perf_counter() - t0) * 1000
+            if now >= measure_from:
+                local.append((endpoint, latency, status))
+        with lock:
+            for endpoint, latency, status in local:
+                samples[endpoint].append((latency, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    report = {}
+    for endpoint, rows in list(samples.items()) + [('ALL', [r for rows in samples.values() for r in rows])]:
+        if not rows:
+            continue
+        latencies = np.array([latency for latency, _ in rows])
+        errors = sum(1 for _, status in rows if status == 0 or status >= 500)
+        report[endpoint] = {
+            'requests': len(rows),
+            'errors': errors,
+            'status_codes': {str(code): sum(1 for _, s in rows if s == code) for code in sorted({s for _, s in rows})},
+            'rps': round(len(rows) / duration, 2),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'max_ms': round(float(latencies.max()), 2)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load test on SQLite with a stub detector')
+    parser.add_argument('--db', default=None, help="SQLite file path, or 'memory' (default: temporary file)")
+    parser.add_argument('--therapists', type=int, default=20)
+    parser.add_argument('--patients', type=int, default=100)
+    parser.add_argument('--sessions-per-therapist', type=int, default=10)
+    parser.add_argument('--questions-per-session', type=int, default=8)
+    parser.add_argument('--samples-per-analysis', type=int, default=60, help='raw_data entries per EmotionAnalysis')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before measuring')
+    parser.add_argument('--mix', default=None, help='Override weights, e.g. sessions_list=50,dashboard=50')
+    parser.add_argument('--detector-latency-ms', type=float, default=0, help='Simulated inference time of the stub')
+    parser.add_argument('--port', type=int, default=0, help='Port for the local server (0 = any free port)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    mix = dict(REQUEST_MIX)
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (item.split('=') for item in args.mix.split(','))}
+
+    app = build_app(args.db, args.detector_latency_ms)
+    seed_start = time.perf_counter()
+    actors, volumes = seed_database(app, args.therapists, args.patients, args.sessions_per_therapist,
+                                    args.questions_per_session, args.samples_per_analysis)
+    print(f"🌱 Seeded {volumes} in {time.perf_counter() - seed_start:.1f}s")
+
+    server = make_server('127.0.0.1', args.port, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🚀 Load testing http://127.0.0.1:{server.server_port} with {args.concurrency} clients "
+          f"for {args.duration}s")
+
+    samples = run_load('127.0.0.1', server.server_port, actors, args.concurrency, args.duration, args.warmup, mix)
+    server.shutdown()
+
+    report = summarize(samples, args.duration)
+    print(f"{'endpoint':<20} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, stats in report.items():
+        print(f"{endpoint:<20} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'config': vars(args),
+                'mix': mix,
+                'volumes': volumes,
+                'endpoints': report
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,81 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-super-secret-jwt-key-here'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     MODEL_PATH = os.environ.get('MODEL_PATH') or 'models/model_weights.h5'
+    # Inference backend: 'keras' (.h5), 'tflite' (.tflite, float16/int8) or 'onnx' (.onnx)
+    # Build the artifacts with: python convert_model.py models/model_weights.h5
+    MODEL_BACKEND = os.environ.get('MODEL_BACKEND') or 'keras'
     CASCADE_PATH = os.environ.get('CASCADE_PATH') or 'models/haarcascade_frontalface_default.xml'
+
+    # Load the detector in this process (disable for workers that only serve auth/sessions)
+    EMOTION_DETECTOR_ENABLED = os.environ.get('EMOTION_DETECTOR_ENABLED', 'true').lower() == 'true'
+    # Dummy batch sizes scored once at startup before the detector reports ready
+    DETECTOR_WARMUP_BATCH_SIZES = [
+        int(size) for size in os.environ.get('DETECTOR_WARMUP_BATCH_SIZES', '1,4,8').split(',') if size.strip()
+    ]
+
+    # Camera used by the webcam capture service: device index, video file or stream URL
+    WEBCAM_SOURCE = os.environ.get('WEBCAM_SOURCE', '0')
+    WEBCAM_BUFFER_SIZE = int(os.environ.get('WEBCAM_BUFFER_SIZE', 4))
+    # Frames discarded after opening the camera while exposure settles
+    WEBCAM_WARMUP_FRAMES = int(os.environ.get('WEBCAM_WARMUP_FRAMES', 5))
+
+    # Expose /metrics (Prometheus text format) and Server-Timing headers on detection responses
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Admission control in front of the detector
+    ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 2))
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 16))
+    # Frames not answered within this many ms are dropped (clients may send their own deadline)
+    DETECTION_DEADLINE_MS = float(os.environ.get('DETECTION_DEADLINE_MS', 1000))
+    # Degraded mode (DEGRADED_DETECTION_WIDTH, largest face only) above this queue depth
+    DEGRADE_QUEUE_DEPTH = int(os.environ.get('DEGRADE_QUEUE_DEPTH', 4))
+    RECOVER_QUEUE_DEPTH = int(os.environ.get('RECOVER_QUEUE_DEPTH', 1))
+    DEGRADED_DETECTION_WIDTH = int(os.environ.get('DEGRADED_DETECTION_WIDTH', 240))
+
+    # Live session state: 'memory://' (single process) or 'redis://host:6379/0' to run several processes
+    SESSION_STORE_URL = os.environ.get('SESSION_STORE_URL', 'memory://')
+    # Seconds without activity after which a session is reclaimed (Redis key expiry / in-memory sweeper)
+    SESSION_STATE_TTL = int(os.environ.get('SESSION_STATE_TTL', 6 * 3600))
+    # Seconds between session GC sweeps (0 disables) and samples kept per open analysis window
+    SESSION_GC_INTERVAL = float(os.environ.get('SESSION_GC_INTERVAL', 60))
+    SESSION_MAX_SAMPLES = int(os.environ.get('SESSION_MAX_SAMPLES', 10000))
+    # 'threading' (python app.py) or 'gevent' (python server.py / gunicorn -k gevent -w 1 server:app)
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+    # Socket.IO message queue shared by all processes (e.g. redis://host:6379/0); empty for a single process
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+
+    # real_time_emotion updates to therapists are coalesced and sent every N ms (0 = send each update)
+    EMOTION_BROADCAST_INTERVAL_MS = float(os.environ.get('EMOTION_BROADCAST_INTERVAL_MS', 250))
+    EMOTION_BROADCAST_MAX_SERIES = int(os.environ.get('EMOTION_BROADCAST_MAX_SERIES', 20))
+    # Unacknowledged batches after which a slow client is skipped until it catches up
+    EMOTION_BROADCAST_MAX_IN_FLIGHT = int(os.environ.get('EMOTION_BROADCAST_MAX_IN_FLIGHT', 2))
+
+    # Uploaded frames wider than 2x/4x this are decoded at 1/2 or 1/4 resolution
+    DECODE_WIDTH = int(os.environ.get('DECODE_WIDTH', 640))
+
+    # Face detection runs on frames downscaled to this width (0 = full resolution)
+    DETECTION_WIDTH = int(os.environ.get('DETECTION_WIDTH', 320))
+
+    # Per-session face tracking: full-frame cascade scan every N frames, padded window search otherwise
+    TRACKER_FULL_SCAN_INTERVAL = int(os.environ.get('TRACKER_FULL_SCAN_INTERVAL', 10))
+    TRACKER_PADDING = float(os.environ.get('TRACKER_PADDING', 0.5))
+
+    # Near-duplicate frames of a stream reuse the previous result (-1 disables)
+    FRAME_CACHE_DISTANCE = int(os.environ.get('FRAME_CACHE_DISTANCE', 4))
+    FRAME_CACHE_TTL = float(os.environ.get('FRAME_CACHE_TTL', 5))
+
+    # Cross-request micro-batching for emotion inference
+    INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', 'false').lower() == 'true'
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 32))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+
+    # Detection worker processes (0 = detect in the web process) and threads pinned per worker
+    DETECTION_WORKERS = int(os.environ.get('DETECTION_WORKERS', 0))
+    DETECTION_WORKER_THREADS = int(os.environ.get('DETECTION_WORKER_THREADS', 1))
+
+    # Threads running detection for frames streamed over Socket.IO ('emotion_frame')
+    FRAME_WORKERS = int(os.environ.get('FRAME_WORKERS', 4))
+
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
@@ -0,0 +1,222 @@
+"""
+Convert the Keras emotion model into lightweight inference artifacts
+
+Produces float16 and int8 post-training quantized TFLite models and an ONNX
+model from model_weights.h5, then scores every artifact on a held-out set and
+writes an accuracy-drift report against the original Keras model.
+
+int8 calibration samples come from --calibration-set, or else are split off
+the held-out set and left out of the evaluation.
+
+Usage:
+    python convert_model.py models/model_weights.h5 --held-out data/test --output-dir models
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from emotion_detector import EMOTION_LABELS
+from inference_backends import load_backend
+
+
+def load_held_out_set(path, limit=None):
+    """
+    Load a held-out set as a float32 (N, 48, 48, 1) batch and integer labels
+
+    Accepts either an .npz file with 'x' and 'y' arrays or a directory laid out
+    as <path>/<Emotion>/<image> (FER-2013 image folder layout).
+    """
+    if path.endswith('.npz'):
+        data = np.load(path)
+        images, labels = data['x'], data['y']
+    else:
+        images, labels = [], []
+        for label_index, label in enumerate(EMOTION_LABELS):
+            folder = os.path.join(path, label)
+            if not os.path.isdir(folder):
+                folder = os.path.join(path, label.lower())
+            if not os.path.isdir(folder):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                image = cv2.imread(os.path.join(folder, filename), cv2.IMREAD_GRAYSCALE)
+                if image is None:
+                    continue
+                images.append(cv2.resize(image, (48, 48)))
+                labels.append(label_index)
+        images, labels = np.array(images), np.array(labels)
+
+    if len(images) == 0:
+        raise ValueError(f"No held-out samples found in {path}")
+
+    images = images.reshape(-1, 48, 48, 1).astype(np.float32)
+    if images.max() > 1.0:
+        images /= 255.0
+    labels = labels.reshape(-1).astype(np.int64)
+
+    if limit:
+        images, labels = images[:limit], labels[:limit]
+    return images, labels
+
+
+def convert_tflite(model, output_path, quantization, calibration=None):
+    """Convert a Keras model to TFLite with float16 or full int8 post-training quantization"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if calibration is None or len(calibration) == 0:
+            raise ValueError('int8 quantization needs calibration samples')
+
+        def representative_dataset():
+            for sample in calibration:
+                yield [sample[np.newaxis, ...]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    else:
+        raise ValueError(f"Unknown quantization '{quantization}'")
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def convert_onnx(model, output_path, opset=13):
+    """Convert a Keras model to ONNX with a dynamic batch dimension"""
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, 48, 48, 1), tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=output_path)
+    return output_path
+
+
+def evaluate_backend(backend, images, labels, reference=None, batch_size=32):
+    """Score a backend on the held-out set and compare it to the reference probabilities"""
+    predictions = []
+    start = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        predictions.append(np.asarray(backend.predict(images[offset:offset + batch_size]), dtype=np.float32))
+    elapsed = time.perf_counter() - start
+    predictions = np.concatenate(predictions)
+
+    predicted = predictions.argmax(axis=1)
+    result = {
+        'accuracy': round(float((predicted == labels).mean()), 4),
+        'latency_ms_per_face': round(elapsed * 1000 / len(images), 4)
+    }
+
+    if reference is not None:
+        diff = np.abs(predictions - reference)
+        result.update({
+            'top1_agreement': round(float((predicted == reference.argmax(axis=1)).mean()), 4),
+            'mean_abs_prob_diff': round(float(diff.mean()), 5),
+            'max_abs_prob_diff': round(float(diff.max()), 5)
+        })
+
+    return result, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the emotion model to TFLite/ONNX and report accuracy drift')
+    parser.add_argument('model', help='Path to the Keras model (model_weights.h5)')
+    parser.add_argument('--held-out', required=True, help='Held-out set (.npz with x/y or <dir>/<Emotion>/*.png)')
+    parser.add_argument('--output-dir', default='models', help='Where to write the converted artifacts')
+    parser.add_argument('--formats', default='float16,int8,onnx', help='Comma separated: float16, int8, onnx')
+    parser.add_argument('--calibration-set', default=None,
+                        help='Samples for int8 calibration (defaults to a split of the held-out set)')
+    parser.add_argument('--calibration-samples', type=int, default=200, help='Samples used for int8 calibration')
+    parser.add_argument('--limit', type=int, default=None, help='Only evaluate the first N held-out samples')
+    parser.add_argument('--report', default=None, help='Report path (defaults to <output-dir>/conversion_report.json)')
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    base_name = os.path.splitext(os.path.basename(args.model))[0]
+
+    images, labels = load_held_out_set(args.held_out, limit=args.limit)
+    print(f"📂 Loaded {len(images)} held-out samples")
+
+    # Calibrate int8 on samples the drift report does not score
+    rng = np.random.default_rng(0)
+    calibration = None
+    if 'int8' in formats:
+        if args.calibration_set:
+            calibration, _ = load_held_out_set(args.calibration_set)
+            calibration = calibration[rng.permutation(len(calibration))[:args.calibration_samples]]
+        else:
+            order = rng.permutation(len(images))
+            if args.calibration_samples >= len(images):
+                raise ValueError('Not enough held-out samples to split off calibration, pass --calibration-set')
+            calibration = images[order[:args.calibration_samples]]
+            evaluated = np.sort(order[args.calibration_samples:])
+            images, labels = images[evaluated], labels[evaluated]
+        print(f"📂 {len(calibration)} calibration samples, {len(images)} evaluation samples")
+
+    keras_model = load_model(args.model)
+    artifacts = {'keras': args.model}
+
+    for fmt in formats:
+        try:
+            if fmt in ('float16', 'int8'):
+                path = os.path.join(args.output_dir, f'{base_name}_{fmt}.tflite')
+                artifacts[f'tflite_{fmt}'] = convert_tflite(keras_model, path, fmt, calibration)
+            elif fmt == 'onnx':
+                path = os.path.join(args.output_dir, f'{base_name}.onnx')
+                artifacts['onnx'] = convert_onnx(keras_model, path)
+            else:
+                print(f"⚠️ Skipping unknown format '{fmt}'")
+                continue
+            print(f"✅ Wrote {path}")
+        except Exception as e:
+            print(f"❌ Error converting to {fmt}: {e}")
+
+    report = {
+        'model': args.model,
+        'held_out': args.held_out,
+        'samples': int(len(images)),
+        'calibration': {
+            'source': args.calibration_set or 'held_out_split',
+            'samples': int(len(calibration)) if calibration is not None else 0
+        },
+        'backends': {}
+    }
+
+    reference = None
+    for key, path in artifacts.items():
+        backend_name = key.split('_')[0]
+        try:
+            backend = load_backend(backend_name, path)
+            result, predictions = evaluate_backend(backend, images, labels, reference)
+        except Exception as e:
+            print(f"❌ Error evaluating {key}: {e}")
+            continue
+
+        if key == 'keras':
+            reference = predictions
+
+        result['path'] = path
+        result['size_bytes'] = os.path.getsize(path)
+        report['backends'][key] = result
+        print(f"📊 {key}: {json.dumps(result)}")
+
+    report_path = args.report or os.path.join(args.output_dir, 'conversion_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Report written to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 """
 Database setup script for Therapy Emotion Detection System
 """
+import sys
 import pymysql
 from config import Config
 import urllib.parse
@@ -49,6 +50,45 @@ def create_database():
         return False
 
 
+def pack_legacy_raw_data(batch_size=500):
+    """
+    Move the JSON raw_data of existing emotion analyses to the packed
+    emotion_samples table (samples that do not fit stay in JSON)
+
+    Args:
+        batch_size (int): Analyses converted per transaction
+    """
+    from sqlalchemy.orm import undefer
+    from app import create_app
+    from models import db, EmotionAnalysis
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        packed = kept = 0
+        last_id = 0
+        while True:
+            analyses = (EmotionAnalysis.query
+                        .options(undefer(EmotionAnalysis.raw_data))
+                        .filter(EmotionAnalysis.id > last_id, EmotionAnalysis.raw_data.isnot(None))
+                        .order_by(EmotionAnalysis.id)
+                        .limit(batch_size)
+                        .all())
+            if not analyses:
+                break
+            for analysis in analyses:
+                analysis.set_raw_data(analysis.raw_data)
+                if analysis.samples is not None:
+                    packed += 1
+                else:
+                    kept += 1
+            last_id = analyses[-1].id
+            db.session.commit()
+            print(f"📦 {packed} analyses packed, {kept} kept as JSON")
+
+    print(f"✅ Raw data migration completed: {packed} packed, {kept} kept as JSON")
+
+
 def get_sample_data():
     """
     Generate sample data for testing
@@ -86,6 +126,11 @@ def get_sample_data():
 
 
 if __name__ == '__main__':
+    if '--pack-raw-data' in sys.argv:
+        # python database_setup.py --pack-raw-data
+        pack_legacy_raw_data()
+        sys.exit(0)
+
     print("🗄️ Setting up database for Therapy Emotion Detection System...")
 
     if create_database():
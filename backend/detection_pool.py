@@ -0,0 +1,390 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import cv2
+import numpy as np
+
+import metrics
+from emotion_detector import BaseEmotionDetector
+
+HEARTBEAT_INTERVAL = 1.0
+
+
+def _worker_main(index, detector_options, num_threads, warmup_batch_sizes, shm_name, slot_bytes, task_queue, results):
+    """
+    Detection worker process: owns its own EmotionDetector and reads frames
+    from the shared-memory ring slot named in each task.
+
+    Results go back over a pipe owned by this worker alone, so a worker killed
+    mid-write cannot leave a shared queue lock held for the others.
+    """
+    # Pin native thread pools before TensorFlow/OpenCV spin them up
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[var] = str(num_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    cv2.setNumThreads(num_threads)
+
+    from emotion_detector import EmotionDetector
+
+    try:
+        detector = EmotionDetector(num_threads=num_threads, **detector_options)
+        if warmup_batch_sizes:
+            detector.warm_up(warmup_batch_sizes)
+    except Exception as e:
+        results.send(('failed', os.getpid(), str(e)))
+        return
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)
+    results.send(('ready', os.getpid(), None))
+
+    frame = None
+    try:
+        while True:
+            try:
+                task = task_queue.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                results.send(('heartbeat', os.getpid(), None))
+                continue
+
+            if task is None:
+                break
+
+            job_id, slot, shape, frame, scale, largest_face_only, stream_key = task
+            if slot is not None:
+                offset = slot * slot_bytes
+                frame = ring[offset:offset + shape[0] * shape[1]].reshape(shape)
+
+            result = detector.detect_emotion_from_gray(
+                frame,
+                largest_face_only=largest_face_only,
+                scale=scale,
+                stream_key=stream_key
+            )
+            frame = None
+            results.send(('result', job_id, result))
+    finally:
+        del frame, ring
+        shm.close()
+        results.close()
+
+
+class DetectionPool:
+    """
+    Pool of detection worker processes, each with its own EmotionDetector.
+
+    Grayscale frames are copied into shared-memory ring slots and only the
+    slot index travels through the task queue. A monitor thread restarts
+    workers that crash or stop sending heartbeats.
+    """
+
+    def __init__(self, detector_options, workers=2, threads_per_worker=1, slots_per_worker=4,
+                 slot_bytes=1920 * 1080, timeout=10, heartbeat_timeout=30, startup_timeout=180,
+                 warmup_batch_sizes=None):
+        """
+        Args:
+            detector_options (dict): Keyword arguments for EmotionDetector in each worker
+            workers (int): Number of worker processes
+            threads_per_worker (int): OpenCV/TF thread count pinned in each worker
+            slots_per_worker (int): Shared-memory frame slots per worker
+            slot_bytes (int): Size of each slot; larger frames are sent through the queue instead
+            timeout (float): Seconds to wait for a detection result
+            heartbeat_timeout (float): Restart a ready worker silent for this long
+            startup_timeout (float): Restart a worker that has not loaded its model after this long
+            warmup_batch_sizes (list): Batch sizes each worker scores once before reporting ready
+        """
+        self.detector_options = dict(detector_options)
+        self.num_workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.slot_bytes = int(slot_bytes)
+        self.timeout = timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        self.warmup_batch_sizes = list(warmup_batch_sizes or [])
+
+        self._ctx = mp.get_context('spawn')
+        num_slots = self.num_workers * max(1, int(slots_per_worker))
+        self._shm = shared_memory.SharedMemory(create=True, size=num_slots * self.slot_bytes)
+        self._ring = np.ndarray((self._shm.size,), dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = queue.Queue()
+        for slot in range(num_slots):
+            self._free_slots.put(slot)
+
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._job_ids = itertools.count()
+        self._workers = [None] * self.num_workers
+        self._running = True
+
+        for index in range(self.num_workers):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect_results, name='detection-pool-results', daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._monitor_workers, name='detection-pool-monitor', daemon=True)
+        self._monitor.start()
+
+    def submit(self, gray, scale=1.0, largest_face_only=False, stream_key=None):
+        """
+        Queue a grayscale frame for detection
+
+        Returns:
+            Future: Resolves to the detection result dict
+        """
+        if not self._running:
+            raise RuntimeError('Detection pool is closed')
+
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        slot = None
+        frame = gray
+        if gray.nbytes <= self.slot_bytes:
+            slot = self._free_slots.get(timeout=self.timeout)
+            offset = slot * self.slot_bytes
+            self._ring[offset:offset + gray.nbytes] = gray.reshape(-1)
+            frame = None
+
+        future = Future()
+        with self._lock:
+            worker = self._pick_worker(stream_key)
+            if worker is None:
+                if slot is not None:
+                    self._free_slots.put(slot)
+                raise RuntimeError('No detection worker available')
+            job_id = next(self._job_ids)
+            future.job_id = job_id
+            self._jobs[job_id] = (worker, slot, future)
+            worker['in_flight'] += 1
+            worker['task_queue'].put((job_id, slot, gray.shape, frame, scale, largest_face_only, stream_key))
+
+        return future
+
+    def cancel(self, future):
+        """
+        Give up on a submitted job (e.g. the caller timed out) and free its slot
+
+        A result that still arrives for it is dropped.
+        """
+        if self._release(future.job_id) is not None:
+            future.cancel()
+
+    def health(self):
+        """Per-worker status for health checks"""
+        now = time.monotonic()
+        with self._lock:
+            workers = [{
+                'index': index,
+                'pid': worker['process'].pid,
+                'alive': worker['process'].is_alive(),
+                'ready': worker['ready'],
+                'in_flight': worker['in_flight'],
+                'restarts': worker['restarts'],
+                'last_heartbeat_s': round(now - worker['last_seen'], 2)
+            } for index, worker in enumerate(self._workers)]
+
+        return {
+            'workers': workers,
+            'healthy': all(w['alive'] and w['ready'] for w in workers),
+            'free_slots': self._free_slots.qsize(),
+            'pending_jobs': len(self._jobs)
+        }
+
+    def close(self):
+        """Stop all workers and release the shared memory"""
+        self._running = False
+        with self._lock:
+            for worker in self._workers:
+                worker['task_queue'].put(None)
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+
+        self._fail_jobs(lambda worker: True, 'Detection pool is closed')
+        del self._ring
+        self._shm.close()
+        self._shm.unlink()
+
+    def _pick_worker(self, stream_key):
+        # Ready workers first; while none is, queue on the ones still starting up.
+        # Workers that are down are skipped: their task queue is replaced on restart.
+        candidates = [worker for worker in self._workers if worker['ready']] or \
+            [worker for worker in self._workers if worker['down_since'] is None and worker['process'].is_alive()]
+        if not candidates:
+            return None
+
+        # Keep a stream on one worker so its face tracker stays warm
+        if stream_key is not None:
+            return candidates[zlib.crc32(str(stream_key).encode()) % len(candidates)]
+        return min(candidates, key=lambda worker: worker['in_flight'])
+
+    def _start_worker(self, index, restarts=0, failures=0):
+        task_queue = self._ctx.Queue()
+        results, worker_results = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.detector_options, self.threads_per_worker, self.warmup_batch_sizes, self._shm.name,
+                  self.slot_bytes, task_queue, worker_results),
+            name=f'detection-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        worker_results.close()
+        self._workers[index] = {
+            'process': process,
+            'task_queue': task_queue,
+            'results': results,
+            'ready': False,
+            'in_flight': 0,
+            'restarts': restarts,
+            'failures': failures,
+            'down_since': None,
+            'started': time.monotonic(),
+            'last_seen': time.monotonic()
+        }
+
+    def _release(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return None
+            worker, slot, future = job
+            worker['in_flight'] -= 1
+        if slot is not None:
+            self._free_slots.put(slot)
+        return future
+
+    def _fail_jobs(self, predicate, message):
+        with self._lock:
+            job_ids = [job_id for job_id, (worker, _, _) in self._jobs.items() if predicate(worker)]
+        for job_id in job_ids:
+            future = self._release(job_id)
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError(message))
+
+    def _collect_results(self):
+        while self._running:
+            with self._lock:
+                connections = {worker['results']: index for index, worker in enumerate(self._workers)}
+
+            for connection in wait(list(connections), timeout=HEARTBEAT_INTERVAL):
+                index = connections[connection]
+                try:
+                    kind, payload, extra = connection.recv()
+                except (EOFError, OSError):
+                    # Worker exited; the monitor restarts it
+                    continue
+
+                self._handle_message(index, connection, kind, payload, extra)
+
+    def _handle_message(self, index, connection, kind, payload, extra):
+        with self._lock:
+            worker = self._workers[index]
+            if worker['results'] is not connection:
+                # Late message from a worker that has been replaced
+                return
+            worker['last_seen'] = time.monotonic()
+            if kind == 'ready':
+                worker['ready'] = True
+                worker['failures'] = 0
+                print(f"✅ Detection worker {index} ready (pid {payload})")
+
+        if kind == 'failed':
+            print(f"❌ Detection worker {index} failed to start: {extra}")
+        elif kind == 'result':
+            future = self._release(payload)
+            if future is not None and not future.done():
+                future.set_result(extra)
+
+    def _monitor_workers(self):
+        while self._running:
+            time.sleep(HEARTBEAT_INTERVAL)
+            for index in range(self.num_workers):
+                self._check_worker(index)
+
+    def _check_worker(self, index):
+        now = time.monotonic()
+        with self._lock:
+            if not self._running:
+                return
+            worker = self._workers[index]
+            process = worker['process']
+
+            if worker['down_since'] is not None:
+                # Back off exponentially while a worker keeps failing
+                backoff = min(30, 2 ** worker['failures'])
+                if now - worker['down_since'] < backoff:
+                    return
+                self._start_worker(index, restarts=worker['restarts'] + 1, failures=worker['failures'])
+                reason = None
+            elif not process.is_alive():
+                reason = f'exited with code {process.exitcode}'
+            elif worker['ready'] and now - worker['last_seen'] > self.heartbeat_timeout:
+                reason = 'stopped sending heartbeats'
+            elif not worker['ready'] and now - worker['started'] > self.startup_timeout:
+                reason = 'did not start in time'
+            else:
+                return
+
+            if reason is not None:
+                worker['ready'] = False
+                worker['down_since'] = now
+                worker['failures'] += 1
+
+        if reason is None:
+            # Anything still queued for the old process went away with its task queue
+            self._fail_jobs(lambda w: w is worker, f'Detection worker {index} restarted')
+            return
+
+        print(f"⚠️ Detection worker {index} {reason}, restarting")
+        if process.is_alive():
+            process.kill()
+            process.join(timeout=5)
+
+        self._fail_jobs(lambda w: w is worker, f'Detection worker {index} {reason}')
+
+
+class PooledEmotionDetector(BaseEmotionDetector):
+    """Emotion detector facade that decodes frames locally and detects in a DetectionPool"""
+
+    def __init__(self, pool, decode_width=640, degraded_width=240):
+        super().__init__(decode_width=decode_width, degraded_width=degraded_width)
+        self.pool = pool
+
+    def warm_up(self, batch_sizes=(1,)):
+        """Wait until every worker has loaded and warmed up its model"""
+        start = time.monotonic()
+        while not self.pool.health()['healthy']:
+            if time.monotonic() - start > self.pool.startup_timeout:
+                raise RuntimeError('Detection workers did not become ready in time')
+            time.sleep(0.2)
+        return {'workers_ready_ms': round((time.monotonic() - start) * 1000, 2)}
+
+    def detect_emotion_from_gray(self, gray, largest_face_only=False, scale=1.0, stream_key=None):
+        try:
+            # Cascade and inference run in the worker; time the round trip here
+            with metrics.stage('pool'):
+                future = self.pool.submit(
+                    gray,
+                    scale=scale,
+                    largest_face_only=largest_face_only,
+                    stream_key=stream_key
+                )
+                try:
+                    return future.result(timeout=self.pool.timeout)
+                finally:
+                    if not future.done():
+                        self.pool.cancel(future)
+
+        except Exception as e:
+            return {
+                'error': f'Error detecting emotion: {str(e) or type(e).__name__}',
+                'detected': False
+            }
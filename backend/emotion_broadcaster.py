@@ -0,0 +1,213 @@
+"""
+Coalesced emotion broadcasts to the therapists of a session.
+
+Emotions recorded for a session are buffered and flushed every tick as one
+'real_time_emotion' message per session:
+
+    {'emotion', 'confidence', 'timestamp',      # latest value (same fields as before)
+     'series': [[emotion, confidence, offset_ms], ...],  # values since the last flush
+     'seq': n, 'dropped': k}
+
+Clients that acknowledge batches ('real_time_emotion_ack' with the seq) get
+backpressure: while a connection has max_in_flight unacknowledged batches
+it is skipped, so a slow therapist misses intermediate values instead of
+growing an unbounded send queue, and gets the latest value once it catches
+up. Connections that never ack are always sent to.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import metrics
+from session_store import role_room
+
+BROADCAST_BATCHES = metrics.registry.counter(
+    'emotion_broadcast_batches_total', 'Coalesced real_time_emotion messages sent', ('target',))
+BROADCAST_DROPPED = metrics.registry.counter(
+    'emotion_broadcast_dropped_total', 'Emotion values not delivered individually', ('reason',))
+
+
+class _SessionBuffer:
+    __slots__ = ('samples', 'dropped', 'latest', 'seq')
+
+    def __init__(self, max_series):
+        self.samples = deque(maxlen=max_series)
+        self.dropped = 0
+        self.latest = None
+        self.seq = 0
+
+
+class _Connection:
+    __slots__ = ('session_code', 'unacked', 'behind')
+
+    def __init__(self, session_code):
+        self.session_code = session_code
+        # Seqs sent and not acknowledged yet
+        self.unacked = deque()
+        # Batches were skipped while the connection was lagging
+        self.behind = False
+
+    def ack(self, seq):
+        while self.unacked and self.unacked[0] <= seq:
+            self.unacked.popleft()
+
+
+class EmotionBroadcaster:
+    """Per-session buffer of emotion updates flushed to the therapist sub-room every tick"""
+
+    def __init__(self, socketio, encoder, interval=0.25, max_series=20, max_in_flight=2, role='therapist'):
+        """
+        Args:
+            socketio: Flask-SocketIO instance (runs the flush task)
+            encoder (EventEncoder): Emits in the encoding of each connection
+            interval (float): Seconds between flushes (0 sends every update immediately)
+            max_series (int): Values kept per session between flushes; older ones are dropped
+            max_in_flight (int): Unacknowledged batches after which an acking connection is skipped
+            role (str): Participant role that receives the broadcasts
+        """
+        self.socketio = socketio
+        self.encoder = encoder
+        self.interval = interval
+        self.max_series = max(1, int(max_series))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.role = role
+
+        self._buffers = {}
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def publish(self, session_code, emotion, confidence):
+        """Buffer an emotion update for the session's therapists"""
+        now = time.time()
+        if self.interval <= 0:
+            # Coalescing disabled: one message per update
+            self.encoder.emit('real_time_emotion', {
+                'emotion': emotion,
+                'confidence': confidence,
+                'timestamp': datetime.fromtimestamp(now).isoformat()
+            }, room=role_room(session_code, self.role))
+            return
+
+        with self._lock:
+            buffer = self._buffers.get(session_code)
+            if buffer is None:
+                buffer = self._buffers[session_code] = _SessionBuffer(self.max_series)
+            if len(buffer.samples) == buffer.samples.maxlen:
+                buffer.dropped += 1
+                BROADCAST_DROPPED.inc('buffer_full')
+            buffer.samples.append((emotion, confidence, now))
+            buffer.latest = (emotion, confidence, now)
+            if not self._running:
+                self._running = True
+                self.socketio.start_background_task(self._run)
+
+    def ack(self, sid, session_code, seq):
+        """
+        A client acknowledged the batch with this seq; its first ack enables backpressure for it
+        """
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                connection = self._connections[sid] = _Connection(session_code)
+            connection.ack(int(seq))
+
+    def forget(self, sid):
+        """Drop the backpressure state of a disconnected client"""
+        with self._lock:
+            self._connections.pop(sid, None)
+
+    def discard(self, session_code):
+        """Drop the buffered updates of a finished session"""
+        with self._lock:
+            self._buffers.pop(session_code, None)
+            for sid in [sid for sid, c in self._connections.items() if c.session_code == session_code]:
+                del self._connections[sid]
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._buffers),
+                'pending': sum(len(b.samples) for b in self._buffers.values()),
+                'lagging': sum(1 for c in self._connections.values() if len(c.unacked) >= self.max_in_flight)
+            }
+
+    def _run(self):
+        while self._running:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Emotion broadcast flush failed: {str(e)}")
+
+    def flush(self):
+        """Send one batch per session with pending updates"""
+        with self._lock:
+            pending = []
+            for session_code, buffer in self._buffers.items():
+                if buffer.samples:
+                    buffer.seq += 1
+                    pending.append((session_code, buffer.seq, list(buffer.samples), buffer.dropped))
+                    buffer.samples.clear()
+                    buffer.dropped = 0
+            catch_up = [(sid, c.session_code) for sid, c in self._connections.items()
+                        if c.behind and len(c.unacked) < self.max_in_flight]
+
+        flushed = set()
+        for session_code, seq, samples, dropped in pending:
+            self._send_batch(session_code, seq, samples, dropped)
+            flushed.add(session_code)
+
+        # Connections that caught up without a new batch still get the latest value
+        for sid, session_code in catch_up:
+            if session_code not in flushed:
+                self._send_latest(sid, session_code)
+
+    def _batch(self, seq, samples, dropped):
+        emotion, confidence, latest_at = samples[-1]
+        start = samples[0][2]
+        return {
+            'emotion': emotion,
+            'confidence': confidence,
+            'timestamp': datetime.fromtimestamp(latest_at).isoformat(),
+            'series': [[e, round(c, 3) if c is not None else None, int((t - start) * 1000)]
+                       for e, c, t in samples],
+            'seq': seq,
+            'dropped': dropped
+        }
+
+    def _send_batch(self, session_code, seq, samples, dropped):
+        payload = self._batch(seq, samples, dropped)
+
+        skip = []
+        with self._lock:
+            for sid, connection in self._connections.items():
+                if connection.session_code != session_code:
+                    continue
+                if len(connection.unacked) >= self.max_in_flight:
+                    connection.behind = True
+                    skip.append(sid)
+                    BROADCAST_DROPPED.inc('backpressure', amount=len(samples))
+                else:
+                    connection.unacked.append(seq)
+                    connection.behind = False
+
+        self.encoder.emit('real_time_emotion', payload, room=role_room(session_code, self.role),
+                          skip_sid=skip or None)
+        BROADCAST_BATCHES.inc('room')
+
+    def _send_latest(self, sid, session_code):
+        with self._lock:
+            buffer = self._buffers.get(session_code)
+            connection = self._connections.get(sid)
+            if buffer is None or buffer.latest is None or connection is None:
+                return
+            payload = self._batch(buffer.seq, [buffer.latest], 0)
+            connection.unacked.append(buffer.seq)
+            connection.behind = False
+        self.encoder.emit('real_time_emotion', payload, sid=sid)
+        BROADCAST_BATCHES.inc('catch_up')
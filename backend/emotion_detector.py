@@ -1,46 +1,42 @@
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
 import base64
 from PIL import Image
 import io
-import os
-from pathlib import Path
-
-
-class EmotionDetector:
-    def __init__(self, model_path, cascade_path):
-        """
-        Initialize the emotion detector with model and cascade paths
-        """
-        self.emotion_labels = [
-            'Angry',
-            'Disgust',
-            'Fear',
-            'Happy',
-            'Neutral',
-            'Sad',
-            'Surprise'
-        ]
-
-        # Load the trained model
-        if os.path.exists(model_path):
-            self.model = load_model(model_path)
-        else:
-            raise FileNotFoundError(f"Model file not found at {model_path}")
-
-        # Load face cascade classifier
-        if os.path.exists(cascade_path):
-            self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        else:
-            raise FileNotFoundError(f"Cascade file not found at {cascade_path}")
-
-    def detect_emotion_from_base64(self, image_base64):
+import threading
+import time
+import metrics
+from inference_queue import InferenceBatcher
+from webcam_capture import get_webcam_capture
+from inference_backends import load_backend
+from face_tracker import FaceTrackerRegistry
+from face_detection import FaceDetector
+from frame_cache import FrameResultCache
+from emotion_labels import EMOTION_LABELS
+
+
+class BaseEmotionDetector:
+    """
+    Frame decoding and input handling shared by every detector.
+
+    Subclasses implement detect_emotion_from_gray, which receives a grayscale
+    image plus the scale mapping it back to original image pixels.
+    """
+
+    def __init__(self, decode_width=640, degraded_width=240):
+        self.emotion_labels = list(EMOTION_LABELS)
+        self.decode_width = decode_width
+        self.degraded_width = degraded_width
+
+    def detect_emotion_from_base64(self, image_base64, largest_face_only=False, stream_key=None, degraded=False):
         """
         Detect emotion from a base64 encoded image
 
         Args:
             image_base64 (str): Base64 encoded image
+            largest_face_only (bool): Score only the largest face (main subject)
+            stream_key (str): Optional stream id (session/question) enabling face tracking
+            degraded (bool): Cheaper detection under load (see detect_emotion_from_bytes)
 
         Returns:
             dict: Detection results including emotion, confidence, and all probabilities
@@ -51,13 +47,47 @@ class EmotionDetector:
                 # Remove data URL prefix
                 image_base64 = image_base64.split(',')[1]
 
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
+            with metrics.stage('base64'):
+                image_data = base64.b64decode(image_base64)
+
+            return self.detect_emotion_from_bytes(
+                image_data,
+                largest_face_only=largest_face_only,
+                stream_key=stream_key,
+                degraded=degraded
+            )
+
+        except Exception as e:
+            return {
+                'error': f'Error processing image: {str(e)}',
+                'detected': False
+            }
 
-            # Convert PIL image to OpenCV format
-            frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    def detect_emotion_from_bytes(self, image_data, largest_face_only=False, stream_key=None, degraded=False):
+        """
+        Detect emotion from encoded image bytes (JPEG, PNG, WebP...)
 
-            return self.detect_emotion_from_frame(frame)
+        Args:
+            image_data (bytes): Encoded image
+            largest_face_only (bool): Score only the largest face (main subject)
+            stream_key (str): Optional stream id (session/question) enabling face tracking
+            degraded (bool): Decode and detect at degraded_width and score only the largest face
+
+        Returns:
+            dict: Detection results, with face coordinates in original image pixels
+        """
+        try:
+            with metrics.stage('decode'):
+                gray, scale = self._decode_grayscale(image_data, self.degraded_width if degraded else None)
+            result = self.detect_emotion_from_gray(
+                gray,
+                largest_face_only=largest_face_only or degraded,
+                scale=scale,
+                stream_key=stream_key
+            )
+            if degraded:
+                result['degraded'] = True
+            return result
 
         except Exception as e:
             return {
@@ -65,86 +95,267 @@ class EmotionDetector:
                 'detected': False
             }
 
-    def detect_emotion_from_frame(self, frame):
+    def _decode_grayscale(self, image_data, max_width=None):
+        """
+        Decode straight from the bytes buffer to a grayscale image, at reduced
+        resolution when the image is wider than detection needs
+
+        Args:
+            image_data (bytes): Encoded image
+            max_width (int): Downscale the decoded image to at most this width
+
+        Returns:
+            tuple: (gray image, scale from decoded pixels back to original pixels)
+        """
+        # Only the header is parsed here, the pixels are not decoded
+        try:
+            image = Image.open(io.BytesIO(image_data))
+            original_width, original_height = image.size
+            # imdecode applies the EXIF orientation; 90 degree rotations swap the axes
+            if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                original_width = original_height
+        except Exception:
+            original_width = None
+
+        target_width = self.decode_width
+        if max_width and (not target_width or max_width < target_width):
+            target_width = max_width
+
+        flag = cv2.IMREAD_GRAYSCALE
+        if original_width and target_width:
+            if original_width >= target_width * 4:
+                flag = cv2.IMREAD_REDUCED_GRAYSCALE_4
+            elif original_width >= target_width * 2:
+                flag = cv2.IMREAD_REDUCED_GRAYSCALE_2
+
+        gray = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), flag)
+        if gray is None:
+            raise ValueError('Could not decode image data')
+
+        scale = original_width / gray.shape[1] if original_width else 1.0
+
+        if max_width and gray.shape[1] > max_width:
+            scale *= gray.shape[1] / max_width
+            gray = cv2.resize(gray, (max_width, max(1, int(round(gray.shape[0] * max_width / gray.shape[1])))),
+                              interpolation=cv2.INTER_AREA)
+
+        return gray, scale
+
+    def detect_emotion_from_frame(self, frame, largest_face_only=False, stream_key=None):
         """
         Detect emotion from an OpenCV frame
 
         Args:
             frame: OpenCV image frame
+            largest_face_only (bool): Score only the largest face (main subject)
+            stream_key (str): Optional stream id (session/question) enabling face tracking
 
         Returns:
             dict: Detection results
         """
         try:
             # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            with metrics.stage('color'):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.3,
-                minNeighbors=5,
-                minSize=(30, 30)
-            )
+            return self.detect_emotion_from_gray(gray, largest_face_only=largest_face_only, stream_key=stream_key)
+
+        except Exception as e:
+            return {
+                'error': f'Error detecting emotion: {str(e)}',
+                'detected': False
+            }
+
+    def detect_emotion_from_gray(self, gray, largest_face_only=False, scale=1.0, stream_key=None):
+        raise NotImplementedError
+
+    def detect_emotion_from_webcam_capture(self, capture=None):
+        """
+        Detect emotion on the latest frame of the shared webcam capture service
+
+        Args:
+            capture (WebcamCapture): Capture service to read from (defaults to the shared one)
+
+        Returns:
+            dict: Detection results
+        """
+        try:
+            capture = capture or get_webcam_capture()
+        except Exception as e:
+            return {
+                'error': f'Could not access webcam: {str(e)}',
+                'detected': False
+            }
+
+        frame = capture.latest_frame(timeout=1.0)
+        if frame is None:
+            return {
+                'error': capture.error or 'Could not capture frame from webcam',
+                'detected': False
+            }
+
+        return self.detect_emotion_from_frame(frame)
+
+    def stream_emotion_from_webcam(self, fps=5, max_results=None, capture=None, stream_key='webcam'):
+        """
+        Generator yielding detection results for webcam frames at a target FPS
+
+        Args:
+            fps (float): Maximum results per second
+            max_results (int): Stop after this many results (None = until the source ends)
+            capture (WebcamCapture): Capture service to read from (defaults to the shared one)
+            stream_key (str): Tracker/cache key for this stream
+
+        Yields:
+            dict: Detection results with frame_id and capture_time
+        """
+        capture = capture or get_webcam_capture()
+        for frame_id, captured_at, frame in capture.stream(fps=fps, max_frames=max_results):
+            result = self.detect_emotion_from_frame(frame, stream_key=stream_key)
+            result['frame_id'] = frame_id
+            result['capture_time'] = captured_at
+            yield result
+
+    def _get_timestamp(self):
+        """Get current timestamp"""
+        from datetime import datetime
+        return datetime.now().isoformat()
+
+
+class EmotionDetector(BaseEmotionDetector):
+    def __init__(self, model_path, cascade_path, backend='keras', num_threads=None, decode_width=640,
+                 tracker_full_scan_interval=10, tracker_padding=0.5, detection_width=320,
+                 frame_cache_distance=4, frame_cache_ttl=5.0, model=None, degraded_width=240):
+        """
+        Initialize the emotion detector with model and cascade paths
+
+        Args:
+            model_path (str): Model artifact (.h5, .tflite or .onnx depending on backend)
+            cascade_path (str): Haar cascade XML file
+            backend (str): Inference backend, one of 'keras', 'tflite' or 'onnx'
+            num_threads (int): Optional intra-op thread count for the backend
+            decode_width (int): Width detection needs; larger encoded images are decoded at 1/2 or 1/4 size
+            tracker_full_scan_interval (int): Frames between forced full-frame scans for tracked streams
+            tracker_padding (float): Search window padding around the tracked face, relative to its size
+            detection_width (int): Working width the cascade runs at (None/0 to use full resolution)
+            frame_cache_distance (int): Hamming distance under which a stream frame reuses the previous
+                result (negative disables the cache)
+            frame_cache_ttl (float): Seconds a cached result may be reused for
+            model: Already loaded model with a predict(batch) method; model_path/backend are ignored
+            degraded_width (int): Decode/detection width used in degraded mode under load
+        """
+        super().__init__(decode_width=decode_width, degraded_width=degraded_width)
+
+        # Load the trained model with the selected inference backend
+        self.model = model if model is not None else load_backend(backend, model_path, num_threads=num_threads)
+
+        # Load face cascade classifier
+        self.face_detector = FaceDetector(cascade_path, working_width=detection_width)
+        self.face_cascade = self.face_detector.cascade
+
+        # Optional cross-request batching queue (see enable_batching)
+        self.batcher = None
+
+        # Per-stream face trackers (keyed by session/question)
+        self.trackers = FaceTrackerRegistry(
+            full_scan_interval=tracker_full_scan_interval,
+            padding=tracker_padding
+        )
+
+        # Per-stream near-duplicate frame cache
+        self.frame_cache = None
+        if frame_cache_distance is not None and frame_cache_distance >= 0:
+            self.frame_cache = FrameResultCache(max_distance=frame_cache_distance, ttl=frame_cache_ttl)
+
+    def detect_emotion_from_gray(self, gray, largest_face_only=False, scale=1.0, stream_key=None):
+        """
+        Detect emotion from a grayscale image
+
+        Args:
+            gray: Grayscale image
+            largest_face_only (bool): Score only the largest face (main subject)
+            scale (float): Factor mapping gray pixels back to original image pixels
+            stream_key (str): Optional stream id (session/question) enabling face tracking
+                and reuse of the previous result for near-duplicate frames
+
+        Returns:
+            dict: Detection results
+        """
+        if stream_key is None or self.frame_cache is None:
+            return self._detect_emotion(gray, largest_face_only, scale, stream_key)
+
+        # Degraded requests decode at degraded_width, so the frame shape tells
+        # them apart from full ones along with largest_face_only
+        variant = (bool(largest_face_only), gray.shape)
+        try:
+            with metrics.stage('cache'):
+                cached, frame_hash = self.frame_cache.lookup(stream_key, gray, scale, variant)
+        except Exception:
+            cached, frame_hash = None, None
+
+        metrics.DETECTOR_CACHE_RESULTS.inc('hit' if cached is not None else 'miss')
+        if cached is not None:
+            return dict(cached, reused=True, timestamp=self._get_timestamp())
+
+        result = self._detect_emotion(gray, largest_face_only, scale, stream_key)
+        if frame_hash is not None:
+            self.frame_cache.store(stream_key, frame_hash, gray, result, scale, variant)
+        return result
+
+    def _detect_emotion(self, gray, largest_face_only, scale, stream_key):
+        """Run face detection and inference on a grayscale image"""
+        try:
+            # Detect faces, around the previous face box for tracked streams
+            tracking = None
+            with metrics.stage('cascade'):
+                if stream_key is not None:
+                    faces, tracking = self.trackers.get(stream_key).detect(gray, self._detect_faces, scale)
+                else:
+                    faces = self._detect_faces(gray)
 
             if len(faces) == 0:
-                return {
+                result = {
                     'detected': False,
                     'message': 'No face detected in the image'
                 }
+                if tracking is not None:
+                    result['tracking'] = tracking
+                return result
+
+            total_faces = len(faces)
 
-            # Process the first (largest) face found
-            face_results = []
-
-            for (x, y, w, h) in faces:
-                # Extract face region
-                roi_gray = gray[y:y + h, x:x + w]
-
-                # Resize to model input size (48x48)
-                roi_gray = cv2.resize(roi_gray, (48, 48))
-
-                # Normalize and reshape for model
-                roi_gray = roi_gray.reshape(1, 48, 48, 1)
-                roi_gray = roi_gray / 255.0
-
-                # Predict emotion
-                emotion_predictions = self.model.predict(roi_gray, verbose=0)
-                emotion_probabilities = emotion_predictions[0]
-
-                # Get dominant emotion
-                dominant_emotion_index = np.argmax(emotion_probabilities)
-                dominant_emotion = self.emotion_labels[dominant_emotion_index]
-                confidence = float(emotion_probabilities[dominant_emotion_index])
-
-                # Create probability dictionary
-                emotion_probs = {}
-                for i, emotion in enumerate(self.emotion_labels):
-                    emotion_probs[emotion] = float(emotion_probabilities[i])
-
-                face_results.append({
-                    'face_coordinates': {
-                        'x': int(x),
-                        'y': int(y),
-                        'width': int(w),
-                        'height': int(h)
-                    },
-                    'emotion': dominant_emotion,
-                    'confidence': confidence,
-                    'all_emotions': emotion_probs
-                })
-
-            # Return result for the first face (main subject)
+            # Largest face first so the main subject is always faces[0]
+            faces = sorted(faces, key=lambda f: int(f[2]) * int(f[3]), reverse=True)
+            if largest_face_only:
+                faces = faces[:1]
+
+            # Score every face crop in a single forward pass
+            with metrics.stage('preprocess'):
+                batch = self._build_face_batch(gray, faces)
+            with metrics.stage('inference'):
+                emotion_predictions = self._predict(batch)
+
+            face_results = [
+                self._build_face_result(face, probabilities, scale)
+                for face, probabilities in zip(faces, emotion_predictions)
+            ]
+
+            # Top-level fields describe the main subject
             main_result = face_results[0]
 
-            return {
+            result = {
                 'detected': True,
                 'emotion': main_result['emotion'],
                 'confidence': main_result['confidence'],
                 'face_coordinates': main_result['face_coordinates'],
                 'all_emotions': main_result['all_emotions'],
-                'total_faces_detected': len(faces),
+                'faces': face_results,
+                'total_faces_detected': total_faces,
                 'timestamp': self._get_timestamp()
             }
+            if tracking is not None:
+                result['tracking'] = tracking
+            return result
 
         except Exception as e:
             return {
@@ -152,64 +363,197 @@ class EmotionDetector:
                 'detected': False
             }
 
-    def detect_emotion_from_webcam_capture(self):
+    def _detect_faces(self, gray, face_size=None):
+        """Run the Haar cascade on a downscaled copy of a grayscale image"""
+        return self.face_detector.detect(gray, face_size=face_size)
+
+    def _predict(self, batch):
+        """Run the model on a face batch, through the shared inference queue when enabled"""
+        if self.batcher is not None:
+            return self.batcher.predict(batch)
+        return self.model.predict(batch)
+
+    def enable_batching(self, max_batch_size=32, max_wait_ms=5):
+        """Route inference through a shared queue that batches faces across requests"""
+        if self.batcher is None:
+            self.batcher = InferenceBatcher(
+                self.model.predict,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms
+            )
+        return self.batcher
+
+    def warm_up(self, batch_sizes=(1,)):
         """
-        Capture a single frame from webcam and detect emotion
+        Score dummy 48x48 batches so graph building and allocation happen before real traffic
 
         Returns:
-            dict: Detection results
+            dict: Warm-up latency in milliseconds per batch size
         """
-        try:
-            # Initialize camera
-            cap = cv2.VideoCapture(0)
+        timings = {}
+        for batch_size in batch_sizes:
+            batch = np.zeros((batch_size, 48, 48, 1), dtype=np.float32)
+            start = time.perf_counter()
+            self.model.predict(batch)
+            timings[str(batch_size)] = round((time.perf_counter() - start) * 1000, 2)
+
+        # First cascade run also pays one-off allocation costs
+        self.face_detector.detect(np.zeros((240, 320), dtype=np.uint8))
+        return timings
+
+    def _build_face_batch(self, gray, faces):
+        """
+        Resize every face crop into one preallocated float32 (N, 48, 48, 1) batch
+        """
+        batch = np.empty((len(faces), 48, 48, 1), dtype=np.float32)
+
+        for i, (x, y, w, h) in enumerate(faces):
+            roi_gray = gray[y:y + h, x:x + w]
+            batch[i, :, :, 0] = cv2.resize(roi_gray, (48, 48))
+
+        # Normalize in place
+        batch *= 1.0 / 255.0
+        return batch
+
+    def _build_face_result(self, face, emotion_probabilities, scale=1.0):
+        """Build the result dict for a single face from its probability vector"""
+        x, y, w, h = (int(round(v * scale)) for v in face)
+
+        # Get dominant emotion
+        dominant_emotion_index = int(np.argmax(emotion_probabilities))
+
+        # Create probability dictionary
+        emotion_probs = {
+            emotion: float(emotion_probabilities[i])
+            for i, emotion in enumerate(self.emotion_labels)
+        }
+
+        return {
+            'face_coordinates': {
+                'x': x,
+                'y': y,
+                'width': w,
+                'height': h
+            },
+            'emotion': self.emotion_labels[dominant_emotion_index],
+            'confidence': float(emotion_probabilities[dominant_emotion_index]),
+            'all_emotions': emotion_probs
+        }
 
-            if not cap.isOpened():
-                return {
-                    'error': 'Could not access webcam',
-                    'detected': False
-                }
+# Global detector instance (will be initialized in app.py)
+emotion_detector = None
 
-            # Capture frame
-            ret, frame = cap.read()
-            cap.release()
+# Loading state reported by the readiness probe
+detector_status = {
+    'state': 'not_started',
+    'error': None,
+    'load_seconds': None,
+    'warmup_ms': {}
+}
+_status_lock = threading.Lock()
 
-            if not ret:
-                return {
-                    'error': 'Could not capture frame from webcam',
-                    'detected': False
-                }
 
-            # Flip frame horizontally (mirror effect)
-            frame = cv2.flip(frame, 1)
+def _set_detector_status(**fields):
+    with _status_lock:
+        detector_status.update(fields)
 
-            return self.detect_emotion_from_frame(frame)
 
-        except Exception as e:
-            return {
-                'error': f'Error accessing webcam: {str(e)}',
-                'detected': False
-            }
+def get_detector_status():
+    """Snapshot of the detector loading state and warm-up timings"""
+    with _status_lock:
+        return dict(detector_status, warmup_ms=dict(detector_status['warmup_ms']))
 
-    def _get_timestamp(self):
-        """Get current timestamp"""
-        from datetime import datetime
-        return datetime.now().isoformat()
 
+def mark_emotion_detector_unavailable(reason):
+    """Record that the detector will not be loaded in this process"""
+    _set_detector_status(state='unavailable', error=reason)
 
-# Global detector instance (will be initialized in app.py)
-emotion_detector = None
 
+def init_emotion_detector(model_path, cascade_path, batching=False, max_batch_size=32, max_wait_ms=5,
+                          workers=0, worker_threads=1, warmup_batch_sizes=None, **detector_options):
+    """
+    Initialize the global emotion detector instance
 
-def init_emotion_detector(model_path, cascade_path):
-    """Initialize the global emotion detector instance"""
+    With workers > 0 detection runs in a pool of worker processes, each with
+    its own model; otherwise the model is loaded in this process. When
+    warmup_batch_sizes is given, dummy batches of those sizes are scored
+    before the detector is published, so the first request is not cold.
+    Extra keyword arguments (backend, decode_width, ...) are passed to EmotionDetector.
+    """
     global emotion_detector
-    emotion_detector = EmotionDetector(model_path, cascade_path)
+
+    _set_detector_status(state='loading', error=None)
+    start = time.perf_counter()
+
+    try:
+        if workers:
+            from detection_pool import DetectionPool, PooledEmotionDetector
+
+            pool = DetectionPool(
+                dict(model_path=model_path, cascade_path=cascade_path, **detector_options),
+                workers=workers,
+                threads_per_worker=worker_threads,
+                warmup_batch_sizes=warmup_batch_sizes
+            )
+            detector = PooledEmotionDetector(
+                pool,
+                decode_width=detector_options.get('decode_width', 640),
+                degraded_width=detector_options.get('degraded_width', 240)
+            )
+        else:
+            detector = EmotionDetector(model_path, cascade_path, **detector_options)
+            if batching:
+                detector.enable_batching(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+        _set_detector_status(state='warming_up', load_seconds=round(time.perf_counter() - start, 3))
+        warmup_ms = detector.warm_up(warmup_batch_sizes) if warmup_batch_sizes else {}
+
+    except Exception as e:
+        _set_detector_status(state='failed', error=str(e))
+        raise
+
+    emotion_detector = detector
+    _set_detector_status(state='ready', warmup_ms=warmup_ms)
     return emotion_detector
 
 
+def set_emotion_detector(detector):
+    """Install an already built detector (e.g. a stub for load tests) as the global instance"""
+    global emotion_detector
+    emotion_detector = detector
+    _set_detector_status(state='ready', error=None)
+    return emotion_detector
+
+
+def init_emotion_detector_async(*args, executor=None, **kwargs):
+    """
+    Load and warm up the detector on a background thread so startup and
+    non-detection endpoints do not wait for TensorFlow
+
+    Args:
+        executor: Native thread pool to load on in async server modes (server_mode.NativeExecutor)
+    """
+    def load():
+        try:
+            init_emotion_detector(*args, **kwargs)
+            status = get_detector_status()
+            print(f"✅ Emotion detector ready (load {status['load_seconds']}s, warm-up {status['warmup_ms']})")
+        except Exception as e:
+            print(f"❌ Error initializing emotion detector: {e}")
+
+    _set_detector_status(state='loading', error=None)
+    if executor is not None:
+        return executor.spawn(load)
+    thread = threading.Thread(target=load, name='emotion-detector-init', daemon=True)
+    thread.start()
+    return thread
+
+
 def get_emotion_detector():
     """Get the global emotion detector instance"""
     global emotion_detector
     if emotion_detector is None:
+        if detector_status['state'] in ('loading', 'warming_up'):
+            raise RuntimeError("Emotion detector is still loading")
         raise RuntimeError("Emotion detector not initialized. Call init_emotion_detector first.")
-    return emotion_detector
\ No newline at end of file
+    return emotion_detector
@@ -0,0 +1,15 @@
+"""
+Emotion classes of the model, in the order of its output vector.
+
+Kept apart from emotion_detector so storage and wire formats can use them
+without importing OpenCV and the inference code.
+"""
+EMOTION_LABELS = [
+    'Angry',
+    'Disgust',
+    'Fear',
+    'Happy',
+    'Neutral',
+    'Sad',
+    'Surprise'
+]
@@ -1,12 +1,26 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from emotion_detector import get_emotion_detector
+from admission import DetectionShed, get_admission_controller, parse_deadline_ms
 from models import db, User, Session, Question, EmotionAnalysis
 import json
 
 emotion_bp = Blueprint('emotion', __name__)
 
 
+def _request_deadline_ms(data=None):
+    """Client deadline for this frame, from the body or the X-Deadline-Ms header"""
+    deadline = (data or {}).get('deadline_ms') or request.headers.get('X-Deadline-Ms') \
+        or request.args.get('deadline_ms')
+    return parse_deadline_ms(deadline)
+
+
+def _shed_response(shed):
+    response = jsonify(shed.to_dict())
+    response.headers['Retry-After'] = str(shed.retry_after)
+    return response, 503
+
+
 @emotion_bp.route('/detect-emotion', methods=['POST'])
 @jwt_required()
 def detect_emotion():
@@ -27,15 +41,93 @@ def detect_emotion():
             return jsonify({'error': 'No data provided'}), 400
 
         # Check if image data is provided
+        # Frames from the same session/question share a face track
+        stream_key = None
+        if data.get('session_id') and data.get('question_id'):
+            stream_key = f"{user_id}:{data['session_id']}:{data['question_id']}"
+
         if 'image' in data:
-            # Detect emotion from base64 image
-            result = detector.detect_emotion_from_base64(data['image'])
+            # Detect emotion from base64 image, unless it can't be answered before its deadline
+            result, _ = get_admission_controller().run(
+                lambda degraded: detector.detect_emotion_from_base64(
+                    data['image'],
+                    largest_face_only=bool(data.get('largest_face_only', False)),
+                    stream_key=stream_key,
+                    degraded=degraded
+                ),
+                deadline_ms=_request_deadline_ms(data)
+            )
         else:
             # Capture from webcam
             result = detector.detect_emotion_from_webcam_capture()
 
         return jsonify(result), 200
 
+    except DetectionShed as shed:
+        return _shed_response(shed)
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Emotion detection failed: {str(e)}',
+            'detected': False
+        }), 500
+
+
+BINARY_IMAGE_TYPES = ('image/jpeg', 'image/webp', 'image/png')
+
+
+@emotion_bp.route('/detect-emotion/binary', methods=['POST'])
+@jwt_required()
+def detect_emotion_binary():
+    """
+    Detect emotion from a raw image body (image/jpeg, image/webp, image/png)
+    or a multipart upload with an 'image' file field.
+
+    Optional query parameters: session_id, question_id, largest_face_only
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        detector = get_emotion_detector()
+
+        if request.mimetype in BINARY_IMAGE_TYPES:
+            image_data = request.get_data(cache=False)
+        elif request.mimetype == 'multipart/form-data' and 'image' in request.files:
+            image_data = request.files['image'].read()
+        else:
+            return jsonify({'error': f'Unsupported content type. Send {", ".join(BINARY_IMAGE_TYPES)} '
+                                     f'or multipart/form-data with an image field'}), 415
+
+        if not image_data:
+            return jsonify({'error': 'No image data provided'}), 400
+
+        # Frames from the same session/question share a face track
+        stream_key = None
+        session_id = request.args.get('session_id')
+        question_id = request.args.get('question_id')
+        if session_id and question_id:
+            stream_key = f"{user_id}:{session_id}:{question_id}"
+
+        largest_face_only = request.args.get('largest_face_only', 'false').lower() == 'true'
+        result, _ = get_admission_controller().run(
+            lambda degraded: detector.detect_emotion_from_bytes(
+                image_data,
+                largest_face_only=largest_face_only,
+                stream_key=stream_key,
+                degraded=degraded
+            ),
+            deadline_ms=_request_deadline_ms()
+        )
+
+        return jsonify(result), 200
+
+    except DetectionShed as shed:
+        return _shed_response(shed)
+
     except Exception as e:
         return jsonify({
             'error': f'Emotion detection failed: {str(e)}',
@@ -139,10 +231,17 @@ def test_emotion_detector():
     """
     try:
         detector = get_emotion_detector()
-        return jsonify({
+        response = {
             'status': 'Emotion detector initialized successfully',
             'emotion_labels': detector.emotion_labels
-        }), 200
+        }
+
+        frame_cache = getattr(detector, 'frame_cache', None)
+        if frame_cache is not None:
+            response['frame_cache'] = frame_cache.stats()
+        response['admission'] = get_admission_controller().stats()
+
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({
             'error': f'Emotion detector not available: {str(e)}'
@@ -0,0 +1,173 @@
+"""
+Packed columnar storage of the per-frame samples of an emotion analysis.
+
+A blob holds one column per field instead of a JSON list of dicts:
+
+    header       version u8, flags u8, count u32, base_ms i64 (little endian)
+    emotion      u8[count]       index into EMOTION_LABELS
+    confidence   f16[count]
+    time         i16/i32[count]  ms since the previous sample (the first one since base_ms)
+    probability  f16[count, 7]   all_emotions vector, only if every sample has one
+
+Timestamps are the ISO strings clients send (naive, or UTC with 'Z' or
++00:00, which both come back as 'Z'); confidences and probabilities are
+kept to float16 precision (~3 decimals). Samples that do not fit this
+layout (unknown emotions, extra fields, non-numeric confidences, missing,
+mixed or non-UTC timestamps) raise ValueError so the caller can store them
+as JSON instead.
+"""
+import numbers
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from emotion_labels import EMOTION_LABELS
+
+VERSION = 1
+HEADER = struct.Struct('<BBIq')
+
+FLAG_UTC = 1            # timestamps were UTC ('Z' / +00:00)
+FLAG_WIDE_TIME = 2      # int32 time deltas (int16 otherwise)
+FLAG_PROBABILITIES = 4  # probability vectors present
+
+SAMPLE_FIELDS = {'emotion', 'confidence', 'timestamp'}
+EMOTION_INDEX = {label: i for i, label in enumerate(EMOTION_LABELS)}
+_LABELS = np.array(EMOTION_LABELS, dtype=object)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _is_real(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _timestamp_ms(timestamp):
+    """Epoch ms of an ISO timestamp and whether it was timezone aware"""
+    if not isinstance(timestamp, str):
+        raise ValueError(f'Unsupported timestamp {timestamp!r}')
+    # fromisoformat() only accepts a trailing 'Z' (toISOString()) from Python 3.11
+    if timestamp.endswith('Z'):
+        timestamp = timestamp[:-1] + '+00:00'
+    dt = datetime.fromisoformat(timestamp)
+    aware = dt.tzinfo is not None
+    if aware:
+        # Only UTC round-trips: the blob has no room for the original offset
+        if dt.utcoffset() != timedelta(0):
+            raise ValueError(f'Unsupported non-UTC timestamp {timestamp!r}')
+        dt = dt.replace(tzinfo=None)
+    return (dt - _EPOCH) // timedelta(milliseconds=1), aware
+
+
+def pack_samples(raw_data):
+    """
+    Pack {emotion, confidence, timestamp[, all_emotions]} samples into a blob
+
+    Args:
+        raw_data (list): Samples in the EmotionAnalysis.raw_data format
+
+    Returns:
+        bytes: Packed samples
+
+    Raises:
+        ValueError: If the samples cannot be packed without losing information
+    """
+    if not isinstance(raw_data, list):
+        raise ValueError(f'Unsupported samples {type(raw_data).__name__}')
+    count = len(raw_data)
+    with_probabilities = count > 0 and all(isinstance(sample, dict) and 'all_emotions' in sample
+                                           for sample in raw_data)
+    fields = SAMPLE_FIELDS | {'all_emotions'} if with_probabilities else SAMPLE_FIELDS
+
+    emotions = np.empty(count, dtype=np.uint8)
+    confidences = np.empty(count, dtype=np.float16)
+    times = np.empty(count, dtype=np.int64)
+    probabilities = np.empty((count, len(EMOTION_LABELS)), dtype=np.float16) if with_probabilities else None
+    aware = set()
+
+    for i, sample in enumerate(raw_data):
+        if not isinstance(sample, dict) or set(sample) != fields or \
+                not isinstance(sample['emotion'], str) or sample['emotion'] not in EMOTION_INDEX:
+            raise ValueError(f'Unsupported sample {sample!r}')
+        confidence = sample['confidence']
+        if not _is_real(confidence):
+            raise ValueError(f'Unsupported confidence {confidence!r}')
+        if with_probabilities:
+            all_emotions = sample['all_emotions']
+            if not isinstance(all_emotions, dict) or set(all_emotions) != EMOTION_INDEX.keys() or \
+                    not all(_is_real(value) for value in all_emotions.values()):
+                raise ValueError(f'Unsupported all_emotions {all_emotions!r}')
+        emotions[i] = EMOTION_INDEX[sample['emotion']]
+        confidences[i] = confidence
+        times[i], is_aware = _timestamp_ms(sample['timestamp'])
+        aware.add(is_aware)
+        if with_probabilities:
+            probabilities[i] = [all_emotions[label] for label in EMOTION_LABELS]
+    if len(aware) > 1:
+        raise ValueError('Mixed naive and timezone aware timestamps')
+
+    base_ms = int(times[0]) if count else 0
+    deltas = np.diff(times, prepend=base_ms)
+    wide = count > 0 and (deltas.min() < -2 ** 15 or deltas.max() >= 2 ** 15)
+    if wide and (deltas.min() < -2 ** 31 or deltas.max() >= 2 ** 31):
+        raise ValueError('Time between samples out of range')
+
+    flags = (FLAG_UTC if True in aware else 0) | (FLAG_WIDE_TIME if wide else 0) | \
+            (FLAG_PROBABILITIES if with_probabilities else 0)
+    parts = [HEADER.pack(VERSION, flags, count, base_ms),
+             emotions.tobytes(),
+             confidences.astype('<f2').tobytes(),
+             deltas.astype('<i4' if wide else '<i2').tobytes()]
+    if with_probabilities:
+        parts.append(probabilities.astype('<f2').tobytes())
+    return b''.join(parts)
+
+
+def unpack_samples(blob):
+    """
+    Decode a blob from pack_samples() into NumPy arrays
+
+    Returns:
+        dict: emotion (uint8 label indices), confidence (float16), timestamp_ms (int64 epoch ms),
+            probabilities (float16 count x 7, or None) and utc (bool)
+    """
+    version, flags, count, base_ms = HEADER.unpack_from(blob)
+    if version != VERSION:
+        raise ValueError(f'Unsupported emotion samples version {version}')
+
+    offset = HEADER.size
+    emotions = np.frombuffer(blob, dtype=np.uint8, count=count, offset=offset)
+    offset += count
+    confidences = np.frombuffer(blob, dtype='<f2', count=count, offset=offset)
+    offset += 2 * count
+    time_dtype = np.dtype('<i4' if flags & FLAG_WIDE_TIME else '<i2')
+    deltas = np.frombuffer(blob, dtype=time_dtype, count=count, offset=offset)
+    offset += time_dtype.itemsize * count
+
+    probabilities = None
+    if flags & FLAG_PROBABILITIES:
+        probabilities = np.frombuffer(blob, dtype='<f2', count=count * len(EMOTION_LABELS),
+                                      offset=offset).reshape(count, len(EMOTION_LABELS))
+
+    return {
+        'emotion': emotions,
+        'confidence': confidences,
+        'timestamp_ms': base_ms + np.cumsum(deltas, dtype=np.int64),
+        'probabilities': probabilities,
+        'utc': bool(flags & FLAG_UTC)
+    }
+
+
+def to_raw_data(arrays):
+    """Samples decoded by unpack_samples() back in the EmotionAnalysis.raw_data format"""
+    emotions = _LABELS[arrays['emotion']].tolist()
+    confidences = arrays['confidence'].astype(float).round(3).tolist()
+    timestamps = np.datetime_as_string(arrays['timestamp_ms'].astype('datetime64[ms]'), unit='ms')
+    if arrays['utc']:
+        timestamps = np.char.add(timestamps, 'Z')
+    raw_data = [{'emotion': emotion, 'confidence': confidence, 'timestamp': timestamp}
+                for emotion, confidence, timestamp in zip(emotions, confidences, timestamps.tolist())]
+
+    if arrays['probabilities'] is not None:
+        for sample, probabilities in zip(raw_data, arrays['probabilities'].astype(float).round(3).tolist()):
+            sample['all_emotions'] = dict(zip(EMOTION_LABELS, probabilities))
+    return raw_data
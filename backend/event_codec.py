@@ -0,0 +1,221 @@
+"""
+Per-connection encoding of Socket.IO events.
+
+Clients ask for an encoding when they connect (auth {'encodings': ['msgpack', 'json']}
+or ?encoding=msgpack) and the server answers with the chosen one in the
+'connected' event. JSON connections get events exactly as before; msgpack
+connections get each event as one binary attachment with a compact schema:
+
+    real_time_emotion           [emotion, confidence, t_ms, seq, dropped, [[emotion, confidence, offset_ms], ...]]
+    session_state_update        [current_question_index, is_analyzing, participants_count]
+    emotion_analysis_completed  [question_id, message, persisted, summary]
+        summary: [dominant_emotion, dominant_percentage, avg_confidence, total_detections,
+                  {emotion: count}, duration] or the original map if it has another shape
+
+Other events (e.g. the WebRTC signaling relays) carry opaque strings that
+do not shrink, so they stay JSON for every connection.
+
+Emotions are indices into EMOTION_LABELS (-1 if unknown), confidences and
+percentages single precision floats, timestamps epoch milliseconds.
+
+Events sent to a room go to its per-encoding sub-rooms (<room>:json and
+<room>:msgpack), which connections join alongside the room itself.
+"""
+import threading
+from datetime import datetime
+
+from emotion_labels import EMOTION_LABELS
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+EMOTION_INDEX = {label: i for i, label in enumerate(EMOTION_LABELS)}
+
+
+def available_encodings():
+    return ('msgpack', 'json') if msgpack is not None else ('json',)
+
+
+def encoding_room(room, encoding):
+    """Sub-room of a room with the connections using this encoding"""
+    return f'{room}:{encoding}'
+
+
+def _emotion_index(emotion):
+    return EMOTION_INDEX.get(emotion, -1)
+
+
+def _emotion_label(index):
+    return EMOTION_LABELS[index] if 0 <= index < len(EMOTION_LABELS) else None
+
+
+def _epoch_ms(timestamp):
+    if isinstance(timestamp, str):
+        return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+    return int(timestamp * 1000) if timestamp is not None else None
+
+
+def _pack_summary(summary):
+    if not isinstance(summary, dict) or 'dominant_emotion' not in summary:
+        return summary
+    return [
+        _emotion_index(summary['dominant_emotion']),
+        summary.get('dominant_percentage'),
+        summary.get('avg_confidence'),
+        summary.get('total_detections'),
+        {_emotion_index(e): count for e, count in (summary.get('emotion_counts') or {}).items()},
+        summary.get('duration')
+    ]
+
+
+def _unpack_summary(summary):
+    if not isinstance(summary, list):
+        return summary
+    dominant, percentage, confidence, total, counts, duration = summary
+    return {
+        'dominant_emotion': _emotion_label(dominant),
+        'dominant_percentage': percentage,
+        'avg_confidence': confidence,
+        'total_detections': total,
+        'emotion_counts': {_emotion_label(i): count for i, count in counts.items()},
+        'duration': duration
+    }
+
+
+def _pack_real_time_emotion(payload):
+    return [
+        _emotion_index(payload['emotion']),
+        payload['confidence'],
+        _epoch_ms(payload.get('timestamp')),
+        payload.get('seq'),
+        payload.get('dropped', 0),
+        [[_emotion_index(e), c, offset] for e, c, offset in payload.get('series', ())]
+    ]
+
+
+def _unpack_real_time_emotion(values):
+    emotion, confidence, t_ms, seq, dropped, series = values
+    return {
+        'emotion': _emotion_label(emotion),
+        'confidence': confidence,
+        'timestamp_ms': t_ms,
+        'series': [[_emotion_label(e), c, offset] for e, c, offset in series],
+        'seq': seq,
+        'dropped': dropped
+    }
+
+
+def _pack_session_state_update(payload):
+    return [payload['current_question_index'], payload['is_analyzing'], payload['participants_count']]
+
+
+def _unpack_session_state_update(values):
+    index, analyzing, count = values
+    return {'current_question_index': index, 'is_analyzing': analyzing, 'participants_count': count}
+
+
+def _pack_emotion_analysis_completed(payload):
+    return [payload.get('question_id'), payload.get('message'), payload.get('persisted', False),
+            _pack_summary(payload.get('emotion_summary'))]
+
+
+def _unpack_emotion_analysis_completed(values):
+    question_id, message, persisted, summary = values
+    return {'question_id': question_id, 'message': message, 'persisted': persisted,
+            'emotion_summary': _unpack_summary(summary)}
+
+
+SCHEMAS = {
+    'real_time_emotion': (_pack_real_time_emotion, _unpack_real_time_emotion),
+    'session_state_update': (_pack_session_state_update, _unpack_session_state_update),
+    'emotion_analysis_completed': (_pack_emotion_analysis_completed, _unpack_emotion_analysis_completed)
+}
+
+
+def pack(event, payload):
+    """Encode an event payload as compact msgpack bytes"""
+    schema = SCHEMAS.get(event)
+    values = schema[0](payload) if schema else payload
+    return msgpack.packb(values, use_single_float=True)
+
+
+def unpack(event, data):
+    """Decode bytes produced by pack() back to a payload dict"""
+    values = msgpack.unpackb(data, strict_map_key=False)
+    schema = SCHEMAS.get(event)
+    return schema[1](values) if schema else values
+
+
+class EventEncoder:
+    """
+    Encoding negotiated by each connection and emits that honour it
+    """
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self._encodings = {}
+        self._lock = threading.Lock()
+
+    def negotiate(self, sid, requested):
+        """
+        Pick the first requested encoding the server supports (JSON otherwise)
+
+        Args:
+            sid (str): Connection id
+            requested: Encoding name or list of names in order of preference
+        """
+        if isinstance(requested, str):
+            requested = [requested]
+        supported = available_encodings()
+        encoding = next((e for e in requested or () if e in supported), 'json')
+        with self._lock:
+            if encoding == 'json':
+                self._encodings.pop(sid, None)
+            else:
+                self._encodings[sid] = encoding
+        return encoding
+
+    def encoding(self, sid):
+        return self._encodings.get(sid, 'json')
+
+    def forget(self, sid):
+        with self._lock:
+            self._encodings.pop(sid, None)
+
+    def rooms(self, sid, room):
+        """Rooms a connection joins to receive the encoded events sent to room"""
+        return [room, encoding_room(room, self.encoding(sid))]
+
+    def emit(self, event, payload, room=None, sid=None, skip_sid=None):
+        """
+        Emit an event to the per-encoding sub-rooms of room, or to a single connection
+
+        Args:
+            event (str): Event name
+            payload (dict): JSON payload
+            room (str): Room joined through rooms()
+            sid (str): Single connection (instead of room)
+            skip_sid: Connection id or list of ids to leave out
+        """
+        if sid is not None:
+            if event in SCHEMAS and self.encoding(sid) == 'msgpack':
+                payload = pack(event, payload)
+            self.socketio.emit(event, payload, to=sid)
+            return
+
+        if event not in SCHEMAS or msgpack is None:
+            self.socketio.emit(event, payload, to=room, skip_sid=skip_sid)
+            return
+
+        self.socketio.emit(event, payload, to=encoding_room(room, 'json'), skip_sid=skip_sid)
+        self.socketio.emit(event, pack(event, payload), to=encoding_room(room, 'msgpack'), skip_sid=skip_sid)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for encoding in self._encodings.values():
+                counts[encoding] = counts.get(encoding, 0) + 1
+            return counts
+
@@ -0,0 +1,100 @@
+import os
+
+import cv2
+import numpy as np
+
+
+class FaceDetector:
+    """
+    Haar cascade face detection on a downscaled working copy of the frame.
+
+    Detection runs on a frame resized to a working width, with cascade
+    parameters adapted to that size and to the last known face size.
+    Boxes are mapped back to the input frame so the ROI can be cropped at
+    full resolution.
+    """
+
+    def __init__(self, cascade_path, working_width=320, scale_factor=None, min_neighbors=None):
+        """
+        Args:
+            cascade_path (str): Haar cascade XML file
+            working_width (int): Width detection runs at; wider frames are downscaled (None/0 disables)
+            scale_factor (float): Fixed cascade scaleFactor, adaptive when None
+            min_neighbors (int): Fixed cascade minNeighbors, adaptive when None
+        """
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(f"Cascade file not found at {cascade_path}")
+
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        self.working_width = working_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def cascade_params(self, shape, face_size=None):
+        """
+        Cascade parameters for a working image of the given shape
+
+        Args:
+            shape (tuple): (height, width) of the image the cascade runs on
+            face_size (float): Last known face size in the same pixels, narrows the size search
+
+        Returns:
+            dict: Keyword arguments for detectMultiScale
+        """
+        min_dim = min(shape[:2])
+        small = min_dim <= 240
+
+        params = {
+            'scaleFactor': 1.1 if small else 1.2,
+            'minNeighbors': 4 if small else 5,
+            'minSize': (max(20, int(min_dim * 0.08)),) * 2
+        }
+
+        if face_size:
+            # Only look for faces close to the size we saw last
+            min_face = max(20, int(face_size * 0.7))
+            max_face = max(min_face + 1, int(face_size * 1.5))
+            params['scaleFactor'] = 1.1
+            params['minSize'] = (min_face, min_face)
+            params['maxSize'] = (max_face, max_face)
+
+        if self.scale_factor:
+            params['scaleFactor'] = self.scale_factor
+        if self.min_neighbors:
+            params['minNeighbors'] = self.min_neighbors
+
+        return params
+
+    def detect(self, gray, face_size=None):
+        """
+        Detect faces in a grayscale image
+
+        Args:
+            gray: Grayscale image
+            face_size (float): Last known face size in gray pixels, if any
+
+        Returns:
+            list: (x, y, w, h) boxes in gray pixel coordinates
+        """
+        height, width = gray.shape[:2]
+        ratio = 1.0
+        working = gray
+
+        if self.working_width and width > self.working_width:
+            ratio = width / self.working_width
+            working = cv2.resize(
+                gray,
+                (self.working_width, max(1, int(round(height / ratio)))),
+                interpolation=cv2.INTER_AREA
+            )
+
+        params = self.cascade_params(working.shape, face_size / ratio if face_size else None)
+        faces = self.cascade.detectMultiScale(working, **params)
+
+        if len(faces) == 0:
+            return []
+
+        boxes = np.round(np.asarray(faces, dtype=np.float32) * ratio).astype(int)
+        boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+        boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+        return [tuple(int(v) for v in box) for box in boxes]
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def _iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = ix * iy
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """
+    Tracks the main face of a single stream so that most frames only run the
+    cascade on a padded window around the previous face box.
+
+    Boxes are kept in original image pixels, so frames decoded at different
+    resolutions can share a track.
+    """
+
+    def __init__(self, full_scan_interval=10, padding=0.5):
+        """
+        Args:
+            full_scan_interval (int): Force a full-frame scan every K frames
+            padding (float): Window padding around the last box, as a fraction of its size
+        """
+        self.full_scan_interval = max(1, int(full_scan_interval))
+        self.padding = padding
+
+        self.last_box = None
+        self.confidence = 0.0
+        self.frames_since_full_scan = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.last_box = None
+        self.confidence = 0.0
+        self.frames_since_full_scan = 0
+
+    def detect(self, gray, detect_fn, scale=1.0):
+        """
+        Find faces in a frame, searching around the last known face when possible
+
+        Args:
+            gray: Grayscale frame
+            detect_fn: Callable(image, face_size=None) running the cascade, returning (x, y, w, h) boxes
+            scale (float): Factor mapping gray pixels back to original image pixels
+
+        Returns:
+            tuple: (faces in gray pixel coordinates, tracking info dict)
+        """
+        with self.lock:
+            self.last_seen = time.monotonic()
+            self.frames_since_full_scan += 1
+            faces = []
+            mode = 'full'
+
+            if self.last_box is not None and self.frames_since_full_scan < self.full_scan_interval:
+                faces = self._detect_in_window(gray, detect_fn, scale)
+                mode = 'window'
+
+            # Track lost or periodic refresh: scan the whole frame
+            if len(faces) == 0:
+                faces = [tuple(int(v) for v in face) for face in detect_fn(gray)]
+                mode = 'full' if mode == 'full' else 'reacquire'
+                self.frames_since_full_scan = 0
+
+            self._update(faces, scale)
+
+            return faces, {
+                'mode': mode,
+                'confidence': round(self.confidence, 3),
+                'tracking': self.last_box is not None
+            }
+
+    def _detect_in_window(self, gray, detect_fn, scale):
+        x, y, w, h = (v / scale for v in self.last_box)
+        pad_x, pad_y = w * self.padding, h * self.padding
+
+        height, width = gray.shape[:2]
+        x0, y0 = max(0, int(x - pad_x)), max(0, int(y - pad_y))
+        x1, y1 = min(width, int(x + w + pad_x)), min(height, int(y + h + pad_y))
+        if x1 <= x0 or y1 <= y0:
+            return []
+
+        window = gray[y0:y1, x0:x1]
+        faces = detect_fn(window, face_size=max(w, h))
+        return [(int(fx) + x0, int(fy) + y0, int(fw), int(fh)) for (fx, fy, fw, fh) in faces]
+
+    def _update(self, faces, scale):
+        if len(faces) == 0:
+            self.reset()
+            return
+
+        main_face = max(faces, key=lambda f: f[2] * f[3])
+        box = tuple(v * scale for v in main_face)
+
+        if self.last_box is None:
+            # Newly acquired track
+            self.confidence = 0.5
+        else:
+            self.confidence = 0.5 * self.confidence + 0.5 * _iou(self.last_box, box)
+
+        self.last_box = box
+
+
+class FaceTrackerRegistry:
+    """Per-stream face trackers keyed by session/question, with idle eviction"""
+
+    def __init__(self, full_scan_interval=10, padding=0.5, max_streams=1000, idle_ttl=300):
+        self.full_scan_interval = full_scan_interval
+        self.padding = padding
+        self.max_streams = max_streams
+        self.idle_ttl = idle_ttl
+
+        self._trackers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get or create the tracker for a stream"""
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = FaceTracker(self.full_scan_interval, self.padding)
+                self._trackers[key] = tracker
+            else:
+                self._trackers.move_to_end(key)
+
+            self._evict()
+            return tracker
+
+    def drop(self, key):
+        with self._lock:
+            self._trackers.pop(key, None)
+
+    def __len__(self):
+        return len(self._trackers)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._trackers:
+            key, tracker = next(iter(self._trackers.items()))
+            if len(self._trackers) > self.max_streams or now - tracker.last_seen > self.idle_ttl:
+                del self._trackers[key]
+            else:
+                break
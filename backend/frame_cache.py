@@ -0,0 +1,130 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def dhash(gray, hash_size=8):
+    """
+    Difference hash of a grayscale image: 64 bits (for hash_size=8) comparing
+    neighbouring pixels of a tiny downscaled copy
+    """
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class FrameResultCache:
+    """
+    Per-stream cache of the last detection result, keyed by perceptual hashes
+    of the frame and of the face region.
+
+    A frame whose hashes are within max_distance bits of the previous frame's
+    reuses its result instead of running detection and inference again, as
+    long as it was detected the same way (same variant). Results are copied
+    in and out so callers may annotate them freely.
+    """
+
+    def __init__(self, max_distance=4, ttl=5.0, max_streams=1000):
+        """
+        Args:
+            max_distance (int): Maximum Hamming distance between hashes to reuse a result
+            ttl (float): Seconds a cached result may be reused for
+            max_streams (int): Maximum number of streams kept (least recently used are evicted)
+        """
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_streams = max_streams
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, stream_key, gray, scale=1.0, variant=None):
+        """
+        Find a reusable result for this frame
+
+        Args:
+            variant: Detection settings the result must have been computed with
+
+        Returns:
+            tuple: (cached result or None, frame hash to pass to store)
+        """
+        frame_hash = dhash(gray)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(stream_key)
+            if entry is not None and now - entry['time'] > self.ttl:
+                del self._entries[stream_key]
+                self.evictions += 1
+                entry = None
+
+            if entry is not None and entry['variant'] == variant and \
+                    hamming(frame_hash, entry['frame_hash']) <= self.max_distance:
+                roi_hash = self._roi_hash(gray, entry['result'], scale)
+                if roi_hash == entry['roi_hash'] or (
+                        roi_hash is not None and entry['roi_hash'] is not None
+                        and hamming(roi_hash, entry['roi_hash']) <= self.max_distance):
+                    self._entries.move_to_end(stream_key)
+                    self.hits += 1
+                    return copy.deepcopy(entry['result']), frame_hash
+
+            self.misses += 1
+            return None, frame_hash
+
+    def store(self, stream_key, frame_hash, gray, result, scale=1.0, variant=None):
+        """Remember the result computed for this frame"""
+        if result.get('error'):
+            return
+
+        entry = {
+            'frame_hash': frame_hash,
+            'roi_hash': self._roi_hash(gray, result, scale),
+            'result': copy.deepcopy(result),
+            'variant': variant,
+            'time': time.monotonic()
+        }
+
+        with self._lock:
+            self._entries[stream_key] = entry
+            self._entries.move_to_end(stream_key)
+            while len(self._entries) > self.max_streams:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def drop(self, stream_key):
+        with self._lock:
+            self._entries.pop(stream_key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'streams': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _roi_hash(self, gray, result, scale):
+        """Hash of the main face region, or None when the result has no face"""
+        face = result.get('face_coordinates')
+        if not face:
+            return None
+
+        x, y = int(face['x'] / scale), int(face['y'] / scale)
+        w, h = int(face['width'] / scale), int(face['height'] / scale)
+        roi = gray[max(0, y):y + h, max(0, x):x + w]
+        if roi.size == 0:
+            return None
+        return dhash(roi)
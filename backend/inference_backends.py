@@ -0,0 +1,132 @@
+"""
+Inference backends for the emotion model.
+
+Every backend exposes predict(batch) taking a float32 (N, 48, 48, 1) batch
+scaled to [0, 1] and returning an (N, 7) array of emotion probabilities.
+Runtimes are imported lazily so only the selected one is loaded.
+"""
+import os
+import threading
+
+import numpy as np
+
+
+class KerasBackend:
+    """Full TensorFlow/Keras model loaded from an .h5 file"""
+
+    name = 'keras'
+
+    def __init__(self, model_path, num_threads=None):
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+
+        self.model = load_model(model_path)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class TFLiteBackend:
+    """
+    TFLite interpreter, works with float32, float16 and int8 quantized models.
+
+    The interpreter is not thread-safe, so predict() runs one batch at a time.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input_details['shape'][0])
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch_size = len(batch)
+        with self._lock:
+            if batch_size != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_details['index'], [batch_size, 48, 48, 1])
+                self.interpreter.allocate_tensors()
+                self.input_details = self.interpreter.get_input_details()[0]
+                self.output_details = self.interpreter.get_output_details()[0]
+                self._batch_size = batch_size
+
+            self.interpreter.set_tensor(self.input_details['index'], self._quantize(batch))
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self.output_details['index']))
+
+    def _quantize(self, batch):
+        dtype = self.input_details['dtype']
+        if dtype == np.float32:
+            return batch
+
+        scale, zero_point = self.input_details['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output):
+        if self.output_details['dtype'] == np.float32:
+            return output
+
+        scale, zero_point = self.output_details['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+
+class OnnxBackend:
+    """ONNX Runtime on the CPU execution provider"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    OnnxBackend.name: OnnxBackend
+}
+
+
+def load_backend(name, model_path, num_threads=None):
+    """
+    Load the inference backend selected by name
+
+    Args:
+        name (str): One of 'keras', 'tflite' or 'onnx'
+        model_path (str): Path to the model artifact for that backend
+        num_threads (int): Optional intra-op thread count
+
+    Returns:
+        Backend instance with a predict(batch) method
+    """
+    backend_cls = BACKENDS.get((name or KerasBackend.name).lower())
+    if backend_cls is None:
+        raise ValueError(f"Unknown model backend '{name}'. Available: {', '.join(BACKENDS)}")
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found at {model_path}")
+
+    return backend_cls(model_path, num_threads=num_threads)
@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceBatcher:
+    """
+    Shared inference queue that gathers face batches from concurrent
+    requests and scores them together in a single forward pass.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5):
+        """
+        Args:
+            predict_fn: Callable that takes a (N, 48, 48, 1) float32 batch and returns (N, 7) probabilities
+            max_batch_size (int): Maximum number of faces per forward pass
+            max_wait_ms (float): Maximum time to wait for more requests once one is queued
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._pending = None
+        self._running = True
+        # Orders submit() against stop() so nothing is queued after the final drain
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, batch):
+        """
+        Queue a batch of face crops for inference
+
+        Returns:
+            Future: Resolves to the (N, 7) probabilities for this batch
+        """
+        future = Future()
+        with self._lock:
+            if self._running:
+                self._queue.put((batch, future))
+                return future
+
+        future.set_exception(RuntimeError('Inference batcher is stopped'))
+        return future
+
+    def predict(self, batch, timeout=None):
+        """Blocking helper with the same signature shape as model.predict"""
+        return self.submit(batch).result(timeout=timeout)
+
+    def qsize(self):
+        """Number of requests waiting to be batched"""
+        return self._queue.qsize()
+
+    def stop(self):
+        """Stop the worker thread and fail any queued requests"""
+        with self._lock:
+            self._running = False
+            self._queue.put(None)
+        self._worker.join(timeout=5)
+        # Worker still busy in predict_fn: do not leave callers waiting on it
+        self._fail_queued()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        if self._pending is not None:
+            first, self._pending = self._pending, None
+        else:
+            first = self._queue.get()
+        if first is None:
+            return None
+
+        items = [first]
+        total = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while total < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                self._queue.put(None)
+                break
+
+            # Keep oversize requests for the next forward pass
+            if total + len(item[0]) > self.max_batch_size:
+                self._pending = item
+                break
+
+            items.append(item)
+            total += len(item[0])
+
+        return items
+
+    def _run(self):
+        while self._running:
+            items = self._collect()
+            if items is None:
+                break
+
+            # Skip requests whose caller already cancelled
+            items = [(batch, future) for batch, future in items if future.set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            try:
+                if len(items) == 1:
+                    predictions = self.predict_fn(items[0][0])
+                else:
+                    predictions = self.predict_fn(np.concatenate([batch for batch, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            # Send each caller its slice of the batch
+            offset = 0
+            for batch, future in items:
+                future.set_result(predictions[offset:offset + len(batch)])
+                offset += len(batch)
+
+        # Fail whatever is still queued after shutdown
+        if self._pending is not None:
+            self._queue.put(self._pending)
+            self._pending = None
+        self._fail_queued()
+
+    def _fail_queued(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError('Inference batcher is stopped'))
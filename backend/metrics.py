@@ -0,0 +1,268 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and fixed-bucket histograms are plain dicts updated under a lock,
+so recording a sample costs a dict lookup and a bisect; nothing is
+computed until /metrics is scraped. Per-request stage and DB timings are
+also kept in a thread-local so they can be returned in a Server-Timing
+header.
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond stages up to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, one extra slot for +Inf
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items()]
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time (returns a number or a {label tuple: value} dict)"""
+
+    def __init__(self, name, help_text, callback, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        try:
+            value = self.callback()
+        except Exception:
+            return lines
+        values = value if isinstance(value, dict) else {(): value}
+        for label_values, v in values.items():
+            if v is not None:
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(v)}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._metrics.get(name) or self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._metrics.get(name) or self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback, labels=()):
+        # Re-registering replaces the callback (e.g. a new app instance)
+        return self.register(Gauge(name, help_text, callback, labels))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route', 'status'))
+HTTP_REQUEST_DB_QUERIES = registry.histogram(
+    'http_request_db_queries', 'DB queries issued per HTTP request', ('route',), buckets=COUNT_BUCKETS)
+HTTP_REQUEST_DB_SECONDS = registry.histogram(
+    'http_request_db_seconds', 'Total DB time per HTTP request', ('route',))
+DB_QUERY_SECONDS = registry.histogram('db_query_duration_seconds', 'Latency of individual DB queries')
+DETECTOR_STAGE_SECONDS = registry.histogram(
+    'detector_stage_duration_seconds', 'Emotion detector latency per pipeline stage', ('stage',))
+DETECTOR_CACHE_RESULTS = registry.counter(
+    'detector_frame_cache_total', 'Frame cache lookups by outcome', ('result',))
+SOCKETIO_EVENTS = registry.counter('socketio_events_total', 'Socket.IO events received', ('event',))
+SOCKETIO_EVENT_SECONDS = registry.histogram(
+    'socketio_event_duration_seconds', 'Socket.IO handler latency', ('event',))
+
+# Timings of the request being served by this thread (for Server-Timing)
+_local = threading.local()
+
+
+def start_request():
+    _local.timings = {}
+    _local.db_queries = 0
+
+
+def request_timings():
+    """Stage timings (seconds) and DB query count recorded for the current request"""
+    return getattr(_local, 'timings', None) or {}, getattr(_local, 'db_queries', 0)
+
+
+def record_stage(stage, seconds):
+    DETECTOR_STAGE_SECONDS.observe(seconds, stage)
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """Time a detector pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def record_db_query(seconds):
+    DB_QUERY_SECONDS.observe(seconds)
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings['db'] = timings.get('db', 0.0) + seconds
+        _local.db_queries += 1
+
+
+def server_timing_header(timings, total=None):
+    """Format stage timings (seconds) as a Server-Timing header value"""
+    parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+_db_instrumented = False
+
+
+def instrument_db(engine_cls):
+    """Count and time every SQL statement executed through SQLAlchemy engines"""
+    global _db_instrumented
+    if _db_instrumented:
+        return
+    _db_instrumented = True
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine_cls, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine_cls, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if starts:
+            record_db_query(time.perf_counter() - starts.pop())
+
+
+def instrument_socketio(socketio):
+    """Wrap socketio.on so every handler registered afterwards counts and times its events"""
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+
+        def instrumented(handler):
+            # Flask-SocketIO retries connect/disconnect without arguments on TypeError;
+            # drop them up front so the event is not counted twice
+            takes_args = bool(inspect.signature(handler).parameters)
+
+            @functools.wraps(handler)
+            def wrapped(*args, **kwargs):
+                if not takes_args:
+                    args, kwargs = (), {}
+                SOCKETIO_EVENTS.inc(message)
+                start_request()
+                start = time.perf_counter()
+                try:
+                    return handler(*args, **kwargs)
+                finally:
+                    SOCKETIO_EVENT_SECONDS.observe(time.perf_counter() - start, message)
+            return decorator(wrapped)
+        return instrumented
+
+    socketio.on = on
+    return socketio
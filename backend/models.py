@@ -102,11 +102,38 @@ class EmotionAnalysis(db.Model):
     avg_confidence = db.Column(db.Float, nullable=True)
     total_detections = db.Column(db.Integer, nullable=False, default=0)
     emotion_counts = db.Column(db.JSON, nullable=True)  # {"Happy": 5, "Sad": 2, etc.}
-    raw_data = db.Column(db.JSON, nullable=True)  # Datos completos de cada detección
+    # Datos completos de cada detección en JSON: filas antiguas y muestras que no caben en EmotionSamples.
+    # Deferred: solo se carga al pedir las muestras
+    raw_data = db.deferred(db.Column(db.JSON(none_as_null=True), nullable=True))
     analysis_duration = db.Column(db.Integer, nullable=True)  # Duración en segundos
     patient_response = db.Column(db.Text, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    samples = db.relationship('EmotionSamples', uselist=False, cascade='all, delete-orphan')
+
+    def set_raw_data(self, raw_data):
+        """Store the per-frame samples packed in EmotionSamples (as JSON if they do not fit)"""
+        from emotion_samples import pack_samples
+        try:
+            data = pack_samples(raw_data or [])
+        except ValueError:
+            self.samples = None
+            self.raw_data = raw_data
+            return
+
+        if self.samples is None:
+            self.samples = EmotionSamples()
+        self.samples.sample_count = len(raw_data or [])
+        self.samples.data = data
+        self.raw_data = None
+
+    def get_raw_data(self):
+        """Per-frame samples as a list of {emotion, confidence, timestamp} dicts"""
+        if self.samples is not None:
+            from emotion_samples import to_raw_data
+            return to_raw_data(self.samples.arrays())
+        return self.raw_data
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -119,4 +146,18 @@ class EmotionAnalysis(db.Model):
             'analysis_duration': self.analysis_duration,
             'patient_response': self.patient_response,
             'timestamp': self.timestamp.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class EmotionSamples(db.Model):
+    """Per-frame samples of an EmotionAnalysis packed as columns (see emotion_samples.py)"""
+    __tablename__ = 'emotion_samples'
+
+    analysis_id = db.Column(db.Integer, db.ForeignKey('emotion_analyses.id', ondelete='CASCADE'), primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.deferred(db.Column(db.LargeBinary(length=2 ** 24), nullable=False))  # MEDIUMBLOB en MySQL
+
+    def arrays(self):
+        """Samples decoded into NumPy arrays (emotion, confidence, timestamp_ms, probabilities)"""
+        from emotion_samples import unpack_samples
+        return unpack_samples(self.data)
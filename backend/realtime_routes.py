@@ -1,13 +1,67 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from emotion_detector import get_emotion_detector
 from models import db, User, Session, Question, EmotionAnalysis
+from session_store import EmotionAggregate
 import json
 from datetime import datetime
 
 realtime_bp = Blueprint('realtime', __name__)
 
 
+def save_emotion_analysis(question_id, summary, raw_data, duration=0, patient_response=''):
+    """
+    Create or update the EmotionAnalysis of a question in one transaction
+
+    Args:
+        question_id (int): Question analyzed
+        summary (dict): EmotionAggregate.summary() of the detections
+        raw_data (list): Detections stored as raw_data
+        duration (int): Analysis duration in seconds
+        patient_response (str): Patient's written answer
+
+    Returns:
+        tuple: (EmotionAnalysis, created)
+    """
+    # Verificar si ya existe un análisis para esta pregunta
+    analysis = EmotionAnalysis.query.filter_by(question_id=question_id).first()
+    created = analysis is None
+    if created:
+        analysis = EmotionAnalysis(question_id=question_id)
+        db.session.add(analysis)
+    else:
+        print(f"Updating existing analysis for question {question_id}")
+        analysis.timestamp = datetime.utcnow()
+
+    analysis.dominant_emotion = summary['dominant_emotion']
+    analysis.dominant_percentage = summary['dominant_percentage']
+    analysis.avg_confidence = summary['avg_confidence']
+    analysis.total_detections = summary['total_detections']
+    analysis.emotion_counts = summary['emotion_counts']
+    analysis.set_raw_data(raw_data)
+    analysis.analysis_duration = duration
+    analysis.patient_response = patient_response
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return analysis, created
+
+
+def analysis_response(analysis, duration=0):
+    """Summary of a saved EmotionAnalysis as returned to the client"""
+    return {
+        'id': analysis.id,
+        'dominant_emotion': analysis.dominant_emotion,
+        'dominant_percentage': round(analysis.dominant_percentage or 0, 2),
+        'avg_confidence': round(analysis.avg_confidence or 0, 3),
+        'total_detections': analysis.total_detections,
+        'emotion_counts': analysis.emotion_counts,
+        'duration': duration
+    }
+
+
 @realtime_bp.route('/continuous-emotion', methods=['POST'])
 @jwt_required()
 def continuous_emotion_detection():
@@ -48,87 +102,27 @@ def continuous_emotion_detection():
             return jsonify({'error': 'Access denied'}), 403
 
         # Procesar datos de emociones continuas
-        emotion_counts = {}
-        total_detections = len(emotions_data)
-        confidence_sum = 0
-
+        aggregate = EmotionAggregate()
         for emotion_data in emotions_data:
-            emotion = emotion_data.get('emotion')
-            confidence = emotion_data.get('confidence', 0)
-            if emotion:
-                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-                confidence_sum += confidence
-
-        # Calcular emoción dominante
-        dominant_emotion = None
-        dominant_percentage = 0
-        if emotion_counts:
-            dominant_emotion = max(emotion_counts.items(), key=lambda x: x[1])[0]
-            dominant_percentage = (emotion_counts[dominant_emotion] / total_detections) * 100
-
-        # Calcular confianza promedio
-        avg_confidence = confidence_sum / total_detections if total_detections > 0 else 0
-
-        # Verificar si ya existe un análisis para esta pregunta
-        existing_analysis = EmotionAnalysis.query.filter_by(question_id=question_id).first()
-
-        if existing_analysis:
-            # Actualizar análisis existente
-            print(f"Updating existing analysis for question {question_id}")
-
-            existing_analysis.dominant_emotion = dominant_emotion
-            existing_analysis.dominant_percentage = dominant_percentage
-            existing_analysis.avg_confidence = avg_confidence
-            existing_analysis.total_detections = total_detections
-            existing_analysis.emotion_counts = emotion_counts
-            existing_analysis.raw_data = emotions_data
-            existing_analysis.analysis_duration = data.get('duration', 0)
-            existing_analysis.patient_response = data.get('patient_response', '')
-            existing_analysis.timestamp = datetime.utcnow()
-
-            db.session.commit()
-
-            return jsonify({
-                'message': 'Emotion analysis updated successfully',
-                'analysis': {
-                    'id': existing_analysis.id,
-                    'dominant_emotion': dominant_emotion,
-                    'dominant_percentage': round(dominant_percentage, 2),
-                    'avg_confidence': round(avg_confidence, 3),
-                    'total_detections': total_detections,
-                    'emotion_counts': emotion_counts,
-                    'duration': data.get('duration', 0)
-                }
-            }), 200
+            aggregate.add(emotion_data.get('emotion'), emotion_data.get('confidence', 0))
+
+        duration = data.get('duration', 0)
+        analysis, created = save_emotion_analysis(
+            question_id,
+            aggregate.summary(),
+            emotions_data,
+            duration=duration,
+            patient_response=data.get('patient_response', '')
+        )
+
+        if created:
+            message, status = 'Continuous emotion analysis saved successfully', 201
         else:
-            # Crear nuevo análisis
-            emotion_analysis = EmotionAnalysis(
-                question_id=question_id,
-                dominant_emotion=dominant_emotion,
-                dominant_percentage=dominant_percentage,
-                avg_confidence=avg_confidence,
-                total_detections=total_detections,
-                emotion_counts=emotion_counts,
-                raw_data=emotions_data,
-                analysis_duration=data.get('duration', 0),
-                patient_response=data.get('patient_response', '')
-            )
-
-            db.session.add(emotion_analysis)
-            db.session.commit()
-
-            return jsonify({
-                'message': 'Continuous emotion analysis saved successfully',
-                'analysis': {
-                    'id': emotion_analysis.id,
-                    'dominant_emotion': dominant_emotion,
-                    'dominant_percentage': round(dominant_percentage, 2),
-                    'avg_confidence': round(avg_confidence, 3),
-                    'total_detections': total_detections,
-                    'emotion_counts': emotion_counts,
-                    'duration': data.get('duration', 0)
-                }
-            }), 201
+            message, status = 'Emotion analysis updated successfully', 200
+        return jsonify({
+            'message': message,
+            'analysis': analysis_response(analysis, duration)
+        }), status
 
     except Exception as e:
         db.session.rollback()
@@ -272,7 +266,7 @@ def get_question_analysis(question_id):
                 'emotion_counts': analysis.emotion_counts,
                 'duration': analysis.analysis_duration,
                 'patient_response': analysis.patient_response,
-                'raw_data': analysis.raw_data,
+                'raw_data': analysis.get_raw_data(),
                 'timestamp': analysis.timestamp.isoformat()
             }
         }), 200
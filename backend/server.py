@@ -0,0 +1,29 @@
+"""
+Production entry point on an async Socket.IO server
+
+Monkey patches the standard library for SOCKETIO_ASYNC_MODE (gevent by
+default) before the app is imported, then serves it without the Werkzeug
+development server:
+
+    python server.py
+    gunicorn -k gevent -w 1 --bind 0.0.0.0:5000 server:app
+
+Use one worker per process; several processes need SESSION_STORE_URL and
+SOCKETIO_MESSAGE_QUEUE pointing to Redis and sticky sessions in the proxy.
+"""
+import os
+
+from server_mode import patch_for_async_mode
+
+ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'gevent')
+patch_for_async_mode(ASYNC_MODE)
+
+from app import create_app  # noqa: E402  (must be imported after monkey patching)
+
+app = create_app({'SOCKETIO_ASYNC_MODE': ASYNC_MODE})
+
+if __name__ == '__main__':
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5000))
+    print(f"🚀 Starting Therapy Meet API ({ASYNC_MODE}) on {host}:{port}...")
+    app.socketio.run(app, host=host, port=port)
@@ -0,0 +1,68 @@
+"""
+Socket.IO server modes.
+
+'threading' (the default, also used by `python app.py`) runs every
+connection and long-poll on its own OS thread. 'gevent' runs them as
+greenlets, so idle connections cost a few KB instead of a thread; it needs
+the standard library monkey patched before anything else is imported
+(server.py does it) and CPU-bound work moved off the event loop:
+
+- emotion detection runs on a bounded pool of native threads
+  (NativeExecutor), sized like the admission controller's concurrency
+- the detector loads on that pool too, so TensorFlow does not block the loop
+- DB work stays on the greenlets: PyMySQL is pure Python and becomes
+  cooperative once sockets are patched, and SQLAlchemy's pool (pool_size +
+  max_overflow) bounds how many run at once
+"""
+
+ASYNC_MODES = ('threading', 'gevent')
+
+
+def patch_for_async_mode(async_mode):
+    """Monkey patch the standard library for async_mode; call before importing the app"""
+    if async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif async_mode not in ASYNC_MODES:
+        raise ValueError(f"Unsupported SOCKETIO_ASYNC_MODE '{async_mode}' (use one of {', '.join(ASYNC_MODES)})")
+
+
+def is_patched(async_mode):
+    if async_mode == 'gevent':
+        from gevent import monkey
+        return monkey.is_module_patched('socket')
+    return True
+
+
+class NativeExecutor:
+    """
+    Bounded pool of native OS threads for CPU-bound calls made from greenlets.
+    run() only suspends the calling greenlet, the event loop keeps serving
+    other connections meanwhile.
+    """
+
+    def __init__(self, max_workers):
+        from gevent.threadpool import ThreadPool
+        self.max_workers = max_workers
+        self.pool = ThreadPool(max_workers)
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn on a native thread and wait for its result"""
+        return self.pool.apply(fn, args, kwargs)
+
+    def spawn(self, fn, *args, **kwargs):
+        """Start fn on a native thread without waiting"""
+        return self.pool.spawn(fn, *args, **kwargs)
+
+    def stats(self):
+        return {'max_workers': self.max_workers, 'busy': len(self.pool)}
+
+
+def create_cpu_executor(async_mode, max_workers):
+    """
+    Executor for CPU-bound work in this mode (None in threading mode, where
+    handlers already run on their own OS thread)
+    """
+    if async_mode == 'gevent':
+        return NativeExecutor(max(1, int(max_workers)))
+    return None
@@ -0,0 +1,93 @@
+"""
+Periodic garbage collection of live session state.
+
+Disconnects remove their participant right away (session_store.remove_sid);
+the sweeper catches the rest every interval: sessions with no activity for
+longer than the store's ttl (abandoned calls, analyses that were never
+stopped) and participants whose connection is gone. Totals are reported by
+the readiness endpoint and as metrics.
+"""
+import threading
+import time
+from datetime import datetime
+
+import metrics
+
+SESSION_GC_RECLAIMED = metrics.registry.counter(
+    'session_gc_reclaimed_total', 'Live session state reclaimed by the sweeper', ('kind',))
+
+
+class SessionSweeper:
+    """Background task running session_store.sweep() every interval"""
+
+    def __init__(self, store, socketio, interval=60, on_evict=None):
+        """
+        Args:
+            store (SessionStore): Store to sweep
+            socketio: Flask-SocketIO instance (runs the task, tells which connections are alive)
+            interval (float): Seconds between sweeps
+            on_evict (callable): Called with the code of each evicted session
+        """
+        self.store = store
+        self.socketio = socketio
+        self.interval = interval
+        self.on_evict = on_evict
+
+        self.totals = {'sessions': 0, 'participants': 0, 'samples': 0, 'bytes': 0}
+        self.runs = 0
+        self.last_run = None
+        self.last_duration_ms = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        if self.interval <= 0 or self._running:
+            return
+        self._running = True
+        self.socketio.start_background_task(self._run)
+
+    def stop(self):
+        self._running = False
+
+    def is_connected(self, sid):
+        return self.socketio.server.manager.is_connected(sid, '/')
+
+    def sweep(self):
+        start = time.perf_counter()
+        reclaimed = self.store.sweep(is_connected=self.is_connected)
+
+        for session_code in reclaimed['session_codes']:
+            if self.on_evict is not None:
+                self.on_evict(session_code)
+
+        with self._lock:
+            for kind in self.totals:
+                self.totals[kind] += reclaimed[kind]
+                if reclaimed[kind]:
+                    SESSION_GC_RECLAIMED.inc(kind, amount=reclaimed[kind])
+            self.runs += 1
+            self.last_run = datetime.now().isoformat()
+            self.last_duration_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        if reclaimed['sessions'] or reclaimed['participants']:
+            print(f"🧹 Session GC: {reclaimed['sessions']} sessions, {reclaimed['participants']} participants, "
+                  f"{reclaimed['samples']} samples (~{reclaimed['bytes'] / 1024:.1f} KB) reclaimed")
+        return reclaimed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'interval': self.interval,
+                'runs': self.runs,
+                'last_run': self.last_run,
+                'last_duration_ms': self.last_duration_ms,
+                'reclaimed': dict(self.totals)
+            }
+
+    def _run(self):
+        while self._running:
+            self.socketio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Session GC failed: {str(e)}")
@@ -0,0 +1,736 @@
+"""
+Live session state shared by the Socket.IO handlers.
+
+State per session code: participants (username, role, sid),
+current_question_index, is_analyzing and the open analysis window
+(analysis_data with the running EmotionAggregate of its samples). The in-memory store
+only works for a single process; the Redis store lets several backend
+processes share the same sessions.
+
+Sessions idle for longer than the store's ttl are reclaimed: Redis keys
+expire on their own, in-memory sessions are evicted by sweep() (run
+periodically by session_gc.SessionSweeper), which also drops participants
+whose connection is gone.
+"""
+import json
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+def _new_state():
+    return {
+        'participants': [],
+        'current_question_index': 0,
+        'is_analyzing': False,
+        'analysis_data': None
+    }
+
+
+class EmotionAggregate:
+    """
+    Running aggregate of the emotions streamed during an analysis window:
+    counts per emotion, confidence sum and a compact (emotion, confidence,
+    timestamp) sample buffer, so closing the window needs no recompute.
+    The buffer keeps the last max_samples samples (all if None); counts and
+    confidence always cover every sample.
+    """
+
+    __slots__ = ('emotion_counts', 'confidence_sum', 'total_detections', 'samples')
+
+    def __init__(self, emotion_counts=None, confidence_sum=0.0, total_detections=0, samples=None,
+                 max_samples=None):
+        self.emotion_counts = emotion_counts or {}
+        self.confidence_sum = confidence_sum
+        self.total_detections = total_detections
+        self.samples = deque(samples or (), maxlen=max_samples)
+
+    def add(self, emotion, confidence=0, timestamp=None):
+        self.total_detections += 1
+        if emotion:
+            self.emotion_counts[emotion] = self.emotion_counts.get(emotion, 0) + 1
+            self.confidence_sum += confidence or 0
+        self.samples.append((emotion, confidence, timestamp))
+
+    def summary(self):
+        """
+        Returns:
+            dict: dominant_emotion, dominant_percentage, avg_confidence, total_detections, emotion_counts
+        """
+        dominant_emotion = None
+        dominant_percentage = 0
+        if self.emotion_counts:
+            dominant_emotion = max(self.emotion_counts.items(), key=lambda x: x[1])[0]
+            dominant_percentage = (self.emotion_counts[dominant_emotion] / self.total_detections) * 100
+
+        return {
+            'dominant_emotion': dominant_emotion,
+            'dominant_percentage': dominant_percentage,
+            'avg_confidence': self.confidence_sum / self.total_detections if self.total_detections > 0 else 0,
+            'total_detections': self.total_detections,
+            'emotion_counts': dict(self.emotion_counts)
+        }
+
+    def raw_data(self):
+        """Samples in the EmotionAnalysis.raw_data format"""
+        return [{'emotion': emotion, 'confidence': confidence, 'timestamp': timestamp}
+                for emotion, confidence, timestamp in self.samples]
+
+    def trimmed(self):
+        """Samples counted but no longer kept in the buffer"""
+        return self.total_detections - len(self.samples)
+
+    def approx_bytes(self):
+        """Approximate memory held by the sample buffer"""
+        return sys.getsizeof(self.samples) + sum(
+            sys.getsizeof(sample) + sum(sys.getsizeof(value) for value in sample) for sample in self.samples)
+
+    def copy(self):
+        return EmotionAggregate(dict(self.emotion_counts), self.confidence_sum, self.total_detections,
+                                self.samples, self.samples.maxlen)
+
+
+def role_room(session_code, role):
+    """Socket.IO sub-room of a session holding only the participants with this role"""
+    return f'{session_code}:{role}'
+
+
+class SessionStore:
+    """Interface of the session state stores. Every method is atomic on its own."""
+
+    def get(self, session_code):
+        """Full state dict of a session, or None"""
+        raise NotImplementedError
+
+    def exists(self, session_code):
+        return self.get(session_code) is not None
+
+    def add_participant(self, session_code, participant):
+        """
+        Create the session if needed and add a participant, replacing one with the same username
+
+        Returns:
+            tuple: (number of participants, sid of the replaced connection or None)
+        """
+        raise NotImplementedError
+
+    def remove_participant(self, session_code, username):
+        """Remove a participant by username and return it, or None"""
+        raise NotImplementedError
+
+    def remove_sid(self, sid):
+        """Remove the participant using this connection and return it (with session_code), or None"""
+        raise NotImplementedError
+
+    def lookup_sid(self, sid):
+        """Participant using this connection (with session_code), or None"""
+        raise NotImplementedError
+
+    def participants(self, session_code):
+        raise NotImplementedError
+
+    def sids(self, session_code, role=None):
+        """Connection ids of a session's participants, optionally only those with a role"""
+        raise NotImplementedError
+
+    def set_question_index(self, session_code, question_index):
+        """Returns False if the session does not exist"""
+        raise NotImplementedError
+
+    def start_analysis(self, session_code, analysis_data):
+        """Open an analysis window; returns False if the session does not exist"""
+        raise NotImplementedError
+
+    def stop_analysis(self, session_code):
+        """Close the analysis window and return its data (with its EmotionAggregate), or None"""
+        raise NotImplementedError
+
+    def append_emotion(self, session_code, sample):
+        """Add a sample to the open analysis window; returns False if none is open"""
+        raise NotImplementedError
+
+    def delete(self, session_code):
+        raise NotImplementedError
+
+    def stats(self):
+        """Counts for health checks and metrics: sessions, participants, analyzing"""
+        raise NotImplementedError
+
+    def sweep(self, is_connected=None):
+        """
+        Reclaim sessions idle for longer than the store's ttl and participants whose connection is gone
+
+        Args:
+            is_connected (callable): sid -> bool for the connections of this process (None skips the check)
+
+        Returns:
+            dict: evicted session_codes, and counts of sessions, participants, samples and bytes reclaimed
+        """
+        raise NotImplementedError
+
+
+def _reclaimed():
+    return {'session_codes': [], 'sessions': 0, 'participants': 0, 'samples': 0, 'bytes': 0}
+
+
+class _SessionEntry:
+    __slots__ = ('lock', 'participants', 'role_sids', 'state', 'last_activity')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # username -> participant, in join order
+        self.participants = {}
+        # role -> set of sids
+        self.role_sids = {}
+        self.state = _new_state()
+        del self.state['participants']
+        self.last_activity = time.monotonic()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+
+class ParticipantRegistry:
+    """
+    Participants of the live sessions of this process, indexed by
+    sid -> (session, username, role), session -> role -> sids and
+    session -> username -> participant.
+
+    Each session has its own lock, so joins, leaves and lookups of different
+    sessions never contend; only creating or dropping a session takes the
+    registry lock.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._by_sid = {}
+        self._lock = threading.Lock()
+
+    def entry(self, session_code, create=False):
+        entry = self._sessions.get(session_code)
+        if entry is None and create:
+            with self._lock:
+                entry = self._sessions.setdefault(session_code, _SessionEntry())
+        return entry
+
+    def join(self, session_code, participant):
+        participant = dict(participant)
+        username, role, sid = participant['username'], participant['role'], participant['sid']
+
+        while True:
+            entry = self.entry(session_code, create=True)
+            with entry.lock:
+                # The sweeper may have dropped the entry before we got its lock
+                if self._sessions.get(session_code) is not entry:
+                    continue
+
+                # Reconnection: the new connection replaces the old one
+                previous = entry.participants.pop(username, None)
+                if previous is not None:
+                    self._unindex(entry, previous)
+
+                entry.participants[username] = participant
+                entry.role_sids.setdefault(role, set()).add(sid)
+                self._by_sid[sid] = (session_code, username, role)
+                count = len(entry.participants)
+                entry.touch()
+                break
+
+        previous_sid = previous['sid'] if previous is not None and previous['sid'] != sid else None
+        return count, previous_sid
+
+    def leave(self, session_code, username):
+        entry = self.entry(session_code)
+        if entry is None:
+            return None
+        with entry.lock:
+            participant = entry.participants.pop(username, None)
+            if participant is not None:
+                self._unindex(entry, participant)
+        return participant
+
+    def leave_sid(self, sid):
+        location = self._by_sid.get(sid)
+        if location is None:
+            return None
+        session_code, username, _ = location
+        entry = self.entry(session_code)
+        if entry is None:
+            return None
+        with entry.lock:
+            participant = entry.participants.get(username)
+            # Only if this sid is still the user's current connection
+            if participant is None or participant['sid'] != sid:
+                return None
+            del entry.participants[username]
+            self._unindex(entry, participant)
+        return dict(participant, session_code=session_code)
+
+    def lookup_sid(self, sid):
+        location = self._by_sid.get(sid)
+        if location is None:
+            return None
+        session_code, username, role = location
+        return {'session_code': session_code, 'username': username, 'role': role, 'sid': sid}
+
+    def participants(self, session_code):
+        entry = self.entry(session_code)
+        if entry is None:
+            return []
+        with entry.lock:
+            return [dict(p) for p in entry.participants.values()]
+
+    def sids(self, session_code, role=None):
+        entry = self.entry(session_code)
+        if entry is None:
+            return []
+        with entry.lock:
+            if role is not None:
+                return list(entry.role_sids.get(role, ()))
+            return [p['sid'] for p in entry.participants.values()]
+
+    def drop(self, session_code, idle_for=None):
+        """
+        Remove a session and its sid index entries
+
+        Args:
+            idle_for (float): Only if it has had no activity for this many seconds
+        """
+        with self._lock:
+            entry = self._sessions.get(session_code)
+            if entry is None:
+                return None
+            # Under the entry lock, so a join either lands before (and keeps the
+            # session active) or sees the entry gone and creates a new one
+            with entry.lock:
+                if idle_for is not None and time.monotonic() - entry.last_activity < idle_for:
+                    return None
+                del self._sessions[session_code]
+                for participant in entry.participants.values():
+                    self._by_sid.pop(participant['sid'], None)
+        return entry
+
+    def session_codes(self):
+        return list(self._sessions)
+
+    def _unindex(self, entry, participant):
+        sids = entry.role_sids.get(participant['role'])
+        if sids is not None:
+            sids.discard(participant['sid'])
+            if not sids:
+                del entry.role_sids[participant['role']]
+        self._by_sid.pop(participant['sid'], None)
+
+
+class InMemorySessionStore(SessionStore):
+    """Session state in an indexed ParticipantRegistry of this process"""
+
+    def __init__(self, ttl=6 * 3600, max_samples=None):
+        """
+        Args:
+            ttl (int): Seconds of inactivity after which sweep() evicts a session
+            max_samples (int): Samples kept per analysis window (None keeps all)
+        """
+        self.registry = ParticipantRegistry()
+        self.ttl = ttl
+        self.max_samples = max_samples
+
+    def get(self, session_code):
+        entry = self.registry.entry(session_code)
+        if entry is None:
+            return None
+        with entry.lock:
+            state = dict(entry.state, participants=[dict(p) for p in entry.participants.values()])
+            if state['analysis_data'] is not None:
+                state['analysis_data'] = dict(state['analysis_data'],
+                                              aggregate=state['analysis_data']['aggregate'].copy())
+            return state
+
+    def exists(self, session_code):
+        return self.registry.entry(session_code) is not None
+
+    def add_participant(self, session_code, participant):
+        return self.registry.join(session_code, participant)
+
+    def remove_participant(self, session_code, username):
+        return self.registry.leave(session_code, username)
+
+    def remove_sid(self, sid):
+        return self.registry.leave_sid(sid)
+
+    def lookup_sid(self, sid):
+        return self.registry.lookup_sid(sid)
+
+    def participants(self, session_code):
+        return self.registry.participants(session_code)
+
+    def sids(self, session_code, role=None):
+        return self.registry.sids(session_code, role)
+
+    def set_question_index(self, session_code, question_index):
+        entry = self.registry.entry(session_code)
+        if entry is None:
+            return False
+        with entry.lock:
+            entry.state['current_question_index'] = question_index
+            entry.touch()
+        return True
+
+    def start_analysis(self, session_code, analysis_data):
+        entry = self.registry.entry(session_code)
+        if entry is None:
+            return False
+        with entry.lock:
+            entry.state['is_analyzing'] = True
+            entry.state['analysis_data'] = dict(analysis_data,
+                                                aggregate=EmotionAggregate(max_samples=self.max_samples))
+            entry.touch()
+        return True
+
+    def stop_analysis(self, session_code):
+        entry = self.registry.entry(session_code)
+        if entry is None:
+            return None
+        with entry.lock:
+            analysis_data = entry.state['analysis_data']
+            entry.state['is_analyzing'] = False
+            entry.state['analysis_data'] = None
+            entry.touch()
+        return analysis_data
+
+    def append_emotion(self, session_code, sample):
+        entry = self.registry.entry(session_code)
+        if entry is None:
+            return False
+        with entry.lock:
+            if not entry.state['is_analyzing'] or not entry.state['analysis_data']:
+                return False
+            entry.state['analysis_data']['aggregate'].add(
+                sample.get('emotion'), sample.get('confidence', 0), sample.get('timestamp'))
+            entry.touch()
+        return True
+
+    def delete(self, session_code):
+        self.registry.drop(session_code)
+
+    def stats(self):
+        stats = {'sessions': 0, 'participants': 0, 'analyzing': 0}
+        for session_code in self.registry.session_codes():
+            entry = self.registry.entry(session_code)
+            if entry is None:
+                continue
+            stats['sessions'] += 1
+            stats['participants'] += len(entry.participants)
+            stats['analyzing'] += bool(entry.state['is_analyzing'])
+        return stats
+
+    def sweep(self, is_connected=None):
+        reclaimed = _reclaimed()
+        for session_code in self.registry.session_codes():
+            if is_connected is not None:
+                for sid in self.registry.sids(session_code):
+                    if not is_connected(sid) and self.registry.leave_sid(sid) is not None:
+                        reclaimed['participants'] += 1
+
+            entry = self.registry.drop(session_code, idle_for=self.ttl)
+            if entry is None:
+                continue
+            reclaimed['session_codes'].append(session_code)
+            reclaimed['sessions'] += 1
+            reclaimed['participants'] += len(entry.participants)
+            analysis_data = entry.state['analysis_data']
+            if analysis_data is not None:
+                reclaimed['samples'] += len(analysis_data['aggregate'].samples)
+                reclaimed['bytes'] += analysis_data['aggregate'].approx_bytes()
+            reclaimed['bytes'] += sys.getsizeof(entry.participants) + sum(
+                sys.getsizeof(p) for p in entry.participants.values())
+        return reclaimed
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session state in Redis, shared by every backend process.
+
+    Keys per session (prefix:session:<code>):
+        hash        current_question_index, is_analyzing, analysis (JSON without samples)
+        :participants  hash username -> participant JSON
+        :emotions      list of [emotion, confidence, timestamp] samples of the open analysis window
+        :aggregate     hash total, confidence_sum and count:<emotion> of that window
+        :role:<role>   set of sids of the participants with that role
+    plus prefix:sid:<sid> -> JSON (session_code, username, role) and the
+    set prefix:sessions of known codes. Keys expire after ttl
+    seconds without writes so abandoned sessions do not pile up.
+    """
+
+    def __init__(self, client, prefix='therapy', ttl=6 * 3600, max_samples=None):
+        """
+        Args:
+            client: redis.Redis compatible client created with decode_responses=True
+            prefix (str): Key prefix, to share a Redis database with other apps
+            ttl (int): Seconds of inactivity after which a session's keys expire
+            max_samples (int): Samples kept per analysis window (None keeps all)
+        """
+        self.redis = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_samples = max_samples
+
+    def _keys(self, session_code):
+        base = f'{self.prefix}:session:{session_code}'
+        return base, f'{base}:participants', f'{base}:emotions'
+
+    def _aggregate_key(self, session_code):
+        return f'{self.prefix}:session:{session_code}:aggregate'
+
+    def _read_aggregate(self, aggregate, samples):
+        return EmotionAggregate(
+            {field[len('count:'):]: int(value) for field, value in aggregate.items() if field.startswith('count:')},
+            float(aggregate.get('confidence_sum', 0)),
+            int(aggregate.get('total', 0)),
+            [tuple(json.loads(sample)) for sample in samples],
+            self.max_samples
+        )
+
+    def _role_key(self, session_code, role):
+        return f'{self.prefix}:session:{session_code}:role:{role}'
+
+    def _sid_key(self, sid):
+        return f'{self.prefix}:sid:{sid}'
+
+    def _touch(self, pipe, session_code, roles=()):
+        for key in self._keys(session_code):
+            pipe.expire(key, self.ttl)
+        pipe.expire(self._aggregate_key(session_code), self.ttl)
+        for role in roles:
+            pipe.expire(self._role_key(session_code, role), self.ttl)
+
+    def _unindex(self, pipe, session_code, participant):
+        pipe.srem(self._role_key(session_code, participant['role']), participant['sid'])
+        pipe.delete(self._sid_key(participant['sid']))
+
+    def get(self, session_code):
+        state_key, participants_key, emotions_key = self._keys(session_code)
+        pipe = self.redis.pipeline()
+        pipe.hgetall(state_key)
+        pipe.hvals(participants_key)
+        pipe.lrange(emotions_key, 0, -1)
+        pipe.hgetall(self._aggregate_key(session_code))
+        state, participants, emotions, aggregate = pipe.execute()
+        if not state:
+            return None
+
+        analysis_data = None
+        if state.get('analysis'):
+            analysis_data = dict(json.loads(state['analysis']), aggregate=self._read_aggregate(aggregate, emotions))
+        return {
+            'participants': sorted((json.loads(p) for p in participants), key=lambda p: p.get('joined_at', '')),
+            'current_question_index': int(state.get('current_question_index', 0)),
+            'is_analyzing': state.get('is_analyzing') == '1',
+            'analysis_data': analysis_data
+        }
+
+    def exists(self, session_code):
+        return bool(self.redis.exists(self._keys(session_code)[0]))
+
+    def add_participant(self, session_code, participant):
+        state_key, participants_key, _ = self._keys(session_code)
+        participant = dict(participant, joined_at=participant.get('joined_at') or datetime.now().isoformat())
+        username, role, sid = participant['username'], participant['role'], participant['sid']
+
+        def join(pipe):
+            # Runs again if another process changes the participants before EXEC
+            previous = pipe.hget(participants_key, username)
+            previous = json.loads(previous) if previous else None
+            count = pipe.hlen(participants_key) + (previous is None)
+
+            pipe.multi()
+            if previous is not None:
+                # Reconnection: the new connection replaces the old one
+                self._unindex(pipe, session_code, previous)
+            # hsetnx keeps the state of a session another process already created
+            pipe.hsetnx(state_key, 'current_question_index', 0)
+            pipe.hsetnx(state_key, 'is_analyzing', '0')
+            pipe.hset(participants_key, username, json.dumps(participant))
+            pipe.sadd(self._role_key(session_code, role), sid)
+            pipe.set(self._sid_key(sid), json.dumps({'session_code': session_code, 'username': username, 'role': role}),
+                     ex=self.ttl)
+            pipe.sadd(f'{self.prefix}:sessions', session_code)
+            self._touch(pipe, session_code, (role,))
+            return count, previous
+
+        count, previous = self.redis.transaction(join, participants_key, value_from_callable=True)
+        previous_sid = previous['sid'] if previous is not None and previous['sid'] != sid else None
+        return count, previous_sid
+
+    def remove_participant(self, session_code, username):
+        return self._remove(session_code, username)
+
+    def remove_sid(self, sid):
+        location = self.lookup_sid(sid)
+        if location is None:
+            return None
+        participant = self._remove(location['session_code'], location['username'], sid=sid)
+        return dict(participant, session_code=location['session_code']) if participant else None
+
+    def _remove(self, session_code, username, sid=None):
+        """Remove a participant, only if its current connection is sid when given"""
+        participants_key = self._keys(session_code)[1]
+
+        def leave(pipe):
+            participant = pipe.hget(participants_key, username)
+            participant = json.loads(participant) if participant else None
+            if participant is None or (sid is not None and participant['sid'] != sid):
+                return None
+
+            pipe.multi()
+            pipe.hdel(participants_key, username)
+            self._unindex(pipe, session_code, participant)
+            self._touch(pipe, session_code, (participant['role'],))
+            return participant
+
+        return self.redis.transaction(leave, participants_key, value_from_callable=True)
+
+    def lookup_sid(self, sid):
+        location = self.redis.get(self._sid_key(sid))
+        return dict(json.loads(location), sid=sid) if location else None
+
+    def participants(self, session_code):
+        return [json.loads(p) for p in self.redis.hvals(self._keys(session_code)[1])]
+
+    def sids(self, session_code, role=None):
+        if role is not None:
+            return list(self.redis.smembers(self._role_key(session_code, role)))
+        return [p['sid'] for p in self.participants(session_code)]
+
+    def set_question_index(self, session_code, question_index):
+        if not self.exists(session_code):
+            return False
+        pipe = self.redis.pipeline()
+        pipe.hset(self._keys(session_code)[0], 'current_question_index', question_index)
+        self._touch(pipe, session_code)
+        pipe.execute()
+        return True
+
+    def start_analysis(self, session_code, analysis_data):
+        if not self.exists(session_code):
+            return False
+        state_key, _, emotions_key = self._keys(session_code)
+        analysis = {k: v for k, v in analysis_data.items() if k != 'aggregate'}
+
+        pipe = self.redis.pipeline()
+        pipe.delete(emotions_key, self._aggregate_key(session_code))
+        pipe.hset(state_key, mapping={'is_analyzing': '1', 'analysis': json.dumps(analysis)})
+        self._touch(pipe, session_code)
+        pipe.execute()
+        return True
+
+    def stop_analysis(self, session_code):
+        state_key, _, emotions_key = self._keys(session_code)
+        aggregate_key = self._aggregate_key(session_code)
+        pipe = self.redis.pipeline()
+        pipe.hget(state_key, 'analysis')
+        pipe.lrange(emotions_key, 0, -1)
+        pipe.hgetall(aggregate_key)
+        pipe.hset(state_key, 'is_analyzing', '0')
+        pipe.hdel(state_key, 'analysis')
+        pipe.delete(emotions_key, aggregate_key)
+        analysis, emotions, aggregate = pipe.execute()[:3]
+        if not analysis:
+            return None
+        return dict(json.loads(analysis), aggregate=self._read_aggregate(aggregate, emotions))
+
+    def append_emotion(self, session_code, sample):
+        state_key, _, emotions_key = self._keys(session_code)
+        emotion, confidence = sample.get('emotion'), sample.get('confidence', 0)
+        aggregate_key = self._aggregate_key(session_code)
+
+        def append(pipe):
+            # A stop, delete or expiry of the session before EXEC makes this run again
+            if pipe.hget(state_key, 'is_analyzing') != '1':
+                return False
+
+            pipe.multi()
+            pipe.hincrby(aggregate_key, 'total', 1)
+            if emotion:
+                pipe.hincrbyfloat(aggregate_key, 'confidence_sum', confidence or 0)
+                pipe.hincrby(aggregate_key, f'count:{emotion}', 1)
+            pipe.rpush(emotions_key, json.dumps([emotion, confidence, sample.get('timestamp')]))
+            if self.max_samples:
+                pipe.ltrim(emotions_key, -self.max_samples, -1)
+            # start_analysis deleted these keys, so they come back without a ttl
+            self._touch(pipe, session_code)
+            return True
+
+        return self.redis.transaction(append, state_key, value_from_callable=True)
+
+    def delete(self, session_code):
+        participants = self.participants(session_code)
+        pipe = self.redis.pipeline()
+        for participant in participants:
+            self._unindex(pipe, session_code, participant)
+        pipe.delete(*self._keys(session_code), self._aggregate_key(session_code))
+        pipe.srem(f'{self.prefix}:sessions', session_code)
+        pipe.execute()
+
+    def stats(self):
+        return self._scan()[0]
+
+    def sweep(self, is_connected=None):
+        # Keys of idle sessions expire on their own (ttl); only the index of
+        # known codes needs pruning. Connections may belong to other processes,
+        # so is_connected is not used.
+        reclaimed = _reclaimed()
+        reclaimed['session_codes'] = self._scan()[1]
+        reclaimed['sessions'] = len(reclaimed['session_codes'])
+        return reclaimed
+
+    def _scan(self):
+        """Stats of the known sessions, pruning the codes whose keys expired"""
+        codes = list(self.redis.smembers(f'{self.prefix}:sessions'))
+        pipe = self.redis.pipeline()
+        for code in codes:
+            state_key, participants_key, _ = self._keys(code)
+            pipe.hlen(participants_key)
+            pipe.hget(state_key, 'is_analyzing')
+            pipe.exists(state_key)
+        values = pipe.execute() if codes else []
+
+        stats = {'sessions': 0, 'participants': 0, 'analyzing': 0}
+        expired = []
+        for code, (participants, analyzing, exists) in zip(codes, zip(*[iter(values)] * 3)):
+            if not exists:
+                expired.append(code)
+                continue
+            stats['sessions'] += 1
+            stats['participants'] += participants
+            stats['analyzing'] += analyzing == '1'
+        if expired:
+            self.redis.srem(f'{self.prefix}:sessions', *expired)
+        return stats, expired
+
+
+def create_session_store(url='memory://', ttl=6 * 3600, max_samples=None):
+    """
+    Build the session store selected by URL
+
+    Args:
+        url (str): 'memory://' (single process), 'redis://host:port/db' or 'fakeredis://'
+            (in-process Redis stand-in from the fakeredis package, for local testing)
+        ttl (int): Seconds of inactivity after which a session is reclaimed
+        max_samples (int): Samples kept per analysis window (None keeps all)
+    """
+    if not url or url.startswith('memory://'):
+        return InMemorySessionStore(ttl=ttl, max_samples=max_samples)
+
+    if url.startswith('fakeredis://'):
+        import fakeredis
+        return RedisSessionStore(fakeredis.FakeRedis(decode_responses=True), ttl=ttl, max_samples=max_samples)
+
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisSessionStore(redis.Redis.from_url(url, decode_responses=True), ttl=ttl,
+                                 max_samples=max_samples)
+
+    raise ValueError(f"Unsupported session store URL '{url}'")
@@ -0,0 +1,53 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import MAX_DEADLINE_MS, AdmissionController, DetectionShed, parse_deadline_ms
+
+
+def test_idle_server_admits_after_a_slow_run():
+    controller = AdmissionController(max_concurrent=1, default_deadline_ms=200)
+
+    # One detection slower than the deadline
+    controller.run(lambda degraded: time.sleep(0.3))
+    assert controller.service_time <= 0.2
+
+    # Idle server: later requests get the free slot instead of being shed
+    for _ in range(5):
+        result, degraded = controller.run(lambda degraded: 'ok')
+        assert result == 'ok'
+    assert controller.stats()['waiting'] == 0
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_queued_request_is_shed_when_deadline_unreachable():
+    controller = AdmissionController(max_concurrent=1, default_deadline_ms=100)
+    controller.service_time = 0.08
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(degraded):
+        started.set()
+        release.wait(1)
+
+    worker = threading.Thread(target=controller.run, args=(slow,))
+    worker.start()
+    started.wait(1)
+    try:
+        controller.run(lambda degraded: 'late')
+        raise AssertionError('expected the queued request to be shed')
+    except DetectionShed as e:
+        assert e.reason == 'deadline'
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_client_deadlines_are_parsed_and_capped():
+    assert parse_deadline_ms('250') == 250.0
+    assert parse_deadline_ms(10 ** 9) == MAX_DEADLINE_MS
+    for value in (None, 'soon', -5, 0, float('nan'), True):
+        assert parse_deadline_ms(value) is None
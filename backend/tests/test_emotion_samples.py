@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emotion_labels import EMOTION_LABELS
+from emotion_samples import pack_samples, unpack_samples, to_raw_data
+
+
+def sample(confidence=0.9, timestamp='2026-01-01T10:00:00.000Z'):
+    return {'emotion': 'Happy', 'confidence': confidence, 'timestamp': timestamp}
+
+
+@pytest.mark.parametrize('confidence', [None, '0.9', True])
+def test_non_numeric_confidence_is_not_packed(confidence):
+    with pytest.raises(ValueError):
+        pack_samples([sample(), sample(confidence)])
+
+
+def test_non_utc_offset_is_not_packed():
+    with pytest.raises(ValueError):
+        pack_samples([sample(timestamp='2026-01-01T12:00:00.000+02:00')])
+
+
+def test_utc_timestamps_round_trip_as_z():
+    raw_data = [sample(timestamp='2026-01-01T10:00:00.000+00:00'), sample(0.5, '2026-01-01T10:00:01.250Z')]
+    restored = to_raw_data(unpack_samples(pack_samples(raw_data)))
+    assert [s['timestamp'] for s in restored] == ['2026-01-01T10:00:00.000Z', '2026-01-01T10:00:01.250Z']
+    assert [s['confidence'] for s in restored] == [0.9, 0.5]
+
+
+@pytest.mark.parametrize('all_emotions', [{'Happy': 0.5}, [0.1] * 7, dict.fromkeys(EMOTION_LABELS, None)])
+def test_malformed_probabilities_are_not_packed(all_emotions):
+    with pytest.raises(ValueError):
+        pack_samples([dict(sample(), all_emotions=all_emotions)])
+
+
+def test_z_timestamps_are_packed_as_utc():
+    arrays = unpack_samples(pack_samples([sample(timestamp='2026-01-01T00:00:00.500Z')]))
+    assert arrays['utc']
+    assert arrays['timestamp_ms'].tolist() == [1767225600500]
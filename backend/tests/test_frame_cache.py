@@ -0,0 +1,56 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from emotion_detector import EmotionDetector
+from frame_cache import FrameResultCache
+
+
+class HappyModel:
+    def predict(self, batch):
+        return np.tile(np.eye(7)[3], (len(batch), 1))
+
+
+def frame():
+    # Smooth enough that its hash is the same at every decode size
+    noise = np.random.RandomState(0).randint(0, 255, (600, 800)).astype(np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 60)
+
+
+def test_caller_changes_do_not_leak_into_cached_result():
+    cache = FrameResultCache()
+    gray = frame()
+    result = {'detected': False}
+    _, frame_hash = cache.lookup('s', gray)
+    cache.store('s', frame_hash, gray, result)
+
+    result['question_id'] = 1
+    cached, _ = cache.lookup('s', gray)
+    cached['degraded'] = True
+    assert cache.lookup('s', gray)[0] == {'detected': False}
+
+
+def test_cached_result_is_only_reused_by_the_same_variant():
+    cache = FrameResultCache()
+    gray = frame()
+    _, frame_hash = cache.lookup('s', gray, variant=True)
+    cache.store('s', frame_hash, gray, {'detected': False}, variant=True)
+
+    assert cache.lookup('s', gray, variant=False)[0] is None
+    assert cache.lookup('s', gray, variant=True)[0] is not None
+
+
+def test_degraded_result_is_not_served_to_a_full_request():
+    detector = EmotionDetector(None, os.path.join(BACKEND, 'models', 'haarcascade_frontalface_default.xml'),
+                               model=HappyModel())
+    image = cv2.imencode('.png', frame())[1].tobytes()
+
+    assert detector.detect_emotion_from_bytes(image, stream_key='s', degraded=True)['degraded']
+    full = detector.detect_emotion_from_bytes(image, stream_key='s')
+    assert 'degraded' not in full and 'reused' not in full
+    assert detector.detect_emotion_from_bytes(image, stream_key='s').get('reused')
@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import ParticipantRegistry
+
+
+def test_join_racing_the_sweeper_lands_in_a_registered_session():
+    registry = ParticipantRegistry()
+    registry.join('S', {'username': 'doc', 'role': 'therapist', 'sid': '1'})
+
+    # The sweeper drops the idle session between the join's lookup and its lock
+    lookup, swept = registry.entry, []
+
+    def entry_then_sweep(session_code, create=False):
+        entry = lookup(session_code, create)
+        if create and not swept:
+            swept.append(registry.drop(session_code, idle_for=0))
+        return entry
+
+    registry.entry = entry_then_sweep
+    count, _ = registry.join('S', {'username': 'pat', 'role': 'patient', 'sid': '2'})
+
+    assert swept[0] is not None
+    assert count == 1
+    assert registry.sids('S', 'patient') == ['2']
+    assert registry.lookup_sid('2')['session_code'] == 'S'
@@ -0,0 +1,337 @@
+"""
+Offline emotion analysis of recorded session videos
+
+Decodes a video with a frame stride, detects the main face of every sampled
+frame and scores the faces of each chunk of frames in one batched forward
+pass, spread across worker processes. Per-frame results are written as a
+compressed columnar .npz file and per-segment aggregates have the same
+shape as EmotionAnalysis (emotion_counts, dominant_emotion, avg_confidence).
+
+Usage (from backend/):
+    python video_analysis.py session.mp4 --stride 5 --segment-seconds 30 --workers 4 -o session.npz
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import Config
+from emotion_detector import EMOTION_LABELS
+from session_store import EmotionAggregate
+
+_worker_detector = None
+
+
+def _init_worker(detector_options, num_threads):
+    """Load one EmotionDetector per worker process"""
+    global _worker_detector
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[var] = str(num_threads)
+    cv2.setNumThreads(num_threads)
+
+    from emotion_detector import EmotionDetector
+    _worker_detector = EmotionDetector(num_threads=num_threads, **detector_options)
+
+
+def _analyze_chunk(frames, detector=None):
+    """
+    Detect the main face of each frame and score all faces of the chunk in one batch
+
+    Args:
+        frames (list): Consecutive grayscale frames
+
+    Returns:
+        tuple: (faces (N, 4) int32 with -1 rows for frames without a face,
+                probabilities (N, 7) float32, NaN rows for frames without a face)
+    """
+    from face_tracker import FaceTracker
+
+    detector = detector or _worker_detector
+    # Frames of a chunk are consecutive, so a tracker narrows most scans
+    tracker = FaceTracker(detector.trackers.full_scan_interval, detector.trackers.padding)
+
+    boxes = np.full((len(frames), 4), -1, dtype=np.int32)
+    probabilities = np.full((len(frames), len(EMOTION_LABELS)), np.nan, dtype=np.float32)
+    crops = []
+    with_face = []
+
+    for i, gray in enumerate(frames):
+        faces, _ = tracker.detect(gray, detector._detect_faces)
+        if len(faces) == 0:
+            continue
+        main_face = max(faces, key=lambda f: f[2] * f[3])
+        boxes[i] = main_face
+        crops.append(detector._build_face_batch(gray, [main_face]))
+        with_face.append(i)
+
+    if crops:
+        probabilities[with_face] = detector.model.predict(np.concatenate(crops))
+
+    return boxes, probabilities
+
+
+def read_frames(video_path, stride=1, decode_width=640, chunk_size=32):
+    """
+    Decode every stride-th frame as grayscale, downscaled to decode_width
+
+    Skipped frames are only grabbed, not decoded.
+
+    Yields:
+        tuple: (frame indices, grayscale frames, scale back to original pixels)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video {video_path}")
+
+    stride = max(1, int(stride))
+    indices, frames = [], []
+    frame_index = 0
+    try:
+        while True:
+            if frame_index % stride:
+                if not cap.grab():
+                    break
+                frame_index += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            scale = 1.0
+            if decode_width and gray.shape[1] > decode_width:
+                scale = gray.shape[1] / decode_width
+                gray = cv2.resize(gray, (decode_width, int(round(gray.shape[0] / scale))),
+                                  interpolation=cv2.INTER_AREA)
+
+            indices.append(frame_index)
+            frames.append(gray)
+            frame_index += 1
+
+            if len(frames) == chunk_size:
+                yield indices, frames, scale
+                indices, frames = [], []
+
+        if frames:
+            yield indices, frames, scale
+    finally:
+        cap.release()
+
+
+def summarize_emotions(emotions, confidences):
+    """
+    Aggregate detections the way EmotionAnalysis stores them
+
+    Args:
+        emotions (list): Emotion label per detection
+        confidences (list): Confidence per detection
+
+    Returns:
+        dict: dominant_emotion, dominant_percentage, avg_confidence, total_detections, emotion_counts
+    """
+    aggregate = EmotionAggregate(max_samples=0)
+    for emotion, confidence in zip(emotions, confidences):
+        aggregate.add(emotion, float(confidence))
+
+    summary = aggregate.summary()
+    summary['dominant_percentage'] = round(summary['dominant_percentage'], 2)
+    summary['avg_confidence'] = round(summary['avg_confidence'], 3)
+    return summary
+
+
+def aggregate_segments(timestamps, emotion_index, confidence, segment_seconds):
+    """Per-segment EmotionAnalysis-shaped aggregates of the per-frame columns"""
+    segments = []
+    if len(timestamps) == 0:
+        return segments
+
+    segment_ids = (timestamps // segment_seconds).astype(int)
+    for segment in np.unique(segment_ids):
+        rows = (segment_ids == segment) & (emotion_index >= 0)
+        summary = summarize_emotions(
+            [EMOTION_LABELS[i] for i in emotion_index[rows]],
+            confidence[rows]
+        )
+        summary['start_s'] = float(segment * segment_seconds)
+        summary['end_s'] = float((segment + 1) * segment_seconds)
+        summary['frames_analyzed'] = int(np.sum(segment_ids == segment))
+        segments.append(summary)
+    return segments
+
+
+def analyze_video(video_path, output_path=None, stride=1, segment_seconds=10, workers=0, threads_per_worker=1,
+                  chunk_size=32, model_path=None, cascade_path=None, **detector_options):
+    """
+    Analyze a recorded video and optionally write the per-frame columns to an .npz file
+
+    Args:
+        video_path (str): Video file to analyze
+        output_path (str): .npz file for per-frame results (None to skip writing)
+        stride (int): Analyze every stride-th frame
+        segment_seconds (float): Length of each aggregate segment
+        workers (int): Detection worker processes (0 = in this process)
+        threads_per_worker (int): OpenCV/TF threads per worker
+        chunk_size (int): Frames scored per batch
+        **detector_options: Extra EmotionDetector options (backend, detection_width, ...)
+
+    Returns:
+        dict: Summary, per-segment aggregates and throughput stats
+    """
+    detector_options = dict(
+        model_path=model_path or Config.MODEL_PATH,
+        cascade_path=cascade_path or Config.CASCADE_PATH,
+        frame_cache_distance=-1,
+        **detector_options
+    )
+    decode_width = detector_options.get('decode_width', Config.DECODE_WIDTH)
+
+    cap = cv2.VideoCapture(video_path)
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    columns = {'frame_index': [], 'faces': [], 'probabilities': []}
+    startup_start = time.perf_counter()
+    executor = None
+    if workers:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(detector_options, threads_per_worker)
+        )
+        # Wait for every worker to load its model so throughput excludes startup
+        for future in [executor.submit(_analyze_chunk, []) for _ in range(workers)]:
+            future.result()
+    else:
+        from emotion_detector import EmotionDetector
+        detector = EmotionDetector(**detector_options)
+    startup = time.perf_counter() - startup_start
+    start = time.perf_counter()
+
+    def collect(indices, scale, result):
+        boxes, probabilities = result
+        boxes = np.where(boxes >= 0, np.round(boxes * scale), -1)
+        columns['frame_index'].append(np.asarray(indices, dtype=np.int32))
+        columns['faces'].append(boxes.astype(np.int32))
+        columns['probabilities'].append(probabilities)
+
+    chunks = read_frames(video_path, stride=stride, decode_width=decode_width, chunk_size=chunk_size)
+
+    if executor is not None:
+        # Decode in this process while up to 2 chunks per worker are being scored
+        in_flight = deque()
+        with executor:
+            for indices, frames, scale in chunks:
+                in_flight.append((indices, scale, executor.submit(_analyze_chunk, frames)))
+                if len(in_flight) >= workers * 2:
+                    indices, scale, future = in_flight.popleft()
+                    collect(indices, scale, future.result())
+            while in_flight:
+                indices, scale, future = in_flight.popleft()
+                collect(indices, scale, future.result())
+    else:
+        for indices, frames, scale in chunks:
+            collect(indices, scale, _analyze_chunk(frames, detector))
+
+    elapsed = time.perf_counter() - start
+
+    frame_index = np.concatenate(columns['frame_index']) if columns['frame_index'] else np.zeros(0, np.int32)
+    faces = np.concatenate(columns['faces']) if columns['faces'] else np.zeros((0, 4), np.int32)
+    probabilities = (np.concatenate(columns['probabilities']) if columns['probabilities']
+                     else np.zeros((0, len(EMOTION_LABELS)), np.float32))
+
+    detected = faces[:, 0] >= 0
+    emotion_index = np.full(len(frame_index), -1, dtype=np.int8)
+    confidence = np.zeros(len(frame_index), dtype=np.float32)
+    if detected.any():
+        emotion_index[detected] = np.argmax(probabilities[detected], axis=1)
+        confidence[detected] = probabilities[detected].max(axis=1)
+    timestamps = (frame_index / source_fps).astype(np.float32)
+
+    if output_path:
+        np.savez_compressed(
+            output_path,
+            frame_index=frame_index,
+            timestamp_s=timestamps,
+            detected=detected,
+            emotion_index=emotion_index,
+            confidence=confidence.astype(np.float16),
+            probabilities=np.nan_to_num(probabilities).astype(np.float16),
+            faces=faces.astype(np.int16),
+            emotion_labels=np.array(EMOTION_LABELS)
+        )
+
+    summary = summarize_emotions([EMOTION_LABELS[i] for i in emotion_index[detected]], confidence[detected])
+    summary['analysis_duration'] = int(round(float(timestamps[-1]))) if len(timestamps) else 0
+
+    return {
+        'video': video_path,
+        'summary': summary,
+        'segments': aggregate_segments(timestamps, emotion_index, confidence, segment_seconds),
+        'stats': {
+            'frames_analyzed': int(len(frame_index)),
+            'frames_with_face': int(detected.sum()),
+            'stride': stride,
+            'workers': workers,
+            'source_fps': round(source_fps, 2),
+            'startup_s': round(startup, 3),
+            'elapsed_s': round(elapsed, 3),
+            'fps': round(len(frame_index) / elapsed, 2) if elapsed > 0 else None,
+            # Video seconds processed per wall-clock second
+            'realtime_factor': round(float(timestamps[-1]) / elapsed, 2) if len(frame_index) and elapsed > 0 else None
+        },
+        'output': output_path
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline emotion analysis of a recorded video')
+    parser.add_argument('video', help='Video file to analyze')
+    parser.add_argument('-o', '--output', default=None, help='Per-frame results .npz file')
+    parser.add_argument('--summary', default=None, help='Write summary and segments to this JSON file')
+    parser.add_argument('--stride', type=int, default=1, help='Analyze every Nth frame')
+    parser.add_argument('--segment-seconds', type=float, default=10, help='Aggregate segment length')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (0 = in-process)')
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=32, help='Frames per inference batch')
+    parser.add_argument('--model', default=Config.MODEL_PATH)
+    parser.add_argument('--cascade', default=Config.CASCADE_PATH)
+    parser.add_argument('--backend', default=Config.MODEL_BACKEND)
+    args = parser.parse_args()
+
+    report = analyze_video(
+        args.video,
+        output_path=args.output,
+        stride=args.stride,
+        segment_seconds=args.segment_seconds,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        chunk_size=args.chunk_size,
+        model_path=args.model,
+        cascade_path=args.cascade,
+        backend=args.backend
+    )
+
+    summary, stats = report['summary'], report['stats']
+    print(f"🎬 {args.video}: {stats['frames_analyzed']} frames ({stats['frames_with_face']} with face) "
+          f"in {stats['elapsed_s']}s -> {stats['fps']} fps, {stats['realtime_factor']}x realtime")
+    print(f"   Dominant emotion: {summary['dominant_emotion']} ({summary['dominant_percentage']}%), "
+          f"avg confidence {summary['avg_confidence']}")
+    for segment in report['segments']:
+        print(f"   [{segment['start_s']:>7.1f}s - {segment['end_s']:>7.1f}s] "
+              f"{segment['dominant_emotion'] or '-':<9} {segment['emotion_counts']}")
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
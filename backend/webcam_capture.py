@@ -0,0 +1,242 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from config import Config
+
+
+class WebcamCapture:
+    """
+    Long-lived capture service that owns a camera (or a stand-in source)
+    and keeps its most recent frames in a small ring buffer.
+
+    A background thread reads frames continuously, so callers get the latest
+    frame instantly instead of opening the device for every capture.
+    """
+
+    def __init__(self, source=0, buffer_size=4, warmup_frames=5, mirror=True, fps=None, loop=True):
+        """
+        Args:
+            source: Camera index, video file path/URL, or an object with read()/release()
+                (e.g. a synthetic source for tests)
+            buffer_size (int): Number of recent frames kept in the ring buffer
+            warmup_frames (int): Frames discarded after opening (auto exposure settling)
+            mirror (bool): Flip frames horizontally (mirror effect)
+            fps (float): Read pace; defaults to the file's own FPS for video files, unpaced otherwise
+            loop (bool): Rewind video files when they end
+        """
+        self.source = source
+        self.buffer_size = max(1, int(buffer_size))
+        self.warmup_frames = warmup_frames
+        self.mirror = mirror
+        self.fps = fps
+        self.loop = loop
+
+        self._buffer = deque(maxlen=self.buffer_size)
+        self._condition = threading.Condition()
+        self._frame_ids = 0
+        self._capture = None
+        self._thread = None
+        self._running = False
+        self.error = None
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    @property
+    def running(self):
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Open the source and start the reader thread (no-op when already running)"""
+        with self._condition:
+            if self.running:
+                return self
+
+            capture = self._open()
+            if capture is None:
+                self.error = 'Could not access webcam'
+                raise RuntimeError(self.error)
+
+            self._capture = capture
+            self.error = None
+            self._running = True
+            self._thread = threading.Thread(target=self._read_loop, name='webcam-capture', daemon=True)
+            self._thread.start()
+            return self
+
+    def stop(self):
+        """Stop the reader thread and release the device"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def latest(self, timeout=1.0):
+        """
+        Most recent frame, waiting up to timeout for the first one
+
+        Returns:
+            tuple: (frame_id, timestamp, frame) or None if no frame arrived
+        """
+        return self.wait_for_frame(after_id=-1, timeout=timeout)
+
+    def latest_frame(self, timeout=1.0):
+        item = self.latest(timeout)
+        return item[2] if item is not None else None
+
+    def wait_for_frame(self, after_id=-1, timeout=1.0):
+        """Wait for a frame newer than after_id and return the latest one"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._buffer or self._buffer[-1][0] <= after_id:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+            return self._buffer[-1]
+
+    def stream(self, fps=5, max_frames=None, timeout=2.0):
+        """
+        Yield the latest frame at most fps times per second
+
+        Frames that arrive while the consumer is busy are skipped, so a slow
+        consumer always sees the newest frame instead of falling behind.
+
+        Yields:
+            tuple: (frame_id, timestamp, frame)
+        """
+        interval = 1.0 / fps if fps else 0
+        last_id = -1
+        yielded = 0
+        next_time = time.monotonic()
+
+        while max_frames is None or yielded < max_frames:
+            item = self.wait_for_frame(after_id=last_id, timeout=timeout)
+            if item is None:
+                break
+
+            if item[0] - last_id > 1 and last_id >= 0:
+                self.frames_dropped += item[0] - last_id - 1
+            last_id = item[0]
+            yielded += 1
+            yield item
+
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic()
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'error': self.error,
+            'frames_read': self.frames_read,
+            'frames_dropped': self.frames_dropped,
+            'buffered': len(self._buffer)
+        }
+
+    def _open(self):
+        if hasattr(self.source, 'read'):
+            return self.source
+
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            return None
+
+        if self.fps is None and isinstance(self.source, str):
+            # Play video files back at their own frame rate
+            self.fps = capture.get(cv2.CAP_PROP_FPS) or None
+        return capture
+
+    def _rewind(self):
+        if self.loop and isinstance(self.source, str):
+            return self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return False
+
+    def _read_loop(self):
+        interval = 1.0 / self.fps if self.fps else 0
+        skipped = 0
+        failures = 0
+        next_time = time.monotonic()
+
+        try:
+            while self._running:
+                ret, frame = self._capture.read()
+                if not ret or frame is None:
+                    if self._rewind():
+                        continue
+                    failures += 1
+                    if failures >= 30:
+                        self.error = 'Could not capture frame from webcam'
+                        break
+                    time.sleep(0.05)
+                    continue
+                failures = 0
+
+                # Discard the first frames while exposure settles
+                if skipped < self.warmup_frames:
+                    skipped += 1
+                    continue
+
+                if self.mirror:
+                    frame = cv2.flip(frame, 1)
+
+                with self._condition:
+                    self._buffer.append((self._frame_ids, time.time(), frame))
+                    self._frame_ids += 1
+                    self.frames_read += 1
+                    self._condition.notify_all()
+
+                if interval:
+                    next_time += interval
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_time = time.monotonic()
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+            if hasattr(self._capture, 'release'):
+                self._capture.release()
+            self._capture = None
+
+
+# Shared capture service (the device can only be opened once)
+webcam_capture = None
+_webcam_lock = threading.Lock()
+
+
+def get_webcam_capture():
+    """Get the shared webcam capture service, starting it on first use"""
+    global webcam_capture
+    with _webcam_lock:
+        if webcam_capture is None:
+            source = Config.WEBCAM_SOURCE
+            webcam_capture = WebcamCapture(
+                source=int(source) if str(source).isdigit() else source,
+                buffer_size=Config.WEBCAM_BUFFER_SIZE,
+                warmup_frames=Config.WEBCAM_WARMUP_FRAMES
+            )
+        # Retries opening the device if a previous attempt failed
+        return webcam_capture.start()
+
+
+def stop_webcam_capture():
+    global webcam_capture
+    with _webcam_lock:
+        if webcam_capture is not None:
+            webcam_capture.stop()
+            webcam_capture = None
+
+
+atexit.register(stop_webcam_capture)
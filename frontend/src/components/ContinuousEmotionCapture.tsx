@@ -2,6 +2,7 @@
 "use client"
 import type React from "react"
 import { useRef, useEffect, useState } from "react"
+import type { Socket } from "socket.io-client"
 import { emotionAPI } from "../utils/api"
 
 interface ContinuousEmotionCaptureProps {
@@ -11,15 +12,20 @@ interface ContinuousEmotionCaptureProps {
     duration: number
     onAnalysisComplete: (analysisData: any) => void
     onRealtimeEmotion?: (emotionData: { emotion: string; confidence: number }) => void
+    // When provided, frames are streamed over the session socket and detected server-side
+    socket?: Socket | null
+    sessionCode?: string
 }
 
 const ContinuousEmotionCapture: React.FC<ContinuousEmotionCaptureProps> = ({
-
+    sessionId,
     questionId,
     isActive,
     duration,
     onAnalysisComplete,
     onRealtimeEmotion,
+    socket,
+    sessionCode,
 }) => {
     const videoRef = useRef<HTMLVideoElement>(null)
     const canvasRef = useRef<HTMLCanvasElement>(null)
@@ -28,6 +34,7 @@ const ContinuousEmotionCapture: React.FC<ContinuousEmotionCaptureProps> = ({
     const intervalRef = useRef<NodeJS.Timeout | null>(null)
     // @ts-ignore
     const timeoutRef = useRef<NodeJS.Timeout | null>(null)
+    const capturedEmotionsRef = useRef<any[]>([])
 
     const [emotionsData, setEmotionsData] = useState<any[]>([])
     const [currentEmotion, setCurrentEmotion] = useState<string>("")
@@ -49,6 +56,28 @@ const ContinuousEmotionCapture: React.FC<ContinuousEmotionCaptureProps> = ({
         }
     }, [isActive, questionId, duration]) // Agregar duration como dependencia
 
+    // Results of frames detected server-side (emotion_frame)
+    useEffect(() => {
+        if (!socket) return
+
+        const handleFrameResult = (result: any) => {
+            if (result.question_id !== questionId || !result.detected) return
+
+            capturedEmotionsRef.current.push({
+                emotion: result.emotion,
+                confidence: result.confidence,
+                timestamp: new Date().toISOString(),
+            })
+            setCurrentEmotion(result.emotion)
+            setCurrentConfidence(result.confidence)
+        }
+
+        socket.on("emotion_frame_result", handleFrameResult)
+        return () => {
+            socket.off("emotion_frame_result", handleFrameResult)
+        }
+    }, [socket, questionId])
+
     const startCapture = async () => {
         try {
             console.log("🎯 Iniciando captura de emociones con duración:", duration);
@@ -78,6 +107,7 @@ const ContinuousEmotionCapture: React.FC<ContinuousEmotionCaptureProps> = ({
             let captureCount = 0
             const totalCaptures = duration // One capture per second
             const capturedEmotions: any[] = []
+            capturedEmotionsRef.current = capturedEmotions
 
             intervalRef.current = setInterval(async () => {
                 try {
@@ -135,12 +165,23 @@ const ContinuousEmotionCapture: React.FC<ContinuousEmotionCaptureProps> = ({
             // Draw current video frame to canvas
             context.drawImage(videoRef.current, 0, 0, canvas.width, canvas.height)
 
-            // Convert canvas to base64 image
-            const imageData = canvas.toDataURL("image/jpeg", 0.8)
+            // Encode canvas as a binary JPEG (no base64 overhead)
+            const frame = await new Promise<Blob | null>((resolve) => canvas.toBlob(resolve, "image/jpeg", 0.8))
+            if (!frame) return null
+
+            // Stream over the session socket: the server detects, stores and relays to the therapist
+            if (socket?.connected && sessionCode) {
+                socket.emit("emotion_frame", {
+                    session_code: sessionCode,
+                    question_id: questionId,
+                    image: await frame.arrayBuffer(),
+                })
+                return null
+            }
 
             // Send to emotion detection API
-            console.log('Enviando frame a emotionAPI.detectEmotion');
-            const response = await emotionAPI.detectEmotion(imageData)
+            console.log('Enviando frame a emotionAPI.detectEmotionBinary');
+            const response = await emotionAPI.detectEmotionBinary(frame, sessionId, questionId)
 
             if (response.emotion && response.confidence !== undefined) {
                 console.log('Emoción detectada:', response);
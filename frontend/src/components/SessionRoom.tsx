@@ -173,6 +173,18 @@ const SessionRoom: React.FC<SessionRoomProps> = ({
             }, 1000);
         });
 
+        // Coalesced live emotions of the patient (latest value + series since the last batch)
+        newSocket.on('real_time_emotion', (data) => {
+            console.log('📥 Emoción en tiempo real:', data);
+            if (data.seq !== undefined) {
+                // Ack so the server skips this connection instead of queueing when it falls behind
+                newSocket.emit('real_time_emotion_ack', {
+                    session_code: session.session_code,
+                    seq: data.seq,
+                });
+            }
+        });
+
         newSocket.on('emotion_analysis_completed', (data) => {
             console.log('📥 Análisis emocional completado:', data);
             setIsAnalyzingEmotion(false);
@@ -419,6 +431,18 @@ const SessionRoom: React.FC<SessionRoomProps> = ({
 
     const handleEmotionAnalysisComplete = async (analysisData: any) => {
         console.log('Análisis emocional completado:', analysisData);
+        if (connectionStatus === 'connected') {
+            // The server already aggregated the streamed emotions: it saves the analysis
+            // when the window is stopped and broadcasts emotion_analysis_completed
+            socket?.emit('stop_emotion_analysis', {
+                session_code: session.session_code,
+                question_id: questions[currentQuestionIndex]?.id,
+                patient_response: patientResponse,
+                duration: emotionAnalysisDuration,
+            });
+            setPatientResponse('');
+            return;
+        }
         try {
             await realtimeAPI.saveContinuousEmotion(
                 session.id,
@@ -842,6 +866,8 @@ const SessionRoom: React.FC<SessionRoomProps> = ({
                                 isActive={isAnalyzingEmotion}
                                 duration={emotionAnalysisDuration}
                                 onAnalysisComplete={handleEmotionAnalysisComplete}
+                                socket={connectionStatus === 'connected' ? socket : null}
+                                sessionCode={session.session_code}
                                 onRealtimeEmotion={(emotionData) => {
                                     if (connectionStatus === 'connected') {
                                         socket?.emit('real_time_emotion', {
@@ -3,13 +3,13 @@ const API_BASE_URL = "https://902d6842e03e.ngrok-free.app/api"
 export const apiRequest = async (endpoint: string, options: RequestInit = {}) => {
     const token = localStorage.getItem("therapy_token")
     const config: RequestInit = {
+        ...options,
         headers: {
             "Content-Type": "application/json",
             "ngrok-skip-browser-warning": "true",
             ...(token && { Authorization: `Bearer ${token}` }),
             ...options.headers,
         },
-        ...options,
     }
 
     try {
@@ -77,11 +77,21 @@ export const sessionsAPI = {
 
 // Emotion detection API calls
 export const emotionAPI = {
-    detectEmotion: (imageData: string) =>
+    detectEmotion: (imageData: string, sessionId?: number, questionId?: number) =>
         apiRequest("/detect-emotion", {
             method: "POST",
-            body: JSON.stringify({ image: imageData }),
+            body: JSON.stringify({ image: imageData, session_id: sessionId, question_id: questionId }),
         }),
+    detectEmotionBinary: (frame: Blob, sessionId?: number, questionId?: number) => {
+        const params = new URLSearchParams()
+        if (sessionId) params.set("session_id", String(sessionId))
+        if (questionId) params.set("question_id", String(questionId))
+        return apiRequest(`/detect-emotion/binary?${params.toString()}`, {
+            method: "POST",
+            headers: { "Content-Type": frame.type || "image/jpeg" },
+            body: frame,
+        })
+    },
     detectEmotionAndSave: (sessionId: number, questionId: number, imageData: string, patientResponse?: string) =>
         apiRequest("/detect-emotion-and-save", {
             method: "POST",